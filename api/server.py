@@ -5,7 +5,6 @@ FastAPI后端服务器
 
 from __future__ import annotations
 
-import asyncio
 import json
 import os
 import sys
@@ -83,6 +82,20 @@ class PlaylistRequest(BaseModel):
     user_preferences: Optional[Dict[str, Any]] = None
 
 
+def _recommendation_events(recommendations: list) -> list:
+    """把推荐列表转换为 recommendations_start / song / recommendations_complete 事件"""
+    chunks = [
+        f"data: {json.dumps({'type': 'recommendations_start', 'count': len(recommendations)}, ensure_ascii=False)}\n\n"
+    ]
+    for i, rec in enumerate(recommendations):
+        song = rec.get("song", rec)
+        chunks.append(
+            f"data: {json.dumps({'type': 'song', 'song': song, 'index': i, 'total': len(recommendations)}, ensure_ascii=False)}\n\n"
+        )
+    chunks.append(f"data: {json.dumps({'type': 'recommendations_complete'}, ensure_ascii=False)}\n\n")
+    return chunks
+
+
 async def stream_recommendations(
     query: str,
     genre: Optional[str] = None,
@@ -100,45 +113,51 @@ async def stream_recommendations(
         
         # 发送开始事件
         yield f"data: {json.dumps({'type': 'start', 'message': '开始分析你的需求...'}, ensure_ascii=False)}\n\n"
-        await asyncio.sleep(0.1)
         
-        # 发送思考事件
-        yield f"data: {json.dumps({'type': 'thinking', 'message': '正在理解你的音乐偏好...'}, ensure_ascii=False)}\n\n"
-        await asyncio.sleep(0.2)
-        
-        # 执行推荐（这里可以进一步拆分步骤）
-        result = await agent.get_recommendations(
+        # 执行推荐：每个节点开始/结束时发送进度事件，LLM 生成的 token 一到就以增量形式转发
+        result: Dict[str, Any] = {}
+        sent_recommendations = None
+        async for event in agent.astream_recommendations(
             query=query,
             user_preferences=user_preferences
-        )
-        
-        # 发送响应文本（流式输出）
-        if result.get("success") and result.get("response"):
-            response_text = result["response"]
-            # 逐字符或逐词流式输出
-            words = response_text.split()
-            for i, word in enumerate(words):
-                partial_text = " ".join(words[:i+1])
-                yield f"data: {json.dumps({'type': 'response', 'text': partial_text, 'is_complete': False}, ensure_ascii=False)}\n\n"
-                await asyncio.sleep(0.05)  # 控制输出速度
+        ):
+            if event["type"] == "node_start":
+                yield f"data: {json.dumps({'type': 'step', 'status': 'start', 'step': event['node'], 'message': event['label']}, ensure_ascii=False)}\n\n"
             
-            # 发送完整响应
-            yield f"data: {json.dumps({'type': 'response', 'text': response_text, 'is_complete': True}, ensure_ascii=False)}\n\n"
-        
-        # 发送推荐歌曲（逐个发送）
-        if result.get("success") and result.get("recommendations"):
-            recommendations = result["recommendations"]
-            yield f"data: {json.dumps({'type': 'recommendations_start', 'count': len(recommendations)}, ensure_ascii=False)}\n\n"
+            elif event["type"] == "node_end":
+                partial = event["partial"]
+                step_event = {
+                    'type': 'step',
+                    'status': 'end',
+                    'step': event['node'],
+                    'elapsed_ms': event['elapsed_ms'],
+                    'partial': {k: v for k, v in partial.items() if k != 'recommendations'}
+                }
+                yield f"data: {json.dumps(step_event, ensure_ascii=False)}\n\n"
+                
+                # 推荐节点一结束就先把歌曲发出去，不必等待解释生成
+                if partial.get("recommendations"):
+                    sent_recommendations = partial["recommendations"]
+                    for chunk in _recommendation_events(sent_recommendations):
+                        yield chunk
             
-            for i, rec in enumerate(recommendations):
-                song = rec.get("song", rec)
-                yield f"data: {json.dumps({'type': 'song', 'song': song, 'index': i, 'total': len(recommendations)}, ensure_ascii=False)}\n\n"
-                await asyncio.sleep(0.1)
+            elif event["type"] == "token":
+                yield f"data: {json.dumps({'type': 'response_delta', 'delta': event['delta']}, ensure_ascii=False)}\n\n"
             
-            yield f"data: {json.dumps({'type': 'recommendations_complete'}, ensure_ascii=False)}\n\n"
+            elif event["type"] == "result":
+                result = event["result"]
+        
+        # 发送完整响应（包含歌曲列表等拼接内容，以此为准）
+        if result.get("response"):
+            yield f"data: {json.dumps({'type': 'response', 'text': result['response'], 'is_complete': True}, ensure_ascii=False)}\n\n"
+        
+        # 最终推荐与已提前发送的不一致时再补发一次
+        if result.get("success") and result.get("recommendations") and result["recommendations"] != sent_recommendations:
+            for chunk in _recommendation_events(result["recommendations"]):
+                yield chunk
         
         # 发送完成事件
-        yield f"data: {json.dumps({'type': 'complete', 'success': True}, ensure_ascii=False)}\n\n"
+        yield f"data: {json.dumps({'type': 'complete', 'success': result.get('success', False)}, ensure_ascii=False)}\n\n"
         
     except Exception as e:
         logger.error(f"流式推荐失败: {str(e)}", exc_info=True)
@@ -163,46 +182,50 @@ async def stream_playlist(
         
         # 发送开始事件
         yield f"data: {json.dumps({'type': 'start', 'message': '开始生成你的专属歌单...'}, ensure_ascii=False)}\n\n"
-        await asyncio.sleep(0.1)
-        
-        # 分析查询
-        yield f"data: {json.dumps({'type': 'thinking', 'message': '正在分析你的需求...'}, ensure_ascii=False)}\n\n"
-        await asyncio.sleep(0.2)
-        
-        # 准备种子
-        yield f"data: {json.dumps({'type': 'thinking', 'message': '正在准备推荐种子...'}, ensure_ascii=False)}\n\n"
-        await asyncio.sleep(0.2)
         
-        # 获取推荐
-        yield f"data: {json.dumps({'type': 'thinking', 'message': '正在从Spotify获取推荐...'}, ensure_ascii=False)}\n\n"
-        
-        # 执行歌单生成
-        result = await service.generate_smart_playlist(
+        # 分阶段执行歌单生成，每个阶段结束就把已有结果发出去
+        result: Dict[str, Any] = {}
+        async for event in service.astream_smart_playlist(
             user_query=query,
             user_preferences=user_preferences or {},
             target_size=target_size,
             create_spotify_playlist=create_spotify_playlist,
             public=public
-        )
-        
-        # 发送上下文信息
-        if result.get("context"):
-            yield f"data: {json.dumps({'type': 'context', 'context': result['context']}, ensure_ascii=False)}\n\n"
-        
-        # 发送种子摘要
-        if result.get("seed_summary"):
-            yield f"data: {json.dumps({'type': 'seed_summary', 'seed_summary': result['seed_summary']}, ensure_ascii=False)}\n\n"
-        
-        # 发送歌曲列表（逐个发送）
-        if result.get("songs"):
-            songs = result["songs"]
-            yield f"data: {json.dumps({'type': 'songs_start', 'count': len(songs)}, ensure_ascii=False)}\n\n"
+        ):
+            if event["type"] == "stage_start":
+                yield f"data: {json.dumps({'type': 'step', 'status': 'start', 'step': event['stage'], 'message': event['label']}, ensure_ascii=False)}\n\n"
             
-            for i, song in enumerate(songs):
-                yield f"data: {json.dumps({'type': 'song', 'song': song, 'index': i, 'total': len(songs)}, ensure_ascii=False)}\n\n"
-                await asyncio.sleep(0.05)
+            elif event["type"] == "stage_end":
+                partial = event["partial"]
+                step_event = {
+                    'type': 'step',
+                    'status': 'end',
+                    'step': event['stage'],
+                    'elapsed_ms': event['elapsed_ms'],
+                    'partial': {k: v for k, v in partial.items() if k not in ('context', 'seed_summary', 'songs', 'playlist')}
+                }
+                yield f"data: {json.dumps(step_event, ensure_ascii=False)}\n\n"
+                
+                # 发送上下文信息
+                if partial.get("context"):
+                    yield f"data: {json.dumps({'type': 'context', 'context': partial['context']}, ensure_ascii=False)}\n\n"
+                
+                # 发送种子摘要
+                if partial.get("seed_summary"):
+                    yield f"data: {json.dumps({'type': 'seed_summary', 'seed_summary': partial['seed_summary']}, ensure_ascii=False)}\n\n"
+                
+                # 发送歌曲列表（平衡完成即发送，不必等待 Spotify 歌单创建）
+                if partial.get("songs"):
+                    songs = partial["songs"]
+                    yield f"data: {json.dumps({'type': 'songs_start', 'count': len(songs)}, ensure_ascii=False)}\n\n"
+                    
+                    for i, song in enumerate(songs):
+                        yield f"data: {json.dumps({'type': 'song', 'song': song, 'index': i, 'total': len(songs)}, ensure_ascii=False)}\n\n"
+                    
+                    yield f"data: {json.dumps({'type': 'songs_complete'}, ensure_ascii=False)}\n\n"
             
-            yield f"data: {json.dumps({'type': 'songs_complete'}, ensure_ascii=False)}\n\n"
+            elif event["type"] == "result":
+                result = event["result"]
         
         # 发送播放列表信息
         if result.get("playlist"):
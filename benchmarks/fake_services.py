@@ -0,0 +1,451 @@
+"""
+本地假服务
+模拟 Spotify Web API 与 OpenAI 兼容的聊天接口，供基准测试离线运行
+
+两个服务都基于标准库 ThreadingHTTPServer，支持配置：
+- 每个请求的固定延迟（毫秒）
+- 随机失败比例（返回 500）
+- 限流（每秒请求数上限，超出返回 429 + Retry-After）
+并按接口统计调用次数
+"""
+
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from collections import Counter, deque
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+
+@dataclass
+class FaultConfig:
+    """假服务的延迟/故障配置"""
+    latency_ms: float = 0.0           # 每个请求的固定延迟
+    jitter_ms: float = 0.0            # 在固定延迟上叠加的随机抖动（0 ~ jitter_ms）
+    error_rate: float = 0.0           # 返回 500 的概率
+    rate_limit_rps: float = 0.0       # 每秒请求数上限，0 表示不限流
+    retry_after: int = 0              # 429 响应携带的 Retry-After（秒）
+
+
+class _Stats:
+    """线程安全的调用计数器"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.calls: Counter = Counter()
+        self.statuses: Counter = Counter()
+
+    def record(self, route: str, status: int) -> None:
+        with self._lock:
+            self.calls[route] += 1
+            self.statuses[status] += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"calls": dict(self.calls), "statuses": dict(self.statuses)}
+
+    def reset(self) -> None:
+        with self._lock:
+            self.calls.clear()
+            self.statuses.clear()
+
+
+class _RateLimiter:
+    """滑动窗口限流器（1 秒窗口）"""
+
+    def __init__(self, rps: float):
+        self.rps = rps
+        self._lock = threading.Lock()
+        self._window: deque = deque()
+
+    def allow(self) -> bool:
+        if self.rps <= 0:
+            return True
+        now = time.monotonic()
+        with self._lock:
+            while self._window and now - self._window[0] > 1.0:
+                self._window.popleft()
+            if len(self._window) >= self.rps:
+                return False
+            self._window.append(now)
+            return True
+
+
+class _FakeServer:
+    """假服务基类：负责线程、故障注入和统计，子类实现 handle()"""
+
+    name = "fake"
+
+    def __init__(self, faults: Optional[FaultConfig] = None, host: str = "127.0.0.1", port: int = 0):
+        self.faults = faults or FaultConfig()
+        self.stats = _Stats()
+        self._limiter = _RateLimiter(self.faults.rate_limit_rps)
+        self._random = random.Random(42)
+        self._httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self._httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "_FakeServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name=f"{self.name}-server", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def route_of(self, method: str, path: str) -> str:
+        """把具体路径归一成统计用的路由名（去掉 ID）"""
+        return f"{method} {path}"
+
+    def handle(self, handler: BaseHTTPRequestHandler, method: str, path: str,
+               query: Dict[str, List[str]], body: Any) -> None:
+        raise NotImplementedError
+
+    def _make_handler(self) -> Callable[..., BaseHTTPRequestHandler]:
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):  # 静默
+                pass
+
+            def _dispatch(self, method: str) -> None:
+                parsed = urlparse(self.path)
+                route = server.route_of(method, parsed.path)
+                length = int(self.headers.get("Content-Length") or 0)
+                raw = self.rfile.read(length) if length else b""
+                try:
+                    body = json.loads(raw) if raw else None
+                except ValueError:
+                    body = None
+
+                faults = server.faults
+                delay = faults.latency_ms + (server._random.random() * faults.jitter_ms if faults.jitter_ms else 0)
+                if delay:
+                    time.sleep(delay / 1000)
+
+                if not server._limiter.allow():
+                    server.stats.record(route, 429)
+                    send_json(self, 429, {"error": {"status": 429, "message": "rate limited"}},
+                              {"Retry-After": str(faults.retry_after)})
+                    return
+                if faults.error_rate and server._random.random() < faults.error_rate:
+                    server.stats.record(route, 500)
+                    send_json(self, 500, {"error": {"status": 500, "message": "injected failure"}})
+                    return
+
+                server.stats.record(route, 200)
+                server.handle(self, method, parsed.path, parse_qs(parsed.query), body)
+
+            def do_GET(self):
+                self._dispatch("GET")
+
+            def do_POST(self):
+                self._dispatch("POST")
+
+            def do_PUT(self):
+                self._dispatch("PUT")
+
+            def do_DELETE(self):
+                self._dispatch("DELETE")
+
+        return Handler
+
+
+def send_json(handler: BaseHTTPRequestHandler, status: int, payload: Any,
+              headers: Optional[Dict[str, str]] = None) -> None:
+    data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+    handler.send_response(status)
+    handler.send_header("Content-Type", "application/json; charset=utf-8")
+    handler.send_header("Content-Length", str(len(data)))
+    for key, value in (headers or {}).items():
+        handler.send_header(key, value)
+    handler.end_headers()
+    handler.wfile.write(data)
+
+
+# ---------------------------------------------------------------------- #
+# Spotify Web API
+# ---------------------------------------------------------------------- #
+_GENRES = ["pop", "rock", "electronic", "acoustic", "jazz", "indie", "dance", "chill"]
+
+
+def _fake_id(*parts: Any) -> str:
+    """由输入确定性地生成 22 位 Spotify 风格 ID"""
+    return hashlib.sha1("|".join(map(str, parts)).encode("utf-8")).hexdigest()[:22]
+
+
+def _seed(value: str) -> int:
+    """由任意 ID 得到稳定的整数种子"""
+    return int(hashlib.sha1(value.encode("utf-8")).hexdigest()[:8], 16)
+
+
+def _fake_artist(artist_id: str, full: bool = False) -> Dict[str, Any]:
+    seed = _seed(artist_id)
+    artist = {
+        "id": artist_id,
+        "name": f"Artist {artist_id[:6]}",
+        "uri": f"spotify:artist:{artist_id}",
+        "external_urls": {"spotify": f"https://open.spotify.com/artist/{artist_id}"},
+    }
+    if full:
+        artist.update({
+            "genres": [_GENRES[seed % len(_GENRES)], _GENRES[(seed // 7) % len(_GENRES)]],
+            "popularity": seed % 100,
+            "followers": {"total": seed % 1000000},
+            "images": [],
+        })
+    return artist
+
+
+def _fake_track(track_id: str, name: Optional[str] = None) -> Dict[str, Any]:
+    seed = _seed(track_id)
+    artist_id = _fake_id("artist", seed % 500)
+    return {
+        "id": track_id,
+        "name": name or f"Track {track_id[:6]}",
+        "artists": [_fake_artist(artist_id)],
+        "album": {
+            "id": _fake_id("album", track_id),
+            "name": f"Album {track_id[:4]}",
+            "release_date": f"{1980 + seed % 45}-01-01",
+            "images": [],
+        },
+        "popularity": 1 + seed % 99,
+        "explicit": seed % 5 == 0,
+        "duration_ms": 150000 + seed % 120000,
+        "preview_url": None,
+        "uri": f"spotify:track:{track_id}",
+        "external_urls": {"spotify": f"https://open.spotify.com/track/{track_id}"},
+    }
+
+
+def _paging(items: List[Any], limit: int, offset: int = 0, total: Optional[int] = None) -> Dict[str, Any]:
+    return {"items": items, "limit": limit, "offset": offset, "total": total if total is not None else len(items), "next": None}
+
+
+class FakeSpotifyServer(_FakeServer):
+    """Spotify Web API 假服务（路径前缀 /v1/）"""
+
+    name = "spotify"
+
+    _ID_RE = re.compile(r"(/(?:tracks|artists|albums|playlists|users)/)[^/]+")
+    _ID_REPL = r"\1{id}"
+
+    def __init__(self, faults: Optional[FaultConfig] = None, saved_tracks: int = 120, **kwargs):
+        super().__init__(faults, **kwargs)
+        self.saved_tracks = saved_tracks
+
+    @property
+    def api_prefix(self) -> str:
+        return f"{self.base_url}/v1/"
+
+    def route_of(self, method: str, path: str) -> str:
+        return f"{method} {self._ID_RE.sub(self._ID_REPL, path)}"
+
+    def handle(self, handler, method, path, query, body):
+        q = lambda key, default="": query.get(key, [default])[0]
+        limit = int(q("limit", "20") or 20)
+        offset = int(q("offset", "0") or 0)
+
+        if path == "/v1/search":
+            text = q("q")
+            if q("type") == "artist":
+                artists = [_fake_artist(_fake_id("artist", text, i), full=True) for i in range(limit)]
+                return send_json(handler, 200, {"artists": _paging(artists, limit)})
+            tracks = [_fake_track(_fake_id("track", text, i), name=text.split(" artist:")[0] if i == 0 else None)
+                      for i in range(limit)]
+            return send_json(handler, 200, {"tracks": _paging(tracks, limit)})
+
+        if path == "/v1/recommendations":
+            seeds = q("seed_tracks") + q("seed_artists") + q("seed_genres")
+            tracks = [_fake_track(_fake_id("rec", seeds, i)) for i in range(limit)]
+            return send_json(handler, 200, {"tracks": tracks, "seeds": []})
+
+        if path == "/v1/audio-features":
+            ids = [i for i in q("ids").split(",") if i]
+            features = []
+            for track_id in ids:
+                seed = _seed(track_id)
+                features.append({
+                    "id": track_id,
+                    "valence": (seed % 100) / 100,
+                    "energy": ((seed // 100) % 100) / 100,
+                    "danceability": ((seed // 10000) % 100) / 100,
+                    "tempo": 60 + seed % 120,
+                })
+            return send_json(handler, 200, {"audio_features": features})
+
+        if path == "/v1/artists":
+            ids = [i for i in q("ids").split(",") if i]
+            return send_json(handler, 200, {"artists": [_fake_artist(i, full=True) for i in ids]})
+
+        match = re.fullmatch(r"/v1/artists/([^/]+)(/top-tracks)?", path)
+        if match:
+            if match.group(2):
+                tracks = [_fake_track(_fake_id("top", match.group(1), i)) for i in range(10)]
+                return send_json(handler, 200, {"tracks": tracks})
+            return send_json(handler, 200, _fake_artist(match.group(1), full=True))
+
+        match = re.fullmatch(r"/v1/tracks/([^/]+)", path)
+        if match:
+            return send_json(handler, 200, _fake_track(match.group(1)))
+
+        if path == "/v1/tracks":
+            ids = [i for i in q("ids").split(",") if i]
+            return send_json(handler, 200, {"tracks": [_fake_track(i) for i in ids]})
+
+        if path == "/v1/me":
+            return send_json(handler, 200, {"id": "bench-user", "display_name": "Bench User"})
+
+        if path == "/v1/me/top/tracks":
+            tracks = [_fake_track(_fake_id("mytop", i)) for i in range(offset, offset + limit)]
+            return send_json(handler, 200, _paging(tracks, limit, offset, total=50))
+
+        if path == "/v1/me/top/artists":
+            artists = [_fake_artist(_fake_id("artist", i), full=True) for i in range(offset, offset + limit)]
+            return send_json(handler, 200, _paging(artists, limit, offset, total=50))
+
+        if path == "/v1/me/tracks":
+            end = min(offset + limit, self.saved_tracks)
+            items = [{"added_at": "2024-01-01T00:00:00Z", "track": _fake_track(_fake_id("saved", i))}
+                     for i in range(offset, end)]
+            return send_json(handler, 200, _paging(items, limit, offset, total=self.saved_tracks))
+
+        match = re.fullmatch(r"/v1/users/([^/]+)/playlists", path)
+        if match and method == "POST":
+            playlist_id = _fake_id("playlist", time.time_ns())
+            return send_json(handler, 201, {
+                "id": playlist_id,
+                "name": (body or {}).get("name", ""),
+                "description": (body or {}).get("description", ""),
+                "public": (body or {}).get("public", False),
+                "owner": {"id": match.group(1), "display_name": "Bench User"},
+                "external_urls": {"spotify": f"https://open.spotify.com/playlist/{playlist_id}"},
+                "tracks": {"total": 0},
+            })
+
+        match = re.fullmatch(r"/v1/playlists/([^/]+)/tracks", path)
+        if match:
+            if method == "POST":
+                return send_json(handler, 201, {"snapshot_id": _fake_id("snapshot", time.time_ns())})
+            items = [{"track": _fake_track(_fake_id("pl", match.group(1), i))} for i in range(offset, min(offset + limit, 200))]
+            return send_json(handler, 200, _paging(items, limit, offset, total=200))
+
+        match = re.fullmatch(r"/v1/playlists/([^/]+)", path)
+        if match:
+            items = [{"track": _fake_track(_fake_id("pl", match.group(1), i))} for i in range(100)]
+            return send_json(handler, 200, {
+                "id": match.group(1),
+                "name": "Bench Playlist",
+                "description": "",
+                "owner": {"display_name": "Bench User"},
+                "followers": {"total": 0},
+                "tracks": _paging(items, 100, 0, total=200),
+            })
+
+        send_json(handler, 404, {"error": {"status": 404, "message": f"no fake route for {path}"}})
+
+
+# ---------------------------------------------------------------------- #
+# OpenAI 兼容聊天接口
+# ---------------------------------------------------------------------- #
+class FakeChatServer(_FakeServer):
+    """
+    OpenAI 兼容 /chat/completions 假服务
+
+    - 意图分析提示词：按 intents 表（用户输入 → 意图 JSON）返回，未登记的输入返回 general_chat
+    - 要求返回 JSON 数组的推荐提示词：返回歌曲列表
+    - 其他提示词：返回一段固定长度的中文文本，stream=true 时按 token 逐块发送
+    """
+
+    name = "llm"
+
+    _USER_INPUT_RE = re.compile(r"用户输入：(.*)")
+
+    def __init__(self, faults: Optional[FaultConfig] = None, token_delay_ms: float = 0.0,
+                 response_tokens: int = 120, intents: Optional[Dict[str, Dict[str, Any]]] = None, **kwargs):
+        super().__init__(faults, **kwargs)
+        self.token_delay_ms = token_delay_ms
+        self.response_tokens = response_tokens
+        self.intents = intents or {}
+
+    def route_of(self, method: str, path: str) -> str:
+        return f"{method} {path}"
+
+    def _reply_for(self, prompt: str) -> str:
+        if "intent_type" in prompt:
+            match = self._USER_INPUT_RE.search(prompt)
+            user_input = match.group(1).strip() if match else ""
+            intent = self.intents.get(user_input, {"intent_type": "general_chat", "parameters": {}, "context": user_input})
+            return "```json\n" + json.dumps(intent, ensure_ascii=False) + "\n```"
+        if "JSON数组" in prompt:
+            match = re.search(r"推荐 (\d+) 首", prompt)
+            count = int(match.group(1)) if match else 10
+            songs = [{"song": f"Song {i}", "artist": f"Artist {i % 7}"} for i in range(count)]
+            return json.dumps(songs, ensure_ascii=False)
+        return "".join("音乐" if i % 2 == 0 else "推荐" for i in range(self.response_tokens))
+
+    def handle(self, handler, method, path, query, body):
+        if not path.endswith("/chat/completions"):
+            return send_json(handler, 404, {"error": {"message": f"no fake route for {path}"}})
+        body = body or {}
+        prompt = "\n".join(str(m.get("content", "")) for m in body.get("messages", []))
+        reply = self._reply_for(prompt)
+        model = body.get("model", "fake-model")
+
+        if not body.get("stream"):
+            return send_json(handler, 200, {
+                "id": "chatcmpl-bench",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": reply}, "finish_reason": "stop"}],
+                "usage": {"prompt_tokens": len(prompt), "completion_tokens": len(reply), "total_tokens": len(prompt) + len(reply)},
+            })
+
+        handler.send_response(200)
+        handler.send_header("Content-Type", "text/event-stream")
+        handler.send_header("Cache-Control", "no-cache")
+        handler.send_header("Connection", "close")
+        handler.end_headers()
+        handler.close_connection = True
+
+        def chunk(delta: Dict[str, Any], finish_reason: Optional[str] = None) -> None:
+            payload = {
+                "id": "chatcmpl-bench",
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+            }
+            handler.wfile.write(f"data: {json.dumps(payload, ensure_ascii=False)}\n\n".encode("utf-8"))
+            handler.wfile.flush()
+
+        chunk({"role": "assistant", "content": ""})
+        # 每 2 个字符作为一个 token
+        for i in range(0, len(reply), 2):
+            if self.token_delay_ms:
+                time.sleep(self.token_delay_ms / 1000)
+            chunk({"content": reply[i:i + 2]})
+        chunk({}, finish_reason="stop")
+        handler.wfile.write(b"data: [DONE]\n\n")
+        handler.wfile.flush()
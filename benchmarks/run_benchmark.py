@@ -0,0 +1,344 @@
+"""
+离线基准测试
+启动本地假 Spotify / 假 LLM 服务，在并发梯度下压测各意图路径、歌单服务和 SSE 流，
+输出 p50/p95/p99 延迟、吞吐量以及每个外部 API 的调用次数
+
+用法（在项目根目录）：
+    python -m benchmarks.run_benchmark
+    python -m benchmarks.run_benchmark --concurrency 1,8,32 --requests 64 \\
+        --spotify-latency-ms 80 --llm-latency-ms 300 --token-delay-ms 15
+    python -m benchmarks.run_benchmark --scenarios search,sse_recommendations --no-fast-path
+    python -m benchmarks.run_benchmark --error-rate 0.05 --rate-limit 50 --json result.json
+    python -m benchmarks.run_benchmark --no-coalescing --no-response-cache --phases cold
+
+说明：
+- 所有外部请求都指向本地假服务，不需要真实的 Spotify / 硅基流动密钥
+- 每个并发档位分冷、热两轮分别报告：冷轮开始前清空所有缓存（意图、歌曲解析、完整响应、音频特征、
+  用户画像和收藏曲库），热轮紧接着用同样的请求再跑一次（--phases 选择要跑的轮次）
+- 同一档位内的请求使用相同的查询：开启请求合并与完整响应缓存时，冷轮实际只有首批请求访问上游，
+  要测量每个请求完整的上游开销，请加 --no-coalescing --no-response-cache
+- SSE 场景直接驱动 api.server 中的流式生成器，同时记录首个进度事件的延迟
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from benchmarks.fake_services import FakeChatServer, FakeSpotifyServer, FaultConfig
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+# 每个意图场景使用的查询，以及假 LLM 对该查询返回的意图
+INTENT_SCENARIOS: Dict[str, Tuple[str, Dict[str, Any]]] = {
+    "search": ("搜索晴天", {"intent_type": "search", "parameters": {"query": "晴天"}}),
+    "recommend_by_mood": ("推荐一些开心的音乐", {"intent_type": "recommend_by_mood", "parameters": {"mood": "开心"}}),
+    "recommend_by_activity": ("适合运动时听的歌", {"intent_type": "recommend_by_activity", "parameters": {"activity": "运动"}}),
+    "recommend_by_genre": ("来点摇滚音乐", {"intent_type": "recommend_by_genre", "parameters": {"genre": "摇滚"}}),
+    "recommend_by_artist": ("想听周杰伦的歌", {"intent_type": "recommend_by_artist", "parameters": {"artist": "周杰伦"}}),
+    "recommend_by_favorites": (
+        "推荐和晴天类似的歌",
+        {"intent_type": "recommend_by_favorites", "parameters": {"favorite_songs": ["晴天"]}},
+    ),
+    "general_chat": ("你好，随便聊聊吧", {"intent_type": "general_chat", "parameters": {}}),
+}
+
+PLAYLIST_QUERY = "帮我生成一个适合学习的安静歌单"
+SSE_QUERY = "推荐一些开心的音乐"
+
+ALL_SCENARIOS = list(INTENT_SCENARIOS) + ["playlist", "sse_recommendations", "sse_playlist"]
+
+
+def _percentile(sorted_values: List[float], pct: float) -> float:
+    """最近秩百分位数"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, -(-len(sorted_values) * pct // 100))
+    return sorted_values[int(rank) - 1]
+
+
+def _diff_calls(before: Dict[str, int], after: Dict[str, int]) -> Dict[str, int]:
+    return {k: v - before.get(k, 0) for k, v in after.items() if v - before.get(k, 0)}
+
+
+def _configure_environment(args: argparse.Namespace, spotify: FakeSpotifyServer, llm: FakeChatServer, workdir: str) -> None:
+    """在导入应用模块之前把所有外部地址指向假服务"""
+    os.environ["SPOTIFY_CLIENT_ID"] = "bench-client-id"
+    os.environ["SPOTIFY_CLIENT_SECRET"] = "bench-client-secret"
+    os.environ["SILICONFLOW_API_KEY"] = "bench-key"
+    os.environ["SILICONFLOW_BASE_URL"] = f"{llm.base_url}/v1"
+    os.environ["TRACK_CACHE_PATH"] = os.path.join(workdir, "track_cache.sqlite3")
+    os.environ["APP_CACHE_PATH"] = os.path.join(workdir, "app_cache.sqlite3")
+    os.environ["USER_PROFILE_PATH"] = os.path.join(workdir, "user_profile.sqlite3")
+    os.environ["LIBRARY_SYNC_PATH"] = os.path.join(workdir, "library_sync.sqlite3")
+    if args.no_fast_path:
+        os.environ["INTENT_FAST_PATH"] = "false"
+    if args.no_coalescing:
+        os.environ["REQUEST_COALESCING"] = "false"
+    if args.no_response_cache:
+        os.environ["RESPONSE_CACHE"] = "false"
+
+    for path in (str(PROJECT_ROOT), str(PROJECT_ROOT / "mcp")):
+        if path not in sys.path:
+            sys.path.insert(0, path)
+
+
+def _install_spotify_clients(spotify: FakeSpotifyServer, pool_size: int) -> None:
+    """用指向假服务的 spotipy 客户端替换 MCP 服务器中的单例"""
+    import requests
+    import spotipy
+    from requests.adapters import HTTPAdapter
+
+    import music_server_updated_2025 as server
+
+    def make_client() -> "spotipy.Spotify":
+        session = requests.Session()
+        session.mount("http://", HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size))
+        client = spotipy.Spotify(auth="bench-token", requests_session=session, retries=3, status_retries=3, backoff_factor=0)
+        client.prefix = spotify.api_prefix
+        return client
+
+    server._spotify_client_cc = make_client()
+    server._spotify_client_oauth = make_client()
+
+
+def _reset_caches(agent: Any, playlist_service: Any) -> None:
+    """清空所有缓存层（含持久化部分），让每个档位从冷启动开始"""
+    import music_server_updated_2025 as server
+    from tools.audio_features import get_audio_feature_store
+
+    intent_cache = getattr(agent.graph, "intent_cache", None)
+    if intent_cache is not None:
+        intent_cache.clear()
+    for response_cache in (agent._response_cache, playlist_service._response_cache):
+        if response_cache is not None:
+            response_cache.clear()
+    get_audio_feature_store().clear()
+    for store in (server.get_track_cache(), server.get_profile_store(), server.get_library_sync()):
+        if store is not None:
+            store.clear()
+
+
+async def _consume_sse(stream) -> Tuple[bool, Optional[float]]:
+    """消费 SSE 生成器，返回 (是否成功, 首个进度事件的延迟 ms)"""
+    started = time.perf_counter()
+    first_event_ms: Optional[float] = None
+    success = False
+    async for chunk in stream:
+        event = json.loads(chunk[len("data: "):])
+        if first_event_ms is None and event["type"] != "start":
+            first_event_ms = (time.perf_counter() - started) * 1000
+        if event["type"] == "complete":
+            success = bool(event.get("success"))
+        elif event["type"] == "error":
+            success = False
+    return success, first_event_ms
+
+
+def _build_scenarios(agent: Any, playlist_service: Any) -> Dict[str, Callable[[], Awaitable[Tuple[bool, Optional[float]]]]]:
+    from api import server as api_server
+
+    # 让 SSE 生成器复用同一个 Agent / 歌单服务实例
+    api_server._agent = agent
+    api_server._playlist_service = playlist_service
+
+    scenarios: Dict[str, Callable[[], Awaitable[Tuple[bool, Optional[float]]]]] = {}
+
+    for name, (query, _) in INTENT_SCENARIOS.items():
+        async def run_intent(query: str = query) -> Tuple[bool, Optional[float]]:
+            result = await agent.get_recommendations(query)
+            return bool(result.get("success")), None
+        scenarios[name] = run_intent
+
+    async def run_playlist() -> Tuple[bool, Optional[float]]:
+        result = await playlist_service.generate_smart_playlist(
+            user_query=PLAYLIST_QUERY, target_size=30, create_spotify_playlist=True
+        )
+        return bool(result.get("songs")), None
+
+    async def run_sse_recommendations() -> Tuple[bool, Optional[float]]:
+        return await _consume_sse(api_server.stream_recommendations(SSE_QUERY))
+
+    async def run_sse_playlist() -> Tuple[bool, Optional[float]]:
+        return await _consume_sse(api_server.stream_playlist(PLAYLIST_QUERY, create_spotify_playlist=True))
+
+    scenarios["playlist"] = run_playlist
+    scenarios["sse_recommendations"] = run_sse_recommendations
+    scenarios["sse_playlist"] = run_sse_playlist
+    return scenarios
+
+
+async def _run_level(
+    func: Callable[[], Awaitable[Tuple[bool, Optional[float]]]],
+    concurrency: int,
+    total_requests: int,
+) -> Dict[str, Any]:
+    """以固定并发执行 total_requests 次请求，返回延迟统计"""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    first_events: List[float] = []
+    failures = 0
+
+    async def one() -> None:
+        nonlocal failures
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                ok, first_event_ms = await func()
+            except Exception:
+                ok, first_event_ms = False, None
+            latencies.append((time.perf_counter() - started) * 1000)
+            if first_event_ms is not None:
+                first_events.append(first_event_ms)
+            if not ok:
+                failures += 1
+
+    wall_started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(total_requests)))
+    wall = time.perf_counter() - wall_started
+
+    latencies.sort()
+    first_events.sort()
+    stats = {
+        "requests": total_requests,
+        "failures": failures,
+        "wall_s": round(wall, 3),
+        "throughput_rps": round(total_requests / wall, 2) if wall else 0.0,
+        "p50_ms": round(_percentile(latencies, 50), 1),
+        "p95_ms": round(_percentile(latencies, 95), 1),
+        "p99_ms": round(_percentile(latencies, 99), 1),
+    }
+    if first_events:
+        stats["first_event_p50_ms"] = round(_percentile(first_events, 50), 1)
+        stats["first_event_p95_ms"] = round(_percentile(first_events, 95), 1)
+    return stats
+
+
+async def run_benchmark(args: argparse.Namespace) -> List[Dict[str, Any]]:
+    spotify_faults = FaultConfig(
+        latency_ms=args.spotify_latency_ms,
+        jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate,
+        rate_limit_rps=args.rate_limit,
+    )
+    llm_faults = FaultConfig(
+        latency_ms=args.llm_latency_ms,
+        jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate,
+        rate_limit_rps=args.rate_limit,
+    )
+    intents = {query: dict(intent, context=query) for query, intent in INTENT_SCENARIOS.values()}
+
+    with tempfile.TemporaryDirectory(prefix="music-bench-") as workdir, \
+            FakeSpotifyServer(spotify_faults) as spotify, \
+            FakeChatServer(llm_faults, token_delay_ms=args.token_delay_ms, intents=intents) as llm:
+        _configure_environment(args, spotify, llm, workdir)
+        _install_spotify_clients(spotify, pool_size=max(args.concurrency))
+
+        from music_agent import MusicRecommendationAgent
+        from services.playlist_service import PlaylistRecommendationService
+
+        agent = MusicRecommendationAgent()
+        playlist_service = PlaylistRecommendationService()
+        scenarios = _build_scenarios(agent, playlist_service)
+
+        results: List[Dict[str, Any]] = []
+        for name in args.scenarios:
+            for concurrency in args.concurrency:
+                # 冷轮从空缓存开始；只跑热轮时先用一次不计时的请求预热
+                _reset_caches(agent, playlist_service)
+                if "cold" not in args.phases:
+                    await scenarios[name]()
+                for phase in args.phases:
+                    spotify_before = spotify.stats.snapshot()["calls"]
+                    llm_before = llm.stats.snapshot()["calls"]
+
+                    stats = await _run_level(scenarios[name], concurrency, args.requests)
+
+                    spotify_calls = _diff_calls(spotify_before, spotify.stats.snapshot()["calls"])
+                    llm_calls = _diff_calls(llm_before, llm.stats.snapshot()["calls"])
+                    stats.update({
+                        "scenario": name,
+                        "concurrency": concurrency,
+                        "phase": phase,
+                        "spotify_calls": sum(spotify_calls.values()),
+                        "llm_calls": sum(llm_calls.values()),
+                        "spotify_routes": spotify_calls,
+                    })
+                    results.append(stats)
+                    _print_row(stats)
+
+        print()
+        print(f"状态码统计  spotify={spotify.stats.snapshot()['statuses']}  llm={llm.stats.snapshot()['statuses']}")
+        return results
+
+
+_COLUMNS = [
+    ("scenario", 24), ("concurrency", 4), ("phase", 5), ("p50_ms", 9), ("p95_ms", 9), ("p99_ms", 9),
+    ("throughput_rps", 9), ("failures", 5), ("spotify_calls", 8), ("llm_calls", 6),
+]
+
+
+def _print_header() -> None:
+    titles = ["scenario", "conc", "phase", "p50(ms)", "p95(ms)", "p99(ms)", "rps", "fail", "spotify", "llm"]
+    print("  ".join(t.ljust(w) if i == 0 else t.rjust(w) for i, (t, (_, w)) in enumerate(zip(titles, _COLUMNS))))
+
+
+def _print_row(stats: Dict[str, Any]) -> None:
+    cells = [str(stats[key]).ljust(w) if i == 0 else str(stats[key]).rjust(w) for i, (key, w) in enumerate(_COLUMNS)]
+    line = "  ".join(cells)
+    if "first_event_p50_ms" in stats:
+        line += f"  first_event p50={stats['first_event_p50_ms']}ms p95={stats['first_event_p95_ms']}ms"
+    print(line, flush=True)
+
+
+def _parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="音乐推荐离线基准测试")
+    parser.add_argument("--scenarios", default=",".join(ALL_SCENARIOS),
+                        help=f"逗号分隔的场景列表，可选: {','.join(ALL_SCENARIOS)}")
+    parser.add_argument("--concurrency", default="1,4,16", help="逗号分隔的并发档位")
+    parser.add_argument("--requests", type=int, default=32, help="每个档位的请求数")
+    parser.add_argument("--spotify-latency-ms", type=float, default=50.0, help="假 Spotify 每个请求的延迟")
+    parser.add_argument("--llm-latency-ms", type=float, default=200.0, help="假 LLM 首个响应的延迟")
+    parser.add_argument("--token-delay-ms", type=float, default=5.0, help="假 LLM 流式输出每个 token 的间隔")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="在延迟上叠加的随机抖动")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="假服务返回 500 的概率")
+    parser.add_argument("--rate-limit", type=float, default=0.0, help="假服务每秒请求数上限（超出返回 429），0 为不限")
+    parser.add_argument("--no-fast-path", action="store_true", help="关闭本地意图快速路径，所有意图都走 LLM")
+    parser.add_argument("--no-coalescing", action="store_true", help="关闭相同并发请求的合并（REQUEST_COALESCING=false）")
+    parser.add_argument("--no-response-cache", action="store_true", help="关闭完整响应缓存（RESPONSE_CACHE=false）")
+    parser.add_argument("--phases", default="cold,warm",
+                        help="逗号分隔的轮次：cold（清空缓存后）、warm（保留缓存），分别报告")
+    parser.add_argument("--json", dest="json_path", help="把结果写入 JSON 文件")
+    args = parser.parse_args(argv)
+
+    args.scenarios = [s.strip() for s in args.scenarios.split(",") if s.strip()]
+    unknown = [s for s in args.scenarios if s not in ALL_SCENARIOS]
+    if unknown:
+        parser.error(f"未知场景: {', '.join(unknown)}")
+    args.concurrency = [int(c) for c in args.concurrency.split(",") if c.strip()]
+    args.phases = [p.strip() for p in args.phases.split(",") if p.strip()]
+    if not args.phases or any(p not in ("cold", "warm") for p in args.phases):
+        parser.error("--phases 只能包含 cold、warm")
+    # 热轮依赖冷轮留下的缓存，始终先跑冷轮
+    args.phases.sort(key=("cold", "warm").index)
+    return args
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    args = _parse_args(argv)
+    _print_header()
+    results = asyncio.run(run_benchmark(args))
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"结果已写入 {args.json_path}")
+
+
+if __name__ == "__main__":
+    main()
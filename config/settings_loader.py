@@ -5,8 +5,79 @@
 
 import json
 import os
+import threading
 from pathlib import Path
-from typing import Dict, Any, Optional
+from types import MappingProxyType
+from typing import Dict, Any, Mapping, Optional, Tuple
+
+
+_EMPTY_SETTINGS: Mapping[str, Any] = MappingProxyType({})
+
+# 已加载的配置快照：文件路径 -> ((mtime_ns, size), 只读配置)
+_snapshots: Dict[str, Tuple[Tuple[int, int], Mapping[str, Any]]] = {}
+_snapshots_lock = threading.Lock()
+_default_path: Optional[Path] = None
+
+
+def _find_settings_path() -> Optional[Path]:
+    """查找默认的 setting.json（找到后记住路径，文件被删除时重新查找）"""
+    global _default_path
+    if _default_path is not None and _default_path.exists():
+        return _default_path
+    
+    # 尝试多个可能的路径
+    possible_paths = [
+        Path("setting.json"),
+        Path(__file__).parent.parent / "setting.json",
+        Path.cwd() / "setting.json"
+    ]
+    for path in possible_paths:
+        if path.exists():
+            _default_path = path.absolute()
+            return _default_path
+    return None
+
+
+def get_settings(json_path: Optional[str] = None) -> Mapping[str, Any]:
+    """
+    获取进程内共享的只读配置快照
+    
+    首次调用时解析 setting.json，之后只有文件的修改时间或大小变化才会重新解析，
+    其余调用只需一次 stat；文件正在被改写导致解析失败时继续使用上一份快照
+    
+    Args:
+        json_path: JSON 文件路径，如果为 None 则自动查找 setting.json
+        
+    Returns:
+        只读配置映射，未找到配置文件时为空映射
+    """
+    path = Path(json_path) if json_path is not None else _find_settings_path()
+    if path is None:
+        return _EMPTY_SETTINGS
+    
+    try:
+        stat = path.stat()
+    except OSError:
+        return _EMPTY_SETTINGS
+    
+    key = str(path.absolute())
+    version = (stat.st_mtime_ns, stat.st_size)
+    with _snapshots_lock:
+        cached = _snapshots.get(key)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+    
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            settings = MappingProxyType(json.load(f))
+    except ValueError:
+        if cached is not None:
+            return cached[1]
+        raise
+    
+    with _snapshots_lock:
+        _snapshots[key] = (version, settings)
+    return settings
 
 
 def load_settings_from_json(json_path: Optional[str] = None) -> Dict[str, Any]:
@@ -17,31 +88,18 @@ def load_settings_from_json(json_path: Optional[str] = None) -> Dict[str, Any]:
         json_path: JSON 文件路径，如果为 None 则自动查找 setting.json
         
     Returns:
-        配置字典
+        配置字典（共享快照的副本，可自由修改）
     """
     if json_path is None:
-        # 尝试多个可能的路径
-        possible_paths = [
-            Path("setting.json"),
-            Path(__file__).parent.parent / "setting.json",
-            Path.cwd() / "setting.json"
-        ]
-        
-        for path in possible_paths:
-            if path.exists():
-                json_path = str(path)
-                break
-        else:
+        path = _find_settings_path()
+        if path is None:
             raise FileNotFoundError("未找到 setting.json 文件")
+    else:
+        path = Path(json_path)
+        if not path.exists():
+            raise FileNotFoundError(f"配置文件不存在: {path}")
     
-    json_path = Path(json_path)
-    if not json_path.exists():
-        raise FileNotFoundError(f"配置文件不存在: {json_path}")
-    
-    with open(json_path, 'r', encoding='utf-8') as f:
-        settings = json.load(f)
-    
-    return settings
+    return dict(get_settings(str(path)))
 
 
 def setup_environment_from_settings(settings: Optional[Dict[str, Any]] = None) -> None:
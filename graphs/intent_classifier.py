@@ -0,0 +1,165 @@
+"""
+本地意图分类器
+在调用LLM之前用关键词表（tools.vocabulary）快速识别意图：能确定的直接返回，模糊的再交给LLM
+"""
+
+import re
+import unicodedata
+from typing import Any, Dict, Iterable, List, Optional
+
+from config.logging_config import get_logger
+from tools.vocabulary import KeywordMatcher, Vocabulary, get_vocabulary
+
+logger = get_logger(__name__)
+
+
+# 表明用户在要音乐（没有这类词的输入多半是闲聊，交给LLM）
+_MUSIC_CUE_RE = re.compile(r"音乐|歌|曲|听|推荐|来点|来首|来几首|放点|bgm|music|song", re.IGNORECASE)
+
+# 交给LLM处理的信号：歌单（需要细分 create_playlist_*）、相似推荐（需要抽取歌曲）、否定、提问
+_PLAYLIST_CUE_RE = re.compile(r"歌单|播放列表|playlist", re.IGNORECASE)
+_FAVORITES_CUE_RE = re.compile(r"类似|相似|差不多|像.+一样|风格接近")
+_NEGATION_RE = re.compile(r"不要|别|不想|不喜欢|除了")
+_QUESTION_RE = re.compile(r"为什么|什么是|是什么|怎么|如何|介绍|历史|是谁|吗|[?？]")
+
+# 搜索句式：搜索/查找 + 搜索词
+_SEARCH_RE = re.compile(
+    r"^(?:请|帮我|给我)?(?:搜索|搜一下|查找|查一下|找一下|找找)\s*(?P<query>.+)$"
+)
+_SEARCH_SUFFIX_RE = re.compile(r"(?:的)?(?:这首歌|歌曲|歌|音乐)$")
+
+
+def _normalize(text: str) -> str:
+    """全角转半角并统一大小写"""
+    return unicodedata.normalize("NFKC", text or "").strip().lower()
+
+
+def _find(matcher: Optional[KeywordMatcher], text: str, canonical: Dict[str, str]) -> List[str]:
+    """返回文本中命中的标准词（按出现顺序去重）"""
+    if matcher is None:
+        return []
+    hits: List[str] = []
+    for keyword in matcher.find(text):
+        word = canonical[keyword]
+        if word not in hits:
+            hits.append(word)
+    return hits
+
+
+class IntentClassifier:
+    """基于关键词表的意图分类器（LLM 意图分析的快速路径）"""
+
+    def __init__(self, artists: Optional[Iterable[str]] = None, vocabulary: Optional[Vocabulary] = None):
+        """
+        初始化分类器
+
+        Args:
+            artists: 已知艺术家名单，用于识别"某某的歌"这类按艺术家推荐的请求
+            vocabulary: 心情/活动/流派词表，默认使用共享词表
+        """
+        self._vocabulary = vocabulary or get_vocabulary()
+        self._artists = {a.lower(): a for a in (artists or []) if a}
+        self._artist_matcher = KeywordMatcher(self._artists) if self._artists else None
+
+        self.fast_path_count = 0
+        self.fallback_count = 0
+        self.intent_counts: Dict[str, int] = {}
+
+    def classify(self, user_input: str) -> Optional[Dict[str, Any]]:
+        """
+        尝试在本地识别意图
+
+        Args:
+            user_input: 用户输入
+
+        Returns:
+            与 MUSIC_INTENT_ANALYZER_PROMPT 输出相同结构的字典
+            {"intent_type", "parameters", "context"}；无法确定时返回 None
+        """
+        intent = self._classify(user_input)
+        if intent is None:
+            self.fallback_count += 1
+        else:
+            self.fast_path_count += 1
+            intent_type = intent["intent_type"]
+            self.intent_counts[intent_type] = self.intent_counts.get(intent_type, 0) + 1
+            logger.debug(f"意图快速识别: {intent_type} {intent['parameters']}")
+        return intent
+
+    def _classify(self, user_input: str) -> Optional[Dict[str, Any]]:
+        text = _normalize(user_input)
+        if not text:
+            return None
+
+        # 搜索句式优先（"搜索晴天" 不需要音乐提示词）；搜索词保留原始大小写
+        search = _SEARCH_RE.match(unicodedata.normalize("NFKC", user_input).strip())
+        if search:
+            query = _SEARCH_SUFFIX_RE.sub("", search.group("query").strip()).strip()
+            # "找找适合运动的歌" 这类其实是推荐请求，交给LLM判断
+            if query and not _QUESTION_RE.search(query):
+                hits = self._vocabulary.scan(query.lower())
+                if hits["mood"] or hits["activity"]:
+                    return None
+                genres = hits["genre"]
+                parameters: Dict[str, Any] = {"query": query}
+                if genres:
+                    parameters["genre"] = genres[0]
+                return self._result("search", parameters, user_input)
+            return None
+
+        if not _MUSIC_CUE_RE.search(text):
+            return None
+        if (
+            _PLAYLIST_CUE_RE.search(text)
+            or _FAVORITES_CUE_RE.search(text)
+            or _NEGATION_RE.search(text)
+            or _QUESTION_RE.search(text)
+        ):
+            return None
+
+        hits = self._vocabulary.scan(text)
+        moods, activities, genres = hits["mood"], hits["activity"], hits["genre"]
+        artists = _find(self._artist_matcher, text, self._artists)
+
+        # 只命中一类信号时才认为是确定的；多类混合（如 "开车时听点悲伤的"）交给LLM
+        if artists:
+            if len(artists) == 1 and not (moods or activities or genres):
+                return self._result("recommend_by_artist", {"artist": artists[0]}, user_input)
+            return None
+
+        if activities:
+            # "运动"、"学习" 同时出现在两张表里，心情词全部被活动词覆盖时按活动处理
+            if len(activities) == 1 and set(moods) <= set(activities) and not genres:
+                return self._result("recommend_by_activity", {"activity": activities[0]}, user_input)
+            return None
+
+        if moods:
+            if len(moods) == 1 and not genres:
+                return self._result("recommend_by_mood", {"mood": moods[0]}, user_input)
+            return None
+
+        if genres:
+            if len(genres) == 1:
+                return self._result("recommend_by_genre", {"genre": genres[0]}, user_input)
+            return None
+
+        return None
+
+    @staticmethod
+    def _result(intent_type: str, parameters: Dict[str, Any], user_input: str) -> Dict[str, Any]:
+        return {
+            "intent_type": intent_type,
+            "parameters": parameters,
+            "context": user_input,
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        """返回快速路径命中统计"""
+        total = self.fast_path_count + self.fallback_count
+        return {
+            "total": total,
+            "fast_path": self.fast_path_count,
+            "llm_fallback": self.fallback_count,
+            "fast_path_rate": round(self.fast_path_count / total, 3) if total else 0.0,
+            "by_intent": dict(self.intent_counts),
+        }
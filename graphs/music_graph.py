@@ -3,8 +3,9 @@
 """
 
 import json
+import os
 import re
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 
 from langgraph.graph import StateGraph, END
 from langgraph.graph.state import CompiledStateGraph
@@ -13,6 +14,9 @@ from config.logging_config import get_logger
 from llms.siliconflow_llm import get_chat_model
 from schemas.music_state import MusicAgentState
 from tools.music_tools import get_music_search_tool, get_music_recommender
+from tools.cache import create_cache, normalize_query
+from tools.task_plan import TaskPlan
+from graphs.intent_classifier import IntentClassifier
 from prompts.music_prompts import (
     MUSIC_INTENT_ANALYZER_PROMPT,
     MUSIC_RECOMMENDATION_EXPLAINER_PROMPT,
@@ -32,6 +36,36 @@ def get_llm():
     return _llm
 
 
+# 以流式方式调用LLM的节点，其 token 会通过 astream_events 实时转发给前端
+STREAMING_NODES = ("generate_explanation", "general_chat")
+
+# 工作流节点 → 进度提示文案（流式接口在节点开始时展示）
+NODE_LABELS: Dict[str, str] = {
+    "analyze_intent": "正在理解你的需求...",
+    "search_songs": "正在搜索歌曲...",
+    "generate_recommendations": "正在生成推荐...",
+    "analyze_user_preferences": "正在分析你的音乐偏好...",
+    "enhanced_recommendations": "正在结合你的偏好生成推荐...",
+    "create_playlist": "正在创建 Spotify 播放列表...",
+    "general_chat": "正在组织回复...",
+    "generate_explanation": "正在撰写推荐理由...",
+}
+
+
+async def _astream_llm_text(prompt: str) -> str:
+    """
+    以流式方式调用LLM并返回完整文本
+    
+    使用 astream 逐块生成，外层通过 astream_events 运行图时即可实时拿到每个 token；
+    普通 ainvoke 运行图时行为与一次性调用一致
+    """
+    chunks = []
+    async for chunk in get_llm().astream(prompt):
+        if chunk.content:
+            chunks.append(chunk.content)
+    return "".join(chunks)
+
+
 def _clean_json_from_llm(llm_output: str) -> str:
     """从LLM的输出中提取并清理JSON字符串"""
     match = re.search(r"```(?:json)?(.*)```", llm_output, re.DOTALL)
@@ -43,9 +77,72 @@ def _clean_json_from_llm(llm_output: str) -> str:
 class MusicRecommendationGraph:
     """音乐推荐工作流图"""
     
-    def __init__(self):
+    def __init__(
+        self,
+        intent_classifier: Optional[IntentClassifier] = None,
+        intent_cache: Optional[Any] = None
+    ):
+        """
+        初始化工作流图
+        
+        Args:
+            intent_classifier: 意图快速分类器，为 None 时按本地曲库的艺术家构建默认实例；
+                设置环境变量 INTENT_FAST_PATH=false 可关闭快速路径
+            intent_cache: LLM 意图分析结果缓存（实现 get/set/stats 接口，见 tools/cache.py），
+                为 None 时按 INTENT_CACHE_* 环境变量创建
+        """
+        if intent_classifier is None and os.getenv("INTENT_FAST_PATH", "true").lower() != "false":
+            intent_classifier = self._build_default_classifier()
+        self.intent_classifier = intent_classifier
+        if intent_cache is None:
+            intent_cache = create_cache("intent", max_entries=1024, ttl=86400)
+        self.intent_cache = intent_cache
         self.workflow = self._build_graph()
     
+    @staticmethod
+    def _build_default_classifier() -> IntentClassifier:
+        """构建默认的意图分类器（艺术家名单取自本地曲库）"""
+        try:
+            artists = get_music_search_tool().catalog.artists()
+        except Exception as e:
+            logger.warning(f"加载艺术家名单失败，意图快速路径不识别艺术家: {str(e)}")
+            artists = set()
+        return IntentClassifier(artists=artists)
+    
+    def get_intent_stats(self) -> Dict[str, Any]:
+        """获取意图快速路径与意图缓存的命中统计"""
+        return {
+            "fast_path": (
+                {"enabled": True, **self.intent_classifier.stats()}
+                if self.intent_classifier else {"enabled": False}
+            ),
+            "cache": (
+                {"enabled": True, **self.intent_cache.stats()}
+                if self.intent_cache else {"enabled": False}
+            ),
+        }
+    
+    async def _analyze_intent_with_llm(self, user_input: str) -> Dict[str, Any]:
+        """调用LLM分析意图，结果按规范化后的查询缓存"""
+        cache_key = normalize_query(user_input)
+        if self.intent_cache is not None:
+            found, intent_data = self.intent_cache.get(cache_key)
+            if found:
+                logger.info(f"意图缓存命中: {intent_data.get('intent_type')}")
+                return intent_data
+        
+        # 调用LLM分析意图
+        prompt = MUSIC_INTENT_ANALYZER_PROMPT.format(user_input=user_input)
+        response = await get_llm().ainvoke(prompt)
+        
+        # 解析JSON响应（解析失败会抛出 JSONDecodeError，不写入缓存）
+        cleaned_json = _clean_json_from_llm(response.content)
+        intent_data = json.loads(cleaned_json)
+        
+        if self.intent_cache is not None:
+            self.intent_cache.set(cache_key, intent_data)
+        return intent_data
+    
     def get_app(self) -> CompiledStateGraph:
         """获取编译后的应用"""
         return self.workflow
@@ -60,15 +157,14 @@ class MusicRecommendationGraph:
         user_input = state.get("input", "")
         
         try:
-            # 调用LLM分析意图
-            prompt = MUSIC_INTENT_ANALYZER_PROMPT.format(user_input=user_input)
-            response = await get_llm().ainvoke(prompt)
-            
-            # 解析JSON响应
-            cleaned_json = _clean_json_from_llm(response.content)
-            intent_data = json.loads(cleaned_json)
+            # 先走本地关键词快速路径，无法确定时再调用LLM
+            intent_data = self.intent_classifier.classify(user_input) if self.intent_classifier else None
             
-            logger.info(f"识别到意图类型: {intent_data.get('intent_type')}")
+            if intent_data is None:
+                intent_data = await self._analyze_intent_with_llm(user_input)
+                logger.info(f"识别到意图类型: {intent_data.get('intent_type')}")
+            else:
+                logger.info(f"快速识别到意图类型: {intent_data.get('intent_type')}")
             
             return {
                 "intent_type": intent_data.get("intent_type", "general_chat"),
@@ -250,12 +346,12 @@ class MusicRecommendationGraph:
                 chat_history=history_text,
                 user_message=user_message
             )
-            response = await get_llm().ainvoke(prompt)
+            response_text = await _astream_llm_text(prompt)
             
             logger.info("生成聊天回复")
             
             return {
-                "final_response": response.content,
+                "final_response": response_text,
                 "step_count": state.get("step_count", 0) + 1
             }
             
@@ -306,9 +402,7 @@ class MusicRecommendationGraph:
                 user_query=user_query,
                 recommended_songs=songs_text
             )
-            response = await get_llm().ainvoke(prompt)
-            
-            explanation = response.content
+            explanation = await _astream_llm_text(prompt)
             
             # 检查是否有播放列表
             playlist = state.get("playlist")
@@ -358,9 +452,13 @@ class MusicRecommendationGraph:
             
             adapter = get_mcp_adapter()
             
-            # 获取用户数据
-            top_tracks = await adapter.get_user_top_tracks(limit=20)
-            top_artists = await adapter.get_user_top_artists(limit=20)
+            # 获取用户数据（热门歌曲与热门艺术家互不依赖，并发请求）
+            plan = TaskPlan("analyze_user_preferences")
+            plan.add("top_tracks", lambda: adapter.get_user_top_tracks(limit=20), default=[])
+            plan.add("top_artists", lambda: adapter.get_user_top_artists(limit=20), default=[])
+            results = await plan.run()
+            top_tracks = results["top_tracks"]
+            top_artists = results["top_artists"]
             
             # 分析偏好（简单实现）
             favorite_artists = [artist.name for artist in top_artists[:10]]
@@ -3,6 +3,7 @@ LLM基类定义
 提供统一的LLM接口
 """
 
+import asyncio
 from abc import ABC, abstractmethod
 from typing import Optional, Dict, Any
 
@@ -41,6 +42,23 @@ class BaseLLM(ABC):
         """
         pass
     
+    async def ainvoke(self, system_prompt: str, user_prompt: str, **kwargs) -> str:
+        """
+        异步调用LLM生成回复
+        
+        默认实现把同步的 invoke 放到线程中执行，避免阻塞事件循环；
+        有原生异步客户端的子类应覆盖此方法
+        
+        Args:
+            system_prompt: 系统提示词
+            user_prompt: 用户输入
+            **kwargs: 其他参数
+            
+        Returns:
+            LLM生成的回复文本
+        """
+        return await asyncio.to_thread(self.invoke, system_prompt, user_prompt, **kwargs)
+    
     def validate_response(self, response: str) -> str:
         """
         验证和清理响应
@@ -3,13 +3,109 @@
 使用硅基流动API进行文本生成
 """
 
+import asyncio
 import os
-from typing import Optional, Dict, Any
-from openai import OpenAI
+import threading
+import weakref
+from typing import Optional, Dict, Any, Tuple
+
+import httpx
+from openai import AsyncOpenAI, OpenAI
 from langchain_openai import ChatOpenAI
+from config.settings_loader import get_settings
 from .base import BaseLLM
 
 
+DEFAULT_BASE_URL = "https://api.siliconflow.cn/v1"
+DEFAULT_MODEL = "deepseek-ai/DeepSeek-V3"
+
+# 同时在途的异步请求上限，可通过环境变量 SILICONFLOW_MAX_CONCURRENCY 调整
+DEFAULT_MAX_IN_FLIGHT = 8
+# 空闲的 keep-alive 连接保留时间（秒）
+KEEPALIVE_EXPIRY = 60.0
+
+# 同步客户端按 (api_key, base_url) 进程内共享，复用底层连接池
+_sync_clients: Dict[Tuple[str, str], OpenAI] = {}
+_sync_clients_lock = threading.Lock()
+
+# 异步客户端与并发信号量按事件循环分别维护：
+# httpx 的连接池和 asyncio.Semaphore 都只能在创建它们的事件循环中使用
+_async_pools: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[Tuple[str, str], Tuple[AsyncOpenAI, asyncio.Semaphore]]]" = weakref.WeakKeyDictionary()
+
+
+def _setting(key: str) -> Any:
+    """从共享的 setting.json 快照中读取配置项，读取失败时返回 None"""
+    try:
+        return get_settings().get(key)
+    except Exception:
+        return None
+
+
+def _resolve_api_key() -> str:
+    """API Key：环境变量优先，其次 setting.json"""
+    api_key = os.getenv("SILICONFLOW_API_KEY") or _setting("SILICONFLOW_API_KEY")
+    if not api_key:
+        raise ValueError("硅基流动API Key未找到！请设置SILICONFLOW_API_KEY环境变量或在setting.json中配置")
+    return api_key
+
+
+def _resolve_base_url() -> str:
+    """base_url：环境变量中为非默认值时优先，否则读取 setting.json，都没有则使用默认值"""
+    base_url = os.getenv("SILICONFLOW_BASE_URL", DEFAULT_BASE_URL)
+    if base_url == DEFAULT_BASE_URL:
+        base_url = _setting("SILICONFLOW_BASE_URL") or base_url
+    return base_url
+
+
+def _resolve_model() -> str:
+    """模型名称：环境变量优先，其次 setting.json，都没有则使用默认值"""
+    return os.getenv("SILICONFLOW_MODEL") or _setting("SILICONFLOW_CHAT_MODEL") or DEFAULT_MODEL
+
+
+def _get_max_in_flight() -> int:
+    """读取异步请求并发上限"""
+    try:
+        return max(1, int(os.getenv("SILICONFLOW_MAX_CONCURRENCY", DEFAULT_MAX_IN_FLIGHT)))
+    except ValueError:
+        return DEFAULT_MAX_IN_FLIGHT
+
+
+def _get_sync_client(api_key: str, base_url: str) -> OpenAI:
+    """获取共享的同步客户端"""
+    key = (api_key, base_url)
+    with _sync_clients_lock:
+        client = _sync_clients.get(key)
+        if client is None:
+            client = OpenAI(api_key=api_key, base_url=base_url)
+            _sync_clients[key] = client
+        return client
+
+
+def _get_async_pool(api_key: str, base_url: str) -> Tuple[AsyncOpenAI, asyncio.Semaphore]:
+    """
+    获取当前事件循环共享的异步客户端和并发信号量
+    
+    连接池大小与并发上限一致，keep-alive 连接在请求之间复用，
+    后续请求不再重复建立 TLS 连接
+    """
+    loop = asyncio.get_running_loop()
+    pools = _async_pools.setdefault(loop, {})
+    key = (api_key, base_url)
+    if key not in pools:
+        max_in_flight = _get_max_in_flight()
+        http_client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=max_in_flight,
+                max_keepalive_connections=max_in_flight,
+                keepalive_expiry=KEEPALIVE_EXPIRY,
+            ),
+            timeout=httpx.Timeout(120.0, connect=10.0),
+        )
+        client = AsyncOpenAI(api_key=api_key, base_url=base_url, http_client=http_client)
+        pools[key] = (client, asyncio.Semaphore(max_in_flight))
+    return pools[key]
+
+
 class SiliconFlowLLM(BaseLLM):
     """硅基流动LLM实现类"""
     
@@ -22,52 +118,40 @@ class SiliconFlowLLM(BaseLLM):
             model_name: 模型名称，默认使用deepseek-chat
         """
         if api_key is None:
-            api_key = os.getenv("SILICONFLOW_API_KEY")
-            # 如果环境变量中没有，尝试从 setting.json 读取
-            if not api_key:
-                try:
-                    from config.settings_loader import load_settings_from_json
-                    settings = load_settings_from_json()
-                    api_key = settings.get("SILICONFLOW_API_KEY")
-                except:
-                    pass
-            if not api_key:
-                raise ValueError("硅基流动API Key未找到！请设置SILICONFLOW_API_KEY环境变量或在setting.json中配置")
+            api_key = _resolve_api_key()
         
         super().__init__(api_key, model_name)
         
-        # 从 setting.json 读取 base_url，如果没有则使用默认值
-        base_url = os.getenv("SILICONFLOW_BASE_URL", "https://api.siliconflow.cn/v1")
-        if base_url == "https://api.siliconflow.cn/v1":
-            try:
-                from config.settings_loader import load_settings_from_json
-                settings = load_settings_from_json()
-                base_url = settings.get("SILICONFLOW_BASE_URL", base_url)
-            except:
-                pass
+        base_url = _resolve_base_url()
         
-        # 初始化OpenAI客户端，使用硅基流动的endpoint
-        self.client = OpenAI(
-            api_key=self.api_key,
-            base_url=base_url
-        )
+        # 使用共享的OpenAI客户端，指向硅基流动的endpoint
+        self.base_url = base_url
+        self.client = _get_sync_client(self.api_key, base_url)
         
         self.default_model = model_name or self.get_default_model()
     
     def get_default_model(self) -> str:
         """获取默认模型名称"""
-        # 优先使用环境变量中的模型配置
-        model = os.getenv("SILICONFLOW_MODEL")
-        if model:
-            return model
-        # 如果没有环境变量，尝试从 setting.json 读取
-        try:
-            from config.settings_loader import load_settings_from_json
-            settings = load_settings_from_json()
-            return settings.get("SILICONFLOW_CHAT_MODEL", "deepseek-ai/DeepSeek-V3")
-        except:
-            # 如果都失败，使用默认值
-            return "deepseek-ai/DeepSeek-V3"
+        return _resolve_model()
+    
+    def _build_params(self, system_prompt: str, user_prompt: str, **kwargs) -> Dict[str, Any]:
+        """构建 chat.completions 请求参数"""
+        return {
+            "model": self.default_model,
+            "messages": [
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_prompt}
+            ],
+            "temperature": kwargs.get("temperature", 0.7),
+            "max_tokens": kwargs.get("max_tokens", 4000),
+            "stream": False
+        }
+    
+    def _extract_content(self, response) -> str:
+        """提取回复内容"""
+        if response.choices and response.choices[0].message:
+            return self.validate_response(response.choices[0].message.content)
+        return ""
     
     def invoke(self, system_prompt: str, user_prompt: str, **kwargs) -> str:
         """
@@ -82,35 +166,42 @@ class SiliconFlowLLM(BaseLLM):
             硅基流动生成的回复文本
         """
         try:
-            # 构建消息
-            messages = [
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt}
-            ]
-            
-            # 设置默认参数
-            params = {
-                "model": self.default_model,
-                "messages": messages,
-                "temperature": kwargs.get("temperature", 0.7),
-                "max_tokens": kwargs.get("max_tokens", 4000),
-                "stream": False
-            }
-            
-            # 调用API
-            response = self.client.chat.completions.create(**params)
-            
-            # 提取回复内容
-            if response.choices and response.choices[0].message:
-                content = response.choices[0].message.content
-                return self.validate_response(content)
-            else:
-                return ""
+            response = self.client.chat.completions.create(
+                **self._build_params(system_prompt, user_prompt, **kwargs)
+            )
+            return self._extract_content(response)
                 
         except Exception as e:
             print(f"硅基流动API调用错误: {str(e)}")
             raise e
     
+    async def ainvoke(self, system_prompt: str, user_prompt: str, **kwargs) -> str:
+        """
+        异步调用硅基流动API生成回复
+        
+        使用进程内共享的异步客户端（keep-alive 连接复用），
+        并通过信号量限制同时在途的请求数
+        
+        Args:
+            system_prompt: 系统提示词
+            user_prompt: 用户输入
+            **kwargs: 其他参数，如temperature、max_tokens等
+            
+        Returns:
+            硅基流动生成的回复文本
+        """
+        client, semaphore = _get_async_pool(self.api_key, self.base_url)
+        try:
+            async with semaphore:
+                response = await client.chat.completions.create(
+                    **self._build_params(system_prompt, user_prompt, **kwargs)
+                )
+            return self._extract_content(response)
+        
+        except Exception as e:
+            print(f"硅基流动API调用错误: {str(e)}")
+            raise e
+    
     def get_model_info(self) -> Dict[str, Any]:
         """
         获取当前模型信息
@@ -121,10 +212,21 @@ class SiliconFlowLLM(BaseLLM):
         return {
             "provider": "SiliconFlow",
             "model": self.default_model,
-            "api_base": "https://api.siliconflow.cn/v1"
+            "api_base": self.base_url
         }
 
 
+_siliconflow_llm: Optional[SiliconFlowLLM] = None
+
+
+def get_siliconflow_llm() -> SiliconFlowLLM:
+    """获取共享的硅基流动LLM实例（单例模式），避免每次调用都重新读取配置和建立连接"""
+    global _siliconflow_llm
+    if _siliconflow_llm is None:
+        _siliconflow_llm = SiliconFlowLLM()
+    return _siliconflow_llm
+
+
 def get_chat_model() -> ChatOpenAI:
     """
     获取LangChain兼容的聊天模型（使用硅基流动）
@@ -132,46 +234,9 @@ def get_chat_model() -> ChatOpenAI:
     Returns:
         ChatOpenAI实例
     """
-    # 优先从环境变量读取 API Key
-    api_key = os.getenv("SILICONFLOW_API_KEY")
-    
-    # 如果环境变量中没有，尝试从 setting.json 读取
-    if not api_key:
-        try:
-            from config.settings_loader import load_settings_from_json
-            settings = load_settings_from_json()
-            api_key = settings.get("SILICONFLOW_API_KEY")
-        except:
-            pass
-    
-    if not api_key:
-        raise ValueError("硅基流动API Key未找到！请设置SILICONFLOW_API_KEY环境变量或在setting.json中配置")
-    
-    # 优先使用环境变量中的模型配置
-    model_name = os.getenv("SILICONFLOW_MODEL")
-    
-    # 如果环境变量中没有，尝试从 setting.json 读取
-    if not model_name:
-        try:
-            from config.settings_loader import load_settings_from_json
-            settings = load_settings_from_json()
-            model_name = settings.get("SILICONFLOW_CHAT_MODEL")
-        except:
-            pass
-    
-    # 如果还是没有，使用默认值
-    if not model_name:
-        model_name = "deepseek-ai/DeepSeek-V3"
-    
-    # 从 setting.json 读取 base_url，如果没有则使用默认值
-    base_url = os.getenv("SILICONFLOW_BASE_URL", "https://api.siliconflow.cn/v1")
-    if base_url == "https://api.siliconflow.cn/v1":
-        try:
-            from config.settings_loader import load_settings_from_json
-            settings = load_settings_from_json()
-            base_url = settings.get("SILICONFLOW_BASE_URL", base_url)
-        except:
-            pass
+    api_key = _resolve_api_key()
+    model_name = _resolve_model()
+    base_url = _resolve_base_url()
     
     return ChatOpenAI(
         api_key=api_key,
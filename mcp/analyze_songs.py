@@ -407,10 +407,15 @@ async def run_all_analyses(songs):
     print("  RUNNING ALL COLLECTION ANALYSES")
     print("=" * 70)
 
-    await tool_1_explicitness(songs)
-    await tool_2_diversity(songs)
-    await tool_3_genres(songs)
-    await tool_4_top_artists(songs)
+    # Resolve every song once and share the result across all analyses
+    async with server.shared_collection(songs) as tracks:
+        found = sum(1 for track in tracks if track)
+        print(f"\n[OK] Resolved {found}/{len(songs)} songs on Spotify")
+
+        await tool_1_explicitness(songs)
+        await tool_2_diversity(songs)
+        await tool_3_genres(songs)
+        await tool_4_top_artists(songs)
 
 async def main():
     """Main function"""
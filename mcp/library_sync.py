@@ -0,0 +1,285 @@
+"""
+Incremental Saved-Library Sync
+
+Keeps a local copy of the IDs in the user's saved-tracks library so "is this
+track saved?" is an O(1) set lookup instead of paging through the whole
+library on every call.
+
+- The first sync (and any resync) reads the first page to learn the total,
+  then fetches every remaining offset page concurrently
+  (LIBRARY_SYNC_CONCURRENCY threads, default: 8)
+- Later syncs walk the library newest-first and stop at the first item older
+  than the newest saved-at timestamp already known - usually one request
+- If Spotify's reported total no longer matches the number of library items
+  known locally afterwards (a track was removed), the next step is a full
+  resync. Local/unavailable items have no track ID and are not in the ID
+  set, but they count towards the total, so the item count is tracked
+  separately from the set
+- IDs and timestamps are persisted to SQLite (LIBRARY_SYNC_PATH), so a
+  restart only needs an incremental sync
+"""
+
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, FrozenSet, List, Optional, Tuple
+
+from sqlite_lru import connect
+
+DEFAULT_LIBRARY_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "library_sync.sqlite3")
+
+# Saved-tracks endpoint maximum page size
+PAGE_SIZE = 50
+
+logger = logging.getLogger("music-server.library-sync")
+
+
+def _page_entries(page: Dict[str, Any]) -> List[Tuple[Optional[str], str]]:
+    """(track_id, added_at) pairs of every item on a saved-tracks page (track_id None for local/unavailable tracks)."""
+    return [
+        ((item.get("track") or {}).get("id") or None, item.get("added_at") or "")
+        for item in page.get("items") or []
+    ]
+
+
+class LibrarySync:
+    """Local, incrementally synced set of the authorized user's saved track IDs."""
+
+    def __init__(
+        self,
+        client_factory: Callable[[], Any],
+        path: Optional[str] = None,
+        concurrency: Optional[int] = None,
+    ):
+        """
+        Args:
+            client_factory: returns a user-authorized spotipy client
+            path: SQLite file (default: LIBRARY_SYNC_PATH or mcp/library_sync.sqlite3)
+            concurrency: parallel page fetches during a full sync (default: LIBRARY_SYNC_CONCURRENCY)
+        """
+        self.client_factory = client_factory
+        self.path = path or os.environ.get("LIBRARY_SYNC_PATH", DEFAULT_LIBRARY_PATH)
+        self.concurrency = max(1, concurrency or int(os.environ.get("LIBRARY_SYNC_CONCURRENCY", "8")))
+        self.full_syncs = 0
+        self.incremental_syncs = 0
+        self.pages_fetched = 0
+        self._user_id: Optional[str] = None
+        self._track_ids: Optional[set] = None
+        self._newest_added_at = ""
+        # Library items known locally, including ones without a track ID (compared with Spotify's total)
+        self._item_count = 0
+        self._synced_at = 0.0
+        self._needs_full_sync = False
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+        self._conn = connect(self.path)
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS library_tracks (
+                user_id TEXT NOT NULL,
+                track_id TEXT NOT NULL,
+                added_at TEXT NOT NULL,
+                PRIMARY KEY (user_id, track_id)
+            )
+            """
+        )
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS library_state (
+                user_id TEXT PRIMARY KEY,
+                newest_added_at TEXT NOT NULL,
+                synced_at REAL NOT NULL,
+                item_count INTEGER NOT NULL DEFAULT 0
+            )
+            """
+        )
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(library_state)")}
+        if "item_count" not in columns:
+            # Files written before item_count existed; 0 forces one resync
+            self._conn.execute("ALTER TABLE library_state ADD COLUMN item_count INTEGER NOT NULL DEFAULT 0")
+        self._conn.commit()
+
+    # ------------------------------------------------------------------ #
+    # Membership
+    # ------------------------------------------------------------------ #
+    def __contains__(self, track_id: str) -> bool:
+        return track_id in (self._track_ids or ())
+
+    def __len__(self) -> int:
+        return len(self._track_ids or ())
+
+    def track_ids(self) -> FrozenSet[str]:
+        """Snapshot of the locally known saved track IDs (no network call)."""
+        return frozenset(self._track_ids or ())
+
+    @property
+    def age(self) -> float:
+        """Seconds since the last successful sync (inf if never synced)."""
+        return time.time() - self._synced_at if self._synced_at else float("inf")
+
+    # ------------------------------------------------------------------ #
+    # Sync
+    # ------------------------------------------------------------------ #
+    def sync(self, max_age: float = 0) -> FrozenSet[str]:
+        """
+        Bring the local set up to date and return it.
+
+        Args:
+            max_age: skip the sync if the last one finished less than this many seconds ago
+        """
+        with self._sync_lock:
+            sp = self.client_factory()
+            if self._user_id is None:
+                self._user_id = sp.current_user()["id"]
+                self._load()
+            if self.age < max_age:
+                return self.track_ids()
+
+            if self._track_ids is None or self._needs_full_sync:
+                self._full_sync(sp)
+            else:
+                total = self._incremental_sync(sp)
+                if total is not None and total != self._item_count:
+                    logger.info(
+                        f"Saved library total {total} != {self._item_count} known items, resyncing"
+                    )
+                    self._full_sync(sp)
+            return self.track_ids()
+
+    def _fetch_page(self, sp, offset: int) -> Dict[str, Any]:
+        self.pages_fetched += 1
+        return sp.current_user_saved_tracks(limit=PAGE_SIZE, offset=offset)
+
+    def _full_sync(self, sp) -> None:
+        """Fetch every page (all but the first concurrently) and replace the local set."""
+        started_at = time.perf_counter()
+        first = self._fetch_page(sp, 0)
+        entries = _page_entries(first)
+        total = first.get("total") or 0
+        offsets = range(PAGE_SIZE, total, PAGE_SIZE)
+        if offsets:
+            with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="library-sync") as pool:
+                for page in pool.map(lambda offset: self._fetch_page(sp, offset), offsets):
+                    entries.extend(_page_entries(page))
+
+        added_at_by_id = {track_id: added_at for track_id, added_at in entries if track_id}
+        newest = max((added_at for _, added_at in entries), default="")
+        with self._lock:
+            self._conn.execute("DELETE FROM library_tracks WHERE user_id = ?", (self._user_id,))
+            self._conn.executemany(
+                "INSERT INTO library_tracks (user_id, track_id, added_at) VALUES (?, ?, ?)",
+                [(self._user_id, track_id, added_at) for track_id, added_at in added_at_by_id.items()],
+            )
+            self._save_state_locked(newest, len(entries))
+            self._conn.commit()
+        self._track_ids = set(added_at_by_id)
+        self._newest_added_at = newest
+        self._needs_full_sync = False
+        self.full_syncs += 1
+        logger.info(
+            f"Full library sync: {len(self._track_ids)} tracks, {len(offsets) + 1} pages "
+            f"in {time.perf_counter() - started_at:.2f}s"
+        )
+
+    def _incremental_sync(self, sp) -> Optional[int]:
+        """
+        Fetch items saved since the newest known saved-at timestamp.
+
+        The endpoint returns the library newest-first, so paging stops at the
+        first item older than what is already known.
+
+        Returns:
+            Spotify's reported library total, for the consistency check.
+        """
+        new_entries: List[Tuple[Optional[str], str]] = []
+        offset = 0
+        total = None
+        while True:
+            page = self._fetch_page(sp, offset)
+            total = page.get("total")
+            entries = _page_entries(page)
+            done = len(entries) < PAGE_SIZE
+            for track_id, added_at in entries:
+                if added_at < self._newest_added_at or (
+                    added_at == self._newest_added_at and (track_id is None or track_id in self._track_ids)
+                ):
+                    done = True
+                    break
+                new_entries.append((track_id, added_at))
+            if done:
+                break
+            offset += PAGE_SIZE
+
+        new_items = [(track_id, added_at) for track_id, added_at in new_entries if track_id]
+        # Re-saved tracks move to the top of the library without changing its size
+        item_count = self._item_count + sum(
+            1 for track_id, _ in new_entries if track_id not in self._track_ids
+        )
+        newest = max([self._newest_added_at] + [added_at for _, added_at in new_entries])
+        with self._lock:
+            if new_items:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO library_tracks (user_id, track_id, added_at) VALUES (?, ?, ?)",
+                    [(self._user_id, track_id, added_at) for track_id, added_at in new_items],
+                )
+            self._save_state_locked(newest, item_count)
+            self._conn.commit()
+        self._track_ids.update(track_id for track_id, _ in new_items)
+        self._newest_added_at = newest
+        self.incremental_syncs += 1
+        if new_items:
+            logger.info(f"Incremental library sync: {len(new_items)} new tracks")
+        return total
+
+    def _save_state_locked(self, newest: str, item_count: int) -> None:
+        self._synced_at = time.time()
+        self._item_count = item_count
+        self._conn.execute(
+            "INSERT OR REPLACE INTO library_state (user_id, newest_added_at, synced_at, item_count) "
+            "VALUES (?, ?, ?, ?)",
+            (self._user_id, newest, self._synced_at, item_count),
+        )
+
+    def _load(self) -> None:
+        """Load the persisted set for the current user, if any."""
+        with self._lock:
+            state = self._conn.execute(
+                "SELECT newest_added_at, synced_at, item_count FROM library_state WHERE user_id = ?",
+                (self._user_id,),
+            ).fetchone()
+            if state is None:
+                return
+            rows = self._conn.execute(
+                "SELECT track_id FROM library_tracks WHERE user_id = ?", (self._user_id,)
+            ).fetchall()
+        self._track_ids = {row[0] for row in rows}
+        self._newest_added_at, self._synced_at, self._item_count = state
+
+    def resync(self) -> FrozenSet[str]:
+        """Force a full resync on the next sync() and run it."""
+        self._needs_full_sync = True
+        return self.sync()
+
+    def clear(self) -> None:
+        """Drop the local library copy; the next sync is a full one."""
+        with self._sync_lock, self._lock:
+            self._conn.execute("DELETE FROM library_tracks")
+            self._conn.execute("DELETE FROM library_state")
+            self._conn.commit()
+            self._user_id = None
+            self._track_ids = None
+            self._newest_added_at = ""
+            self._item_count = 0
+            self._synced_at = 0.0
+
+    def stats(self) -> Dict[str, Any]:
+        """Return the local set size and sync counters."""
+        return {
+            "tracks": len(self),
+            "full_syncs": self.full_syncs,
+            "incremental_syncs": self.incremental_syncs,
+            "pages_fetched": self.pages_fetched,
+            "age_seconds": round(self.age) if self._synced_at else None,
+        }
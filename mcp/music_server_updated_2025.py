@@ -12,6 +12,9 @@ WHAT CHANGED IN 2025:
 - Improved error handling for batch requests
 """
 
+import asyncio
+import contextlib
+import contextvars
 import os
 import json
 import logging
@@ -19,7 +22,9 @@ from typing import Any, Sequence
 from datetime import datetime
 from dotenv import load_dotenv
 
+import requests
 import spotipy
+from requests.adapters import HTTPAdapter
 from spotipy.oauth2 import SpotifyOAuth, SpotifyClientCredentials
 
 # Load environment variables from .env file
@@ -36,6 +41,10 @@ from mcp.types import (
 from pydantic import AnyUrl
 import mcp.server.stdio
 
+from track_cache import TrackResolutionCache, make_key
+from user_profile import UserProfileStore, fetch_profile, fetch_saved_track_ids
+from library_sync import LibrarySync
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("music-server")
@@ -44,6 +53,19 @@ logger = logging.getLogger("music-server")
 _spotify_client_oauth = None
 _spotify_client_cc = None
 
+
+def _pooled_session():
+    """
+    Build a keep-alive HTTP session whose connection pool is large enough for
+    concurrent callers (e.g. the API server's Spotify worker threads).
+    Pool size can be tuned with SPOTIFY_POOL_SIZE (default: 16).
+    """
+    pool_size = int(os.environ.get("SPOTIFY_POOL_SIZE", "16"))
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    return session
+
 def get_spotify_client(require_user_auth=False):
     """
     Initialize and return authenticated Spotify client (lazy initialization).
@@ -64,20 +86,26 @@ def get_spotify_client(require_user_auth=False):
         # Use OAuth for user-specific operations
         if _spotify_client_oauth is None:
             scope = "user-library-read user-top-read playlist-read-private playlist-modify-public playlist-modify-private"
-            _spotify_client_oauth = spotipy.Spotify(auth_manager=SpotifyOAuth(
-                client_id=os.environ["SPOTIFY_CLIENT_ID"],
-                client_secret=os.environ["SPOTIFY_CLIENT_SECRET"],
-                redirect_uri="http://127.0.0.1:8888/callback",
-                scope=scope
-            ))
+            _spotify_client_oauth = spotipy.Spotify(
+                auth_manager=SpotifyOAuth(
+                    client_id=os.environ["SPOTIFY_CLIENT_ID"],
+                    client_secret=os.environ["SPOTIFY_CLIENT_SECRET"],
+                    redirect_uri="http://127.0.0.1:8888/callback",
+                    scope=scope
+                ),
+                requests_session=_pooled_session()
+            )
         return _spotify_client_oauth
     else:
         # Use Client Credentials for public operations (search, recommendations, etc.)
         if _spotify_client_cc is None:
-            _spotify_client_cc = spotipy.Spotify(auth_manager=SpotifyClientCredentials(
-                client_id=os.environ["SPOTIFY_CLIENT_ID"],
-                client_secret=os.environ["SPOTIFY_CLIENT_SECRET"]
-            ))
+            _spotify_client_cc = spotipy.Spotify(
+                auth_manager=SpotifyClientCredentials(
+                    client_id=os.environ["SPOTIFY_CLIENT_ID"],
+                    client_secret=os.environ["SPOTIFY_CLIENT_SECRET"]
+                ),
+                requests_session=_pooled_session()
+            )
         return _spotify_client_cc
 
 # Initialize MCP server
@@ -89,6 +117,288 @@ def _sp(require_user_auth=False):
     return get_spotify_client(require_user_auth=require_user_auth)
 
 
+# Shared track-resolution cache (lazily opened, see track_cache.py)
+_track_cache = None
+
+def get_track_cache():
+    """Return the shared persistent track-resolution cache, or None if unavailable."""
+    global _track_cache
+    if _track_cache is None:
+        try:
+            _track_cache = TrackResolutionCache()
+        except Exception as e:
+            logger.warning(f"Track cache unavailable, resolving without it: {e}")
+            _track_cache = False
+    return _track_cache or None
+
+
+# Shared saved-library sync (lazily opened, see library_sync.py)
+_library_sync = None
+
+def get_library_sync():
+    """Return the shared incremental saved-library sync, or None if unavailable."""
+    global _library_sync
+    if _library_sync is None:
+        try:
+            _library_sync = LibrarySync(lambda: _sp(require_user_auth=True))
+        except Exception as e:
+            logger.warning(f"Library sync unavailable, paging the saved library live: {e}")
+            _library_sync = False
+    return _library_sync or None
+
+
+# Shared user-profile store (lazily opened, see user_profile.py)
+_profile_store = None
+
+def get_profile_store():
+    """Return the shared user-profile store, or None if unavailable."""
+    global _profile_store
+    if _profile_store is None:
+        try:
+            _profile_store = UserProfileStore(
+                lambda: _sp(require_user_auth=True), library=get_library_sync()
+            )
+        except Exception as e:
+            logger.warning(f"Profile store unavailable, fetching profiles live: {e}")
+            _profile_store = False
+    return _profile_store or None
+
+
+def current_user_profile():
+    """The authorized user's profile: cached snapshot if possible, live fetch otherwise."""
+    store = get_profile_store()
+    if store is not None:
+        return store.current()
+    return fetch_profile(_sp(require_user_auth=True))
+
+
+def _build_track_query(song_name, artist_name=""):
+    """Build the Spotify search query used to resolve a song."""
+    query = song_name
+    if artist_name:
+        query += f" artist:{artist_name}"
+    return query
+
+
+def _resolve_track(song_name, artist_name=""):
+    """
+    Resolve a (song name, artist) pair to its top Spotify search result.
+
+    Checks the persistent track cache first and records the outcome (including
+    "not found") so repeat lookups skip the network. Returns None if not found.
+    """
+    cache = get_track_cache()
+    if cache is not None:
+        found, track = cache.get(song_name, artist_name)
+        if found:
+            return track
+
+    search_results = _sp(require_user_auth=False).search(
+        q=_build_track_query(song_name, artist_name), type="track", limit=1
+    )
+    tracks = search_results["tracks"]["items"]
+    track = tracks[0] if tracks else None
+
+    if cache is not None:
+        cache.set(song_name, artist_name, track)
+    return track
+
+
+# Maximum number of Spotify searches in flight while resolving a collection
+RESOLVE_CONCURRENCY = int(os.environ.get("SPOTIFY_RESOLVE_CONCURRENCY", "8"))
+
+# Resolved-track table shared by every tool call inside a shared_collection() block
+_shared_resolutions = contextvars.ContextVar("shared_resolutions", default=None)
+
+
+async def resolve_songs(songs):
+    """
+    Resolve a collection of {"song_name", "artist_name"} dicts to Spotify tracks.
+
+    Repeated songs (same normalized name and artist) are searched only once, and
+    searches run concurrently, at most RESOLVE_CONCURRENCY at a time. Songs
+    already resolved inside a shared_collection() block are not searched again.
+
+    Returns:
+        A list aligned with songs: the resolved track, or None if not found.
+    """
+    table = _shared_resolutions.get()
+    if table is None:
+        table = {}
+
+    pending = {}
+    for song_data in songs:
+        song_name = song_data["song_name"]
+        artist_name = song_data.get("artist_name", "")
+        key = make_key(song_name, artist_name)
+        if key not in table and key not in pending:
+            pending[key] = (song_name, artist_name)
+
+    if pending:
+        # Initialize the shared client and cache before fanning out to worker threads
+        _sp(require_user_auth=False)
+        get_track_cache()
+        semaphore = asyncio.Semaphore(RESOLVE_CONCURRENCY)
+
+        async def resolve_one(song_name, artist_name):
+            async with semaphore:
+                try:
+                    # Search doesn't require user auth
+                    return await asyncio.to_thread(_resolve_track, song_name, artist_name)
+                except Exception as e:
+                    logger.warning(f"Failed to resolve {_build_track_query(song_name, artist_name)}: {e}")
+                    return None
+
+        results = await asyncio.gather(*(resolve_one(*song) for song in pending.values()))
+        table.update(zip(pending.keys(), results))
+
+    return [
+        table[make_key(song_data["song_name"], song_data.get("artist_name", ""))]
+        for song_data in songs
+    ]
+
+
+async def resolve_collection(songs):
+    """
+    Resolve a collection for the analysis tools.
+
+    Returns:
+        (tracks, errors): the tracks that were found, in input order, and a
+        "Not found" message for every song that could not be resolved.
+    """
+    tracks = []
+    errors = []
+    for song_data, track in zip(songs, await resolve_songs(songs)):
+        if track:
+            tracks.append(track)
+        else:
+            errors.append(
+                f"Not found: {_build_track_query(song_data['song_name'], song_data.get('artist_name', ''))}"
+            )
+    return tracks, errors
+
+
+@contextlib.asynccontextmanager
+async def shared_collection(songs):
+    """
+    Resolve a collection once and reuse the result for every tool call made
+    inside the block, so running several analyses over the same songs costs
+    one resolution pass instead of one per tool.
+
+    Usage:
+        async with shared_collection(songs):
+            await call_tool("analyze_explicitness", {"songs": songs})
+            await call_tool("analyze_genres_in_collection", {"songs": songs})
+    """
+    token = _shared_resolutions.set({})
+    try:
+        tracks = await resolve_songs(songs)
+        yield tracks
+    finally:
+        _shared_resolutions.reset(token)
+
+
+async def _fetch_artists(artist_ids):
+    """
+    Fetch metadata for many artists through the several-artists endpoint,
+    50 IDs per request, instead of one artist() call per artist per track.
+    The batches run concurrently in worker threads, off the event loop.
+
+    Returns:
+        {artist_id: artist} for every artist that could be fetched.
+    """
+    unique_ids = list(dict.fromkeys(artist_id for artist_id in artist_ids if artist_id))
+    batches = [unique_ids[i:i+50] for i in range(0, len(unique_ids), 50)]
+    if not batches:
+        return {}
+    try:
+        # Doesn't require user auth
+        sp = _sp(require_user_auth=False)
+    except Exception as e:
+        logger.warning(f"Failed to fetch {len(unique_ids)} artists: {e}")
+        return {}
+    responses = await asyncio.gather(
+        *(asyncio.to_thread(sp.artists, batch) for batch in batches),
+        return_exceptions=True,
+    )
+    artists_by_id = {}
+    for batch, response in zip(batches, responses):
+        if isinstance(response, Exception):
+            logger.warning(f"Failed to fetch artist batch ({len(batch)} ids): {response}")
+            continue
+        for artist in response.get("artists") or []:
+            if artist and artist.get("id"):
+                artists_by_id[artist["id"]] = artist
+    return artists_by_id
+
+
+# Maximum number of playlist pages in flight while analysing a large playlist
+PLAYLIST_PAGE_CONCURRENCY = int(os.environ.get("PLAYLIST_PAGE_CONCURRENCY", "8"))
+
+# Only the fields analyze_playlist aggregates over
+_PLAYLIST_ITEM_FIELDS = "items(track(popularity,explicit))"
+
+
+async def iter_playlist_items(playlist_id, first_page, failed_offsets=None):
+    """
+    Yield every page of a playlist's items, starting with first_page (the
+    "tracks" paging object embedded in the playlist() response).
+
+    Once the first page has given the total, the remaining pages are fetched
+    concurrently, at most PLAYLIST_PAGE_CONCURRENCY at a time. Pages are
+    yielded as they arrive rather than in playlist order, so only the pages
+    in flight are held in memory. A page that fails is logged, skipped and,
+    if failed_offsets (a list) is given, its offset is appended to it so the
+    caller can report a partial result.
+    """
+    yield first_page["items"]
+
+    limit = first_page.get("limit") or 100
+    offsets = iter(range(limit, first_page.get("total") or 0, limit))
+    sp = _sp(require_user_auth=True)
+
+    def fetch(offset):
+        return sp.playlist_items(playlist_id, fields=_PLAYLIST_ITEM_FIELDS, limit=limit, offset=offset)
+
+    pending = {}
+
+    def schedule():
+        while len(pending) < PLAYLIST_PAGE_CONCURRENCY:
+            offset = next(offsets, None)
+            if offset is None:
+                return
+            pending[asyncio.ensure_future(asyncio.to_thread(fetch, offset))] = offset
+
+    schedule()
+    try:
+        while pending:
+            done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                offset = pending.pop(task)
+                try:
+                    page = task.result()
+                except Exception as e:
+                    logger.warning(f"Failed to fetch playlist page at offset {offset}: {e}")
+                    if failed_offsets is not None:
+                        failed_offsets.append(offset)
+                    continue
+                yield page.get("items") or []
+            schedule()
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+def _artist_genres(track, artists_by_id):
+    """Collect the genres of every artist on a track from a prefetched artist map."""
+    genres = []
+    for artist in track["artists"]:
+        info = artists_by_id.get(artist.get("id"))
+        if info:
+            genres.extend(info.get("genres", []))
+    return genres
+
+
 @app.list_resources()
 async def list_resources() -> list[Resource]:
     """List available music-related resources."""
@@ -480,18 +790,13 @@ async def call_tool(name: str, arguments: Any) -> Sequence[TextContent]:
                 song_name = track_data["song_name"]
                 artist_name = track_data.get("artist_name", "")
 
-                query = song_name
-                if artist_name:
-                    query += f" artist:{artist_name}"
-
-                # Search doesn't require user auth
-                search_results = _sp(require_user_auth=False).search(q=query, type="track", limit=1)
-                tracks = search_results["tracks"]["items"]
+                # Resolve via the persistent track cache - search doesn't require user auth
+                track = _resolve_track(song_name, artist_name)
 
-                if tracks:
-                    track_ids.append(tracks[0]["id"])
+                if track:
+                    track_ids.append(track["id"])
                 else:
-                    track_lookup_errors.append(f"Track not found: {query}")
+                    track_lookup_errors.append(f"Track not found: {_build_track_query(song_name, artist_name)}")
 
             # Look up artist IDs from artist names
             artist_ids = []
@@ -563,25 +868,21 @@ async def call_tool(name: str, arguments: Any) -> Sequence[TextContent]:
 
             # Get playlist details - may require user auth if private
             playlist = _sp(require_user_auth=True).playlist(playlist_id)
-            tracks = playlist["tracks"]["items"]
 
-            # Collect track info
-            track_info = []
+            # Running aggregates over every page of the playlist
+            analyzed = 0
             total_popularity = 0
             explicit_count = 0
+            failed_offsets = []
 
-            for item in tracks:
-                if item["track"]:
-                    track = item["track"]
-                    track_info.append({
-                        "name": track["name"],
-                        "artists": [a["name"] for a in track["artists"]],
-                        "popularity": track["popularity"],
-                        "explicit": track["explicit"]
-                    })
-                    total_popularity += track["popularity"]
-                    if track["explicit"]:
-                        explicit_count += 1
+            async for items in iter_playlist_items(playlist_id, playlist["tracks"], failed_offsets):
+                for item in items:
+                    track = item.get("track")
+                    if track:
+                        analyzed += 1
+                        total_popularity += track.get("popularity") or 0
+                        if track.get("explicit"):
+                            explicit_count += 1
 
             analysis = {
                 "name": playlist["name"],
@@ -590,9 +891,13 @@ async def call_tool(name: str, arguments: Any) -> Sequence[TextContent]:
                 "total_tracks": playlist["tracks"]["total"],
                 "followers": playlist["followers"]["total"],
                 "stats": {
-                    "average_popularity": round(total_popularity / len(track_info), 1) if track_info else 0,
+                    "analyzed_tracks": analyzed,
+                    # Pages that could not be fetched; the stats cover the rest of the playlist
+                    "failed_pages": len(failed_offsets),
+                    "partial": bool(failed_offsets),
+                    "average_popularity": round(total_popularity / analyzed, 1) if analyzed else 0,
                     "explicit_songs": explicit_count,
-                    "explicit_percentage": round((explicit_count / len(track_info) * 100), 1) if track_info else 0
+                    "explicit_percentage": round((explicit_count / analyzed * 100), 1) if analyzed else 0
                 },
                 "external_url": playlist["external_urls"]["spotify"]
             }
@@ -638,27 +943,11 @@ async def call_tool(name: str, arguments: Any) -> Sequence[TextContent]:
             
             explicit_songs = []
             clean_songs = []
-            errors = []
-            
-            for song_data in songs:
-                song_name = song_data["song_name"]
-                artist_name = song_data.get("artist_name", "")
-                
-                # Build search query
-                query = song_name
-                if artist_name:
-                    query += f" artist:{artist_name}"
-                
-                # Search for the song - doesn't require user auth
-                search_results = _sp(require_user_auth=False).search(q=query, type="track", limit=1)
-                tracks = search_results["tracks"]["items"]
-                
-                if not tracks:
-                    errors.append(f"Not found: {query}")
-                    continue
-                
-                track = tracks[0]
-                
+
+            # Resolve the whole collection at once (deduplicated, concurrent)
+            resolved_tracks, errors = await resolve_collection(songs)
+
+            for track in resolved_tracks:
                 song_info = {
                     "name": track["name"],
                     "artists": [a["name"] for a in track["artists"]],
@@ -704,37 +993,20 @@ async def call_tool(name: str, arguments: Any) -> Sequence[TextContent]:
             popularities = []
             release_years = []
             track_info = []
-            errors = []
+
+            # Resolve the whole collection at once (deduplicated, concurrent)
+            resolved_tracks, errors = await resolve_collection(songs)
             
-            for song_data in songs:
-                song_name = song_data["song_name"]
-                artist_name = song_data.get("artist_name", "")
-                
-                # Build search query
-                query = song_name
-                if artist_name:
-                    query += f" artist:{artist_name}"
-                
-                # Search for the song - doesn't require user auth
-                search_results = _sp(require_user_auth=False).search(q=query, type="track", limit=1)
-                tracks = search_results["tracks"]["items"]
-                
-                if not tracks:
-                    errors.append(f"Not found: {query}")
-                    continue
-                
-                track = tracks[0]
-                
-                # Collect artist names
+            # Fetch genres for every artist in the collection in batches of 50
+            artists_by_id = await _fetch_artists(
+                artist["id"] for track in resolved_tracks for artist in track["artists"]
+            )
+            
+            for track in resolved_tracks:
+                # Collect artist names and genres
                 for artist in track["artists"]:
                     all_artists.append(artist["name"])
-                    
-                    # Get artist genres - doesn't require user auth
-                    try:
-                        artist_info = _sp(require_user_auth=False).artist(artist["id"])
-                        all_genres.update(artist_info["genres"])
-                    except:
-                        pass
+                all_genres.update(_artist_genres(track, artists_by_id))
                 
                 # Collect popularity
                 popularities.append(track["popularity"])
@@ -826,27 +1098,11 @@ async def call_tool(name: str, arguments: Any) -> Sequence[TextContent]:
             
             artist_count = {}
             artist_songs = {}
-            errors = []
-            
-            for song_data in songs:
-                song_name = song_data["song_name"]
-                artist_name = song_data.get("artist_name", "")
-                
-                # Build search query
-                query = song_name
-                if artist_name:
-                    query += f" artist:{artist_name}"
-                
-                # Search for the song - doesn't require user auth
-                search_results = _sp(require_user_auth=False).search(q=query, type="track", limit=1)
-                tracks = search_results["tracks"]["items"]
-                
-                if not tracks:
-                    errors.append(f"Not found: {query}")
-                    continue
-                
-                track = tracks[0]
-                
+
+            # Resolve the whole collection at once (deduplicated, concurrent)
+            resolved_tracks, errors = await resolve_collection(songs)
+
+            for track in resolved_tracks:
                 # Count each artist
                 for artist in track["artists"]:
                     artist_name = artist["name"]
@@ -897,48 +1153,22 @@ async def call_tool(name: str, arguments: Any) -> Sequence[TextContent]:
             songs = arguments["songs"]
             
             genre_count = {}
-            artist_genres_map = {}
             track_info = []
-            errors = []
+
+            # Resolve the whole collection at once (deduplicated, concurrent)
+            resolved_tracks, errors = await resolve_collection(songs)
             
-            for song_data in songs:
-                song_name = song_data["song_name"]
-                artist_name = song_data.get("artist_name", "")
-                
-                # Build search query
-                query = song_name
-                if artist_name:
-                    query += f" artist:{artist_name}"
-                
-                # Search for the song - doesn't require user auth
-                search_results = _sp(require_user_auth=False).search(q=query, type="track", limit=1)
-                tracks = search_results["tracks"]["items"]
-                
-                if not tracks:
-                    errors.append(f"Not found: {query}")
-                    continue
-                
-                track = tracks[0]
-                track_genres = []
+            # Fetch genres for every artist in the collection in batches of 50
+            artists_by_id = await _fetch_artists(
+                artist["id"] for track in resolved_tracks for artist in track["artists"]
+            )
+            
+            for track in resolved_tracks:
+                track_genres = _artist_genres(track, artists_by_id)
                 
-                # Get genres from all artists - doesn't require user auth
-                for artist in track["artists"]:
-                    artist_name_key = artist["name"]
-                    
-                    # Cache artist info to avoid duplicate API calls
-                    if artist_name_key not in artist_genres_map:
-                        try:
-                            artist_info = _sp(require_user_auth=False).artist(artist["id"])
-                            artist_genres_map[artist_name_key] = artist_info["genres"]
-                        except:
-                            artist_genres_map[artist_name_key] = []
-                    
-                    artist_genres = artist_genres_map[artist_name_key]
-                    track_genres.extend(artist_genres)
-                    
-                    # Count genres
-                    for genre in artist_genres:
-                        genre_count[genre] = genre_count.get(genre, 0) + 1
+                # Count genres
+                for genre in track_genres:
+                    genre_count[genre] = genre_count.get(genre, 0) + 1
                 
                 track_info.append({
                     "name": track["name"],
@@ -1040,33 +1270,25 @@ async def call_tool(name: str, arguments: Any) -> Sequence[TextContent]:
             found_songs = []
             not_found = []
 
-            for song_data in songs:
-                song_name = song_data["song_name"]
-                artist_name = song_data.get("artist_name", "")
+            # Resolve the whole collection at once (deduplicated, concurrent)
+            tracks = await resolve_songs(songs)
 
-                # Build search query
-                query = song_name
-                if artist_name:
-                    query += f" artist:{artist_name}"
-
-                # Search for the song - doesn't require user auth
-                search_results = _sp(require_user_auth=False).search(q=query, type="track", limit=1)
-                tracks = search_results["tracks"]["items"]
-
-                if tracks:
-                    track = tracks[0]
+            for song_data, track in zip(songs, tracks):
+                if track:
                     track_uris.append(track["uri"])
                     found_songs.append({
                         "name": track["name"],
                         "artists": [a["name"] for a in track["artists"]]
                     })
                 else:
-                    not_found.append(query)
+                    not_found.append(
+                        _build_track_query(song_data["song_name"], song_data.get("artist_name", ""))
+                    )
 
-                # Add tracks to playlist in batches of 100 (Spotify limit) - requires user auth
-                for i in range(0, len(track_uris), 100):
-                    batch = track_uris[i:i+100]
-                    _sp(require_user_auth=True).playlist_add_items(playlist["id"], batch)
+            # Add tracks to playlist in batches of 100 (Spotify limit) - requires user auth
+            for i in range(0, len(track_uris), 100):
+                batch = track_uris[i:i+100]
+                _sp(require_user_auth=True).playlist_add_items(playlist["id"], batch)
 
             result = {
                 "success": True,
@@ -1098,34 +1320,17 @@ async def call_tool(name: str, arguments: Any) -> Sequence[TextContent]:
 
             # First, analyze the collection to understand distribution
             track_data = []
-            errors = []
-
-            for song_data in songs:
-                song_name = song_data["song_name"]
-                artist_name = song_data.get("artist_name", "")
-
-                query = song_name
-                if artist_name:
-                    query += f" artist:{artist_name}"
-
-                # Search doesn't require user auth
-                search_results = _sp(require_user_auth=False).search(q=query, type="track", limit=1)
-                tracks = search_results["tracks"]["items"]
 
-                if not tracks:
-                    errors.append(f"Not found: {query}")
-                    continue
+            # Resolve the whole collection at once (deduplicated, concurrent)
+            resolved_tracks, errors = await resolve_collection(songs)
 
-                track = tracks[0]
+            # Fetch genres for every artist in the collection in batches of 50
+            artists_by_id = await _fetch_artists(
+                artist["id"] for track in resolved_tracks for artist in track["artists"]
+            )
 
-                # Get artist info for genres - doesn't require user auth
-                genres = []
-                for artist in track["artists"]:
-                    try:
-                        artist_info = _sp(require_user_auth=False).artist(artist["id"])
-                        genres.extend(artist_info["genres"])
-                    except:
-                        pass
+            for track in resolved_tracks:
+                genres = _artist_genres(track, artists_by_id)
 
                 # Get release year
                 release_date = track["album"]["release_date"]
@@ -1254,18 +1459,11 @@ async def call_tool(name: str, arguments: Any) -> Sequence[TextContent]:
         elif name == "compare_to_my_taste":
             songs = arguments["songs"]
 
-            # Get user's top tracks and artists - requires user auth
-            top_tracks = _sp(require_user_auth=True).current_user_top_tracks(limit=50, time_range="medium_term")
-            top_artists = _sp(require_user_auth=True).current_user_top_artists(limit=50, time_range="medium_term")
-
-            # Extract user's favorite artists and genres
-            user_artists = set([artist["name"].lower() for artist in top_artists["items"]])
-            user_genres = set()
-            for artist in top_artists["items"]:
-                user_genres.update(artist["genres"])
-
-            # Extract user's top track names for matching
-            user_tracks = set([track["name"].lower() for track in top_tracks["items"]])
+            # User's top tracks and artists (medium term, top 50) from the profile snapshot
+            profile = current_user_profile()
+            user_artists = profile.artist_names
+            user_genres = set(profile.genre_histogram)
+            user_tracks = profile.track_names
 
             # Analyze the input collection
             matching_tracks = []
@@ -1273,26 +1471,16 @@ async def call_tool(name: str, arguments: Any) -> Sequence[TextContent]:
             non_matching_tracks = []
             collection_artists = set()
             collection_genres = set()
-            errors = []
-
-            for song_data in songs:
-                song_name = song_data["song_name"]
-                artist_name = song_data.get("artist_name", "")
 
-                # Build search query
-                query = song_name
-                if artist_name:
-                    query += f" artist:{artist_name}"
+            # Resolve the whole collection at once (deduplicated, concurrent)
+            resolved_tracks, errors = await resolve_collection(songs)
 
-                # Search for the song - doesn't require user auth
-                search_results = _sp(require_user_auth=False).search(q=query, type="track", limit=1)
-                tracks = search_results["tracks"]["items"]
-
-                if not tracks:
-                    errors.append(f"Not found: {query}")
-                    continue
+            # Fetch genres for every artist in the collection in batches of 50
+            artists_by_id = await _fetch_artists(
+                artist["id"] for track in resolved_tracks for artist in track["artists"]
+            )
 
-                track = tracks[0]
+            for track in resolved_tracks:
                 track_artists = [a["name"] for a in track["artists"]]
 
                 # Check if track is in user's top tracks
@@ -1301,14 +1489,8 @@ async def call_tool(name: str, arguments: Any) -> Sequence[TextContent]:
                 # Check if artist is in user's top artists
                 is_favorite_artist = any(a.lower() in user_artists for a in track_artists)
 
-                # Get genres for this track - doesn't require user auth
-                track_genres = []
-                for artist in track["artists"]:
-                    try:
-                        artist_info = _sp(require_user_auth=False).artist(artist["id"])
-                        track_genres.extend(artist_info["genres"])
-                    except:
-                        pass
+                # Get genres for this track from the prefetched artists
+                track_genres = _artist_genres(track, artists_by_id)
 
                 collection_genres.update(track_genres)
                 for artist in track_artists:
@@ -1384,49 +1566,24 @@ async def call_tool(name: str, arguments: Any) -> Sequence[TextContent]:
         elif name == "find_whats_missing":
             songs = arguments["songs"]
 
-            # Get ALL user's saved tracks (may require pagination) - requires user auth
-            saved_tracks_set = set()
-            offset = 0
-            limit = 50
-
-            while True:
-                saved = _sp(require_user_auth=True).current_user_saved_tracks(limit=limit, offset=offset)
-                if not saved["items"]:
-                    break
-
-                for item in saved["items"]:
-                    track = item["track"]
-                    # Create a unique identifier for the track
-                    saved_tracks_set.add(track["id"])
-
-                offset += limit
-                if len(saved["items"]) < limit:
-                    break  # No more tracks
+            # User's saved track IDs - requires user auth. The library sync only
+            # fetches tracks saved since its last run (full parallel sync the first time)
+            library = get_library_sync()
+            if library is not None:
+                saved_tracks_set = await asyncio.to_thread(library.sync)
+            else:
+                saved_tracks_set = set(
+                    await asyncio.to_thread(fetch_saved_track_ids, _sp(require_user_auth=True))
+                )
 
             # Check which songs from the collection are missing
             missing_songs = []
             already_saved = []
-            errors = []
-
-            for song_data in songs:
-                song_name = song_data["song_name"]
-                artist_name = song_data.get("artist_name", "")
-
-                # Build search query
-                query = song_name
-                if artist_name:
-                    query += f" artist:{artist_name}"
-
-                # Search for the song - doesn't require user auth
-                search_results = _sp(require_user_auth=False).search(q=query, type="track", limit=1)
-                tracks = search_results["tracks"]["items"]
-
-                if not tracks:
-                    errors.append(f"Not found: {query}")
-                    continue
 
-                track = tracks[0]
+            # Resolve the whole collection at once (deduplicated, concurrent)
+            resolved_tracks, errors = await resolve_collection(songs)
 
+            for track in resolved_tracks:
                 song_info = {
                     "name": track["name"],
                     "artists": [a["name"] for a in track["artists"]],
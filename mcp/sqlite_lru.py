@@ -0,0 +1,205 @@
+"""
+Shared SQLite LRU+TTL Store
+
+The single implementation behind every SQLite cache in the project: the MCP
+server's track-resolution cache (track_cache.py) and the app's SQLiteTTLCache
+(tools/cache.py), plus the text normalization used for their keys.
+
+It lives in this directory and depends only on the standard library because
+the MCP server runs standalone with just mcp/ on sys.path; the app, which
+already loads the MCP server from here, imports it from mcp/ as well.
+
+- WAL mode, so the MCP server, the API server and its workers can share a file
+- Entries are namespaced, expire after a TTL and are evicted least-recently-
+  used beyond max_entries (checked every EVICT_EVERY writes, not per insert)
+- Values are stored as JSON text (None included)
+"""
+
+import json
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from typing import Any, Dict, Iterable, Mapping, Optional, Tuple
+
+# Max parameters in one "key IN (...)" lookup (below old SQLite's 999 limit)
+_SQL_BATCH = 500
+
+_PUNCTUATION_RE = re.compile(r"[\"'`“”‘’·.,，。、!?！？:：;；()\[\]{}【】《》<>「」/\\|~\-_&+*#@…]+")
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def normalize_text(text: str) -> str:
+    """Fold width/case, strip punctuation and collapse whitespace."""
+    text = unicodedata.normalize("NFKC", text or "").casefold()
+    text = _PUNCTUATION_RE.sub(" ", text)
+    return _WHITESPACE_RE.sub(" ", text).strip()
+
+
+def connect(path: str) -> sqlite3.Connection:
+    """Open a SQLite file for sharing between threads and processes (WAL mode)."""
+    conn = sqlite3.connect(path, check_same_thread=False, timeout=5.0)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+class SQLiteLRU:
+    """Thread-safe, namespaced LRU+TTL key/value store in a SQLite file."""
+
+    # Check the size bound every N writes instead of counting rows on every insert
+    EVICT_EVERY = 128
+
+    def __init__(self, path: str, namespace: str, max_entries: int = 10000, ttl: float = 3600):
+        """
+        Args:
+            path: SQLite file
+            namespace: keeps independent caches in one file apart
+            max_entries: entries kept in this namespace
+            ttl: default entry lifetime in seconds
+        """
+        self.path = path
+        self.namespace = namespace
+        self.max_entries = max(1, max_entries)
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._writes_since_evict = 0
+        self._lock = threading.Lock()
+        self._conn = connect(path)
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS cache_entries (
+                namespace TEXT NOT NULL,
+                key TEXT NOT NULL,
+                value TEXT NOT NULL,
+                expires_at REAL NOT NULL,
+                last_access REAL NOT NULL,
+                PRIMARY KEY (namespace, key)
+            )
+            """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_cache_entries_access ON cache_entries(namespace, last_access)"
+        )
+        self._conn.commit()
+
+    def get(self, key: str) -> Tuple[bool, Any]:
+        """Return (found, value); found is False on a miss or an expired entry."""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM cache_entries WHERE namespace = ? AND key = ?",
+                (self.namespace, key),
+            ).fetchone()
+            if row is None or row[1] < now:
+                self.misses += 1
+                return False, None
+            self._conn.execute(
+                "UPDATE cache_entries SET last_access = ? WHERE namespace = ? AND key = ?",
+                (now, self.namespace, key),
+            )
+            self._conn.commit()
+            self.hits += 1
+        return True, json.loads(row[0])
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Any]:
+        """Look up many keys (one query per _SQL_BATCH keys, one commit); returns the hits."""
+        keys = list(dict.fromkeys(keys))
+        if not keys:
+            return {}
+        now = time.time()
+        found: Dict[str, str] = {}
+        with self._lock:
+            for start in range(0, len(keys), _SQL_BATCH):
+                batch = keys[start:start + _SQL_BATCH]
+                rows = self._conn.execute(
+                    "SELECT key, value FROM cache_entries WHERE namespace = ? AND expires_at >= ? "
+                    f"AND key IN ({', '.join('?' * len(batch))})",
+                    (self.namespace, now, *batch),
+                ).fetchall()
+                found.update(rows)
+            if found:
+                self._conn.executemany(
+                    "UPDATE cache_entries SET last_access = ? WHERE namespace = ? AND key = ?",
+                    [(now, self.namespace, key) for key in found],
+                )
+                self._conn.commit()
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        return {key: json.loads(value) for key, value in found.items()}
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        """Store a value; ttl None uses the default lifetime."""
+        self.set_many({key: value}, ttl=ttl)
+
+    def set_many(self, items: Mapping[str, Any], ttl: Optional[float] = None) -> None:
+        """Store many values in one transaction; ttl None uses the default lifetime."""
+        if not items:
+            return
+        now = time.time()
+        expires_at = now + (self.ttl if ttl is None else ttl)
+        rows = [
+            (self.namespace, key, json.dumps(value, ensure_ascii=False), expires_at, now)
+            for key, value in items.items()
+        ]
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO cache_entries (namespace, key, value, expires_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?)",
+                rows,
+            )
+            self._writes_since_evict += len(rows)
+            if self._writes_since_evict >= self.EVICT_EVERY:
+                self._evict_locked(now)
+                self._writes_since_evict = 0
+            self._conn.commit()
+
+    def _evict_locked(self, now: float) -> None:
+        """Drop expired entries, then least-recently-used ones beyond max_entries."""
+        if self._count_locked() <= self.max_entries:
+            return
+        self._conn.execute(
+            "DELETE FROM cache_entries WHERE namespace = ? AND expires_at < ?", (self.namespace, now)
+        )
+        overflow = self._count_locked() - self.max_entries
+        if overflow > 0:
+            # Evict some extra headroom so the next sweep has nothing to do
+            overflow += max(1, self.max_entries // 20)
+            self._conn.execute(
+                "DELETE FROM cache_entries WHERE namespace = ? AND key IN ("
+                "SELECT key FROM cache_entries WHERE namespace = ? ORDER BY last_access ASC LIMIT ?)",
+                (self.namespace, self.namespace, overflow),
+            )
+
+    def _count_locked(self) -> int:
+        return self._conn.execute(
+            "SELECT COUNT(*) FROM cache_entries WHERE namespace = ?", (self.namespace,)
+        ).fetchone()[0]
+
+    def delete(self, key: str) -> None:
+        """Remove one entry."""
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM cache_entries WHERE namespace = ? AND key = ?", (self.namespace, key)
+            )
+            self._conn.commit()
+
+    def clear(self) -> None:
+        """Remove every entry in this namespace."""
+        with self._lock:
+            self._conn.execute("DELETE FROM cache_entries WHERE namespace = ?", (self.namespace,))
+            self._conn.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and the current entry count."""
+        with self._lock:
+            entries = self._count_locked()
+        total = self.hits + self.misses
+        return {
+            "entries": entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+        }
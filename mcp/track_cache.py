@@ -0,0 +1,82 @@
+"""
+Persistent Track Resolution Cache
+
+Maps a normalized (song name, artist) pair to the Spotify track it resolved
+to, so repeat lookups for the same song cost no search round-trip - even
+across process restarts. Backed by SQLite (WAL mode) so the MCP server and
+the API server can share one file.
+
+- Positive results are kept for TRACK_CACHE_TTL seconds (default: 30 days)
+- "Not found" results are kept for TRACK_CACHE_NEGATIVE_TTL (default: 1 day)
+- Least-recently-used entries are evicted beyond TRACK_CACHE_MAX_ENTRIES
+"""
+
+import os
+from typing import Any, Dict, Optional, Tuple
+
+from sqlite_lru import SQLiteLRU, normalize_text
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "track_cache.sqlite3")
+
+# Fields that bloat the stored payload without being used by any consumer
+_DROPPED_FIELDS = ("available_markets",)
+
+
+def make_key(song_name: str, artist_name: str = "") -> str:
+    """Build the cache key for a (song name, artist) pair."""
+    return f"{normalize_text(song_name)}\x1f{normalize_text(artist_name)}"
+
+
+def _slim_track(track: Dict[str, Any]) -> Dict[str, Any]:
+    """Drop large, unused fields before persisting a track object."""
+    slim = {k: v for k, v in track.items() if k not in _DROPPED_FIELDS}
+    album = slim.get("album")
+    if isinstance(album, dict):
+        slim["album"] = {k: v for k, v in album.items() if k not in _DROPPED_FIELDS}
+    return slim
+
+
+class TrackResolutionCache:
+    """SQLite-backed LRU cache of (song name, artist) -> Spotify track (see sqlite_lru.py)."""
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        max_entries: Optional[int] = None,
+        ttl: Optional[float] = None,
+        negative_ttl: Optional[float] = None,
+    ):
+        self.path = path or os.environ.get("TRACK_CACHE_PATH", DEFAULT_CACHE_PATH)
+        self.max_entries = max_entries or int(os.environ.get("TRACK_CACHE_MAX_ENTRIES", "50000"))
+        self.ttl = ttl if ttl is not None else float(os.environ.get("TRACK_CACHE_TTL", 30 * 86400))
+        self.negative_ttl = (
+            negative_ttl if negative_ttl is not None
+            else float(os.environ.get("TRACK_CACHE_NEGATIVE_TTL", 86400))
+        )
+        self._store = SQLiteLRU(self.path, "track_resolution", max_entries=self.max_entries, ttl=self.ttl)
+
+    def get(self, song_name: str, artist_name: str = "") -> Tuple[bool, Optional[Dict[str, Any]]]:
+        """
+        Look up a cached resolution.
+
+        Returns:
+            (found, track): found is False on a miss; when found is True,
+            track is None for a cached "not found" result.
+        """
+        return self._store.get(make_key(song_name, artist_name))
+
+    def set(self, song_name: str, artist_name: str, track: Optional[Dict[str, Any]]) -> None:
+        """Store a resolution; pass track=None to remember a "not found" result."""
+        self._store.set(
+            make_key(song_name, artist_name),
+            _slim_track(track) if track else None,
+            ttl=self.ttl if track else self.negative_ttl,
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and the current entry count."""
+        return self._store.stats()
+
+    def clear(self) -> None:
+        """Remove every cached resolution."""
+        self._store.clear()
@@ -0,0 +1,390 @@
+"""
+User Profile Store
+
+Keeps a per-user snapshot of the listener's taste - top tracks, top artists,
+genre and decade histograms derived from them, and the set of saved track
+IDs - so preference analysis on the request path is a memory lookup instead
+of several Spotify round-trips. Snapshots are persisted to SQLite (WAL mode)
+so they survive restarts and the MCP server and the API server share them.
+
+- A background thread refreshes the snapshot every USER_PROFILE_REFRESH_INTERVAL
+  seconds (default: 6 hours); requests never wait for a refresh once a
+  snapshot exists
+- The saved-track IDs are only ever filled in by the background refresher;
+  a request that has to build the first snapshot fetches just the top lists
+- Snapshots are keyed by the authorized user's ID, resolved once per process
+  from the Spotify client before any snapshot is read or written
+- Top tracks and artists are the "medium_term" top 50
+- USER_PROFILE_PATH overrides the database location
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from collections import Counter
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from sqlite_lru import connect
+
+DEFAULT_PROFILE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "user_profile.sqlite3")
+
+# Number of top tracks / artists kept in a snapshot (the API maximum)
+TOP_LIMIT = 50
+
+# Time range the snapshot's top lists are fetched for
+TIME_RANGE = "medium_term"
+
+# Delay before retrying a failed background refresh
+_RETRY_DELAY = 300
+
+# Fields that bloat the stored payload without being used by any consumer
+_DROPPED_FIELDS = ("available_markets",)
+
+logger = logging.getLogger("music-server.user-profile")
+
+
+def _slim(item: Dict[str, Any]) -> Dict[str, Any]:
+    """Drop large, unused fields from a track or artist object."""
+    slim = {k: v for k, v in item.items() if k not in _DROPPED_FIELDS}
+    album = slim.get("album")
+    if isinstance(album, dict):
+        slim["album"] = {k: v for k, v in album.items() if k not in _DROPPED_FIELDS}
+    return slim
+
+
+def _decade(track: Dict[str, Any]) -> Optional[str]:
+    """Decade label ("1990s") of a track's album release date."""
+    release_date = (track.get("album") or {}).get("release_date") or ""
+    try:
+        return f"{int(release_date[:4]) // 10 * 10}s"
+    except ValueError:
+        return None
+
+
+class UserProfile:
+    """An immutable snapshot of one user's listening profile."""
+
+    def __init__(
+        self,
+        user_id: str,
+        top_tracks: List[Dict[str, Any]],
+        top_artists: List[Dict[str, Any]],
+        saved_track_ids: Iterable[str],
+        refreshed_at: float,
+        saved_refreshed_at: float = 0.0,
+    ):
+        self.user_id = user_id
+        self.top_tracks = top_tracks
+        self.top_artists = top_artists
+        self.saved_track_ids = frozenset(saved_track_ids)
+        self.refreshed_at = refreshed_at
+        # When saved_track_ids was last synced (0: not yet, the set is empty or carried over)
+        self.saved_refreshed_at = saved_refreshed_at
+
+        # Derived views, rebuilt on load rather than persisted
+        self.genre_histogram = Counter(
+            genre for artist in top_artists for genre in artist.get("genres") or []
+        )
+        self.decade_histogram = Counter(
+            decade for decade in (_decade(track) for track in top_tracks) if decade
+        )
+        self.artist_names = frozenset(
+            artist["name"].lower() for artist in top_artists if artist.get("name")
+        )
+        self.track_names = frozenset(
+            track["name"].lower() for track in top_tracks if track.get("name")
+        )
+
+    @property
+    def age(self) -> float:
+        """Seconds since the snapshot was taken."""
+        return time.time() - self.refreshed_at
+
+    @property
+    def saved_age(self) -> float:
+        """Seconds since the saved-track IDs were synced (inf if never)."""
+        return time.time() - self.saved_refreshed_at if self.saved_refreshed_at else float("inf")
+
+    def is_saved(self, track_id: str) -> bool:
+        """Whether a track is in the user's saved library."""
+        return track_id in self.saved_track_ids
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "user_id": self.user_id,
+            "top_tracks": self.top_tracks,
+            "top_artists": self.top_artists,
+            "saved_track_ids": sorted(self.saved_track_ids),
+            "refreshed_at": self.refreshed_at,
+            "saved_refreshed_at": self.saved_refreshed_at,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "UserProfile":
+        return cls(
+            user_id=data["user_id"],
+            top_tracks=data.get("top_tracks") or [],
+            top_artists=data.get("top_artists") or [],
+            saved_track_ids=data.get("saved_track_ids") or [],
+            refreshed_at=data.get("refreshed_at", 0.0),
+            saved_refreshed_at=data.get("saved_refreshed_at", 0.0),
+        )
+
+
+def fetch_saved_track_ids(sp) -> List[str]:
+    """Page through the user's saved tracks and return their IDs."""
+    track_ids = []
+    offset = 0
+    limit = 50
+    while True:
+        saved = sp.current_user_saved_tracks(limit=limit, offset=offset)
+        items = saved.get("items") or []
+        for item in items:
+            track = item.get("track") or {}
+            if track.get("id"):
+                track_ids.append(track["id"])
+        offset += limit
+        if len(items) < limit:
+            break
+    return track_ids
+
+
+def fetch_profile(
+    sp,
+    user_id: Optional[str] = None,
+    saved_track_ids: Iterable[str] = (),
+    saved_refreshed_at: float = 0.0,
+) -> UserProfile:
+    """
+    Build a fresh profile snapshot of the top lists from the Spotify API
+    (requires user auth).
+
+    The saved library is not paged here (it can take hundreds of requests);
+    saved_track_ids and saved_refreshed_at are carried into the snapshot as
+    given.
+    """
+    if user_id is None:
+        user_id = sp.current_user()["id"]
+    top_tracks = sp.current_user_top_tracks(limit=TOP_LIMIT, time_range=TIME_RANGE)
+    top_artists = sp.current_user_top_artists(limit=TOP_LIMIT, time_range=TIME_RANGE)
+    return UserProfile(
+        user_id=user_id,
+        top_tracks=[_slim(track) for track in top_tracks.get("items") or []],
+        top_artists=[_slim(artist) for artist in top_artists.get("items") or []],
+        saved_track_ids=saved_track_ids,
+        refreshed_at=time.time(),
+        saved_refreshed_at=saved_refreshed_at,
+    )
+
+
+class UserProfileStore:
+    """Memory + SQLite store of user profiles with scheduled background refresh."""
+
+    # Requests outside what a snapshot covers must be served live
+    time_range = TIME_RANGE
+    top_limit = TOP_LIMIT
+
+    def __init__(
+        self,
+        client_factory: Callable[[], Any],
+        path: Optional[str] = None,
+        refresh_interval: Optional[float] = None,
+        library=None,
+    ):
+        """
+        Args:
+            client_factory: returns a user-authorized spotipy client
+            path: SQLite file (default: USER_PROFILE_PATH or mcp/user_profile.sqlite3)
+            refresh_interval: seconds between refreshes (default: USER_PROFILE_REFRESH_INTERVAL)
+            library: optional LibrarySync providing the saved-track IDs incrementally
+        """
+        self.client_factory = client_factory
+        self.library = library
+        self.path = path or os.environ.get("USER_PROFILE_PATH", DEFAULT_PROFILE_PATH)
+        self.refresh_interval = (
+            refresh_interval if refresh_interval is not None
+            else float(os.environ.get("USER_PROFILE_REFRESH_INTERVAL", 6 * 3600))
+        )
+        self.refreshes = 0
+        self._profiles: Dict[str, UserProfile] = {}
+        self._user_id: Optional[str] = None
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._conn = connect(self.path)
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS user_profile (
+                user_id TEXT PRIMARY KEY,
+                profile TEXT NOT NULL,
+                refreshed_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.commit()
+
+    def get(self, user_id: Optional[str] = None) -> Optional[UserProfile]:
+        """
+        Return a cached profile without any network call.
+
+        Without user_id, returns the authorized user's profile - or None until
+        this process has resolved who that is (see resolve_user_id).
+        """
+        user_id = user_id or self._user_id
+        if user_id is None:
+            return None
+        if user_id in self._profiles:
+            return self._profiles[user_id]
+
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT profile FROM user_profile WHERE user_id = ?", (user_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        profile = UserProfile.from_dict(json.loads(row[0]))
+        self._profiles[profile.user_id] = profile
+        return profile
+
+    def resolve_user_id(self, sp=None) -> str:
+        """
+        Return the authorized user's ID, asking Spotify once per process.
+
+        The database may hold snapshots of other accounts (shared file, a
+        token switched to another user), so the ID always comes from the
+        client rather than from what is on disk.
+        """
+        if self._user_id is None:
+            sp = sp or self.client_factory()
+            self._user_id = sp.current_user()["id"]
+        return self._user_id
+
+    def _save(self, profile: UserProfile) -> None:
+        payload = json.dumps(profile.to_dict(), ensure_ascii=False)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO user_profile (user_id, profile, refreshed_at) VALUES (?, ?, ?)",
+                (profile.user_id, payload, profile.refreshed_at),
+            )
+            self._conn.commit()
+        self._profiles[profile.user_id] = profile
+
+    def refresh(self, max_age: float = 0) -> UserProfile:
+        """
+        Fetch fresh top lists for the authorized user and persist them.
+
+        Only two requests: the saved-track IDs of the previous snapshot (if
+        any) are carried over; refresh_saved_tracks() updates them.
+
+        Args:
+            max_age: skip the fetch if the cached snapshot is younger than this
+        """
+        with self._refresh_lock:
+            sp = self.client_factory()
+            user_id = self.resolve_user_id(sp)
+            profile = self.get()
+            if profile is not None and profile.age < max_age:
+                return profile
+            if profile is not None:
+                saved_track_ids, saved_refreshed_at = profile.saved_track_ids, profile.saved_refreshed_at
+            else:
+                saved_track_ids, saved_refreshed_at = (), 0.0
+            profile = fetch_profile(sp, user_id, saved_track_ids, saved_refreshed_at)
+            self._save(profile)
+            self.refreshes += 1
+            logger.info(
+                f"Refreshed profile for {profile.user_id}: {len(profile.top_tracks)} top tracks, "
+                f"{len(profile.top_artists)} top artists"
+            )
+            return profile
+
+    def refresh_saved_tracks(self) -> UserProfile:
+        """
+        Sync the saved-track IDs (LibrarySync if set, full paging otherwise)
+        into the current snapshot and persist it. Slow; run from the
+        background refresher, never from the request path.
+        """
+        sp = self.client_factory()
+        self.resolve_user_id(sp)
+        if self.get() is None:
+            self.refresh()
+        # Page outside the refresh lock so request-path refreshes never wait on it
+        saved_track_ids = self.library.sync() if self.library is not None else fetch_saved_track_ids(sp)
+        synced_at = time.time()
+        with self._refresh_lock:
+            profile = self.get()
+            profile = UserProfile(
+                user_id=profile.user_id,
+                top_tracks=profile.top_tracks,
+                top_artists=profile.top_artists,
+                saved_track_ids=saved_track_ids,
+                refreshed_at=profile.refreshed_at,
+                saved_refreshed_at=synced_at,
+            )
+            self._save(profile)
+        logger.info(f"Synced {len(profile.saved_track_ids)} saved tracks into profile for {profile.user_id}")
+        return profile
+
+    def current(self) -> UserProfile:
+        """
+        Return the authorized user's profile.
+
+        Served from memory or disk when available (possibly up to one refresh
+        interval old); otherwise only the top lists are fetched synchronously.
+        Also starts the background refresher, which fills in the saved-track
+        IDs.
+        """
+        self.resolve_user_id()
+        profile = self.get()
+        if profile is None:
+            profile = self.refresh(max_age=self.refresh_interval)
+        self.start_background_refresh()
+        return profile
+
+    def start_background_refresh(self) -> None:
+        """Start the refresher thread (no-op if it is already running)."""
+        if self._thread is not None or self.refresh_interval <= 0:
+            return
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(
+                target=self._refresh_loop, name="user-profile-refresh", daemon=True
+            )
+            self._thread.start()
+
+    def _refresh_loop(self) -> None:
+        while not self._stop.is_set():
+            try:
+                profile = self.refresh(max_age=self.refresh_interval)
+                if profile.saved_age >= self.refresh_interval:
+                    profile = self.refresh_saved_tracks()
+            except Exception as e:
+                logger.warning(f"Background profile refresh failed: {e}")
+                self._stop.wait(_RETRY_DELAY)
+                continue
+            self._stop.wait(max(1.0, self.refresh_interval - max(profile.age, profile.saved_age)))
+
+    def clear(self) -> None:
+        """Drop every stored snapshot and forget the resolved user."""
+        with self._lock:
+            self._conn.execute("DELETE FROM user_profile")
+            self._conn.commit()
+        self._profiles.clear()
+        self._user_id = None
+
+    def stop(self) -> None:
+        """Stop the refresher thread."""
+        self._stop.set()
+
+    def stats(self) -> Dict[str, Any]:
+        """Return the current snapshot's age and the number of refreshes."""
+        profile = self.get()
+        return {
+            "user_id": profile.user_id if profile else None,
+            "age_seconds": round(profile.age) if profile else None,
+            "refreshes": self.refreshes,
+        }
@@ -5,7 +5,8 @@
 
 import asyncio
 import os
-from typing import Dict, Any, Optional, List
+import time
+from typing import AsyncIterator, Awaitable, Dict, Any, Optional, List
 
 # 在导入其他模块之前加载配置
 try:
@@ -15,9 +16,11 @@ except Exception as e:
     print(f"警告: 无法从 setting.json 加载配置: {e}")
 
 from config.logging_config import get_logger
-from graphs.music_graph import MusicRecommendationGraph
+from graphs.music_graph import MusicRecommendationGraph, NODE_LABELS, STREAMING_NODES
 from schemas.music_state import MusicAgentState
 from services import PlaylistRecommendationService
+from tools.response_cache import ResponseCache
+from tools.single_flight import SingleFlight, request_key
 
 logger = get_logger(__name__)
 
@@ -30,8 +33,69 @@ class MusicRecommendationAgent:
         self.graph = MusicRecommendationGraph()
         self.app = self.graph.get_app()
         self.playlist_service = PlaylistRecommendationService()
+        # 相同的并发请求只运行一次工作流（设置环境变量 REQUEST_COALESCING=false 可关闭）
+        self._single_flight = (
+            SingleFlight("recommendations")
+            if os.getenv("REQUEST_COALESCING", "true").lower() != "false" else None
+        )
+        # 完整结果按意图缓存，流式请求命中时重放原事件序列（设置环境变量 RESPONSE_CACHE=false 可关闭）
+        self._response_cache = (
+            ResponseCache("response")
+            if os.getenv("RESPONSE_CACHE", "true").lower() != "false" else None
+        )
         logger.info("MusicRecommendationAgent 初始化完成")
     
+    def _build_initial_state(
+        self,
+        query: str,
+        chat_history: Optional[List[Dict[str, str]]] = None,
+        user_preferences: Optional[Dict[str, Any]] = None
+    ) -> MusicAgentState:
+        """构建工作流初始状态"""
+        return {
+            "input": query,
+            "chat_history": chat_history or [],
+            "user_preferences": user_preferences or {},
+            "favorite_songs": [],
+            "intent_type": "",
+            "intent_parameters": {},
+            "intent_context": "",
+            "search_results": [],
+            "recommendations": [],
+            "explanation": "",
+            "final_response": "",
+            "playlist": None,
+            "step_count": 0,
+            "error_log": [],
+            "metadata": {}
+        }
+    
+    @staticmethod
+    def _build_result(result: Dict[str, Any]) -> Dict[str, Any]:
+        """把工作流最终状态整理为对外返回的结果"""
+        return {
+            "success": True,
+            "response": result.get("final_response", ""),
+            "recommendations": result.get("recommendations", []),
+            "search_results": result.get("search_results", []),
+            "intent_type": result.get("intent_type", ""),
+            "explanation": result.get("explanation", ""),
+            "playlist": result.get("playlist"),
+            "errors": result.get("error_log", [])
+        }
+    
+    @staticmethod
+    def _build_error_result(error: Exception) -> Dict[str, Any]:
+        """构建失败时的返回结果"""
+        return {
+            "success": False,
+            "error": str(error),
+            "response": "抱歉，处理你的请求时遇到了问题。请稍后重试。",
+            "recommendations": [],
+            "search_results": [],
+            "errors": [{"node": "main", "error": str(error)}]
+        }
+    
     async def get_recommendations(
         self,
         query: str,
@@ -47,29 +111,40 @@ class MusicRecommendationAgent:
             user_preferences: 用户偏好数据
             
         Returns:
-            包含推荐结果的字典
+            包含推荐结果的字典（优先返回缓存；与正在进行的相同请求共享同一次执行）
         """
+        key = request_key(query, chat_history=chat_history or [], user_preferences=user_preferences or {})
+        
+        def run() -> Awaitable[Dict[str, Any]]:
+            if self._single_flight is None:
+                return self._get_recommendations(query, chat_history, user_preferences)
+            return self._single_flight.do(
+                key, lambda: self._get_recommendations(query, chat_history, user_preferences)
+            )
+        
+        if self._response_cache is None:
+            return await run()
+        return await self._response_cache.call(key, run, self._cacheable_intent)
+    
+    @staticmethod
+    def _cacheable_intent(result: Dict[str, Any]) -> Optional[str]:
+        """可缓存结果的意图；失败或有节点出错的结果不缓存"""
+        if not result.get("success") or result.get("errors"):
+            return None
+        return result.get("intent_type") or None
+    
+    async def _get_recommendations(
+        self,
+        query: str,
+        chat_history: Optional[List[Dict[str, str]]],
+        user_preferences: Optional[Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        """执行一次工作流并整理结果"""
         try:
             logger.info(f"开始处理音乐推荐请求: {query}")
             
             # 构建初始状态
-            initial_state: MusicAgentState = {
-                "input": query,
-                "chat_history": chat_history or [],
-                "user_preferences": user_preferences or {},
-                "favorite_songs": [],
-                "intent_type": "",
-                "intent_parameters": {},
-                "intent_context": "",
-                "search_results": [],
-                "recommendations": [],
-                "explanation": "",
-                "final_response": "",
-                "playlist": None,
-                "step_count": 0,
-                "error_log": [],
-                "metadata": {}
-            }
+            initial_state = self._build_initial_state(query, chat_history, user_preferences)
             
             # 执行工作流
             config = {
@@ -79,27 +154,136 @@ class MusicRecommendationAgent:
             
             logger.info("音乐推荐完成")
             
-            return {
-                "success": True,
-                "response": result.get("final_response", ""),
-                "recommendations": result.get("recommendations", []),
-                "search_results": result.get("search_results", []),
-                "intent_type": result.get("intent_type", ""),
-                "explanation": result.get("explanation", ""),
-                "playlist": result.get("playlist"),
-                "errors": result.get("error_log", [])
-            }
+            return self._build_result(result)
             
         except Exception as e:
             logger.error(f"处理音乐推荐请求时发生错误: {str(e)}", exc_info=True)
-            return {
-                "success": False,
-                "error": str(e),
-                "response": "抱歉，处理你的请求时遇到了问题。请稍后重试。",
-                "recommendations": [],
-                "search_results": [],
-                "errors": [{"node": "main", "error": str(e)}]
+            return self._build_error_result(e)
+    
+    @staticmethod
+    def _summarize_node_output(output: Dict[str, Any]) -> Dict[str, Any]:
+        """提取节点输出中可以提前展示给前端的部分结果"""
+        partial: Dict[str, Any] = {}
+        if output.get("intent_type"):
+            partial["intent_type"] = output["intent_type"]
+            partial["intent_parameters"] = output.get("intent_parameters", {})
+        if "recommendations" in output:
+            partial["recommendations"] = output["recommendations"]
+        if "search_results" in output:
+            partial["search_count"] = len(output["search_results"])
+        if output.get("playlist"):
+            partial["playlist"] = output["playlist"]
+        if "favorite_songs" in output:
+            partial["favorite_count"] = len(output["favorite_songs"])
+        return partial
+    
+    async def astream_recommendations(
+        self,
+        query: str,
+        chat_history: Optional[List[Dict[str, str]]] = None,
+        user_preferences: Optional[Dict[str, Any]] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        流式获取音乐推荐
+        
+        通过 LangGraph 的 astream_events 运行工作流：每个节点开始/结束时给出进度事件
+        （结束事件带耗时和该节点的部分结果），解释/聊天节点的 LLM token 一生成就转发出去，
+        最后再给出与 get_recommendations 相同格式的完整结果
+        
+        Args:
+            query: 用户查询/需求
+            chat_history: 对话历史
+            user_preferences: 用户偏好数据
+            
+        Yields:
+            {"type": "node_start", "node": 节点名, "label": 进度文案}
+            {"type": "node_end", "node": 节点名, "elapsed_ms": 耗时, "partial": 部分结果}
+            {"type": "token", "node": 节点名, "delta": 新增文本}
+            {"type": "result", "result": 完整结果字典}（最后一个事件）
+            
+            命中缓存时立即按原顺序重放缓存的事件；与正在进行的相同请求共享同一条事件流，
+            后加入的调用方先收到已产生的事件
+        """
+        key = request_key(query, chat_history=chat_history or [], user_preferences=user_preferences or {})
+        
+        def open_stream() -> AsyncIterator[Dict[str, Any]]:
+            if self._single_flight is None:
+                return self._astream_recommendations(query, chat_history, user_preferences)
+            return self._single_flight.stream(
+                key, lambda: self._astream_recommendations(query, chat_history, user_preferences)
+            )
+        
+        if self._response_cache is None:
+            stream = open_stream()
+        else:
+            stream = self._response_cache.stream(key, open_stream, self._cacheable_intent)
+        async for event in stream:
+            yield event
+    
+    async def _astream_recommendations(
+        self,
+        query: str,
+        chat_history: Optional[List[Dict[str, str]]],
+        user_preferences: Optional[Dict[str, Any]]
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """运行一次工作流并产出事件（见 astream_recommendations）"""
+        try:
+            logger.info(f"开始流式处理音乐推荐请求: {query}")
+            
+            initial_state = self._build_initial_state(query, chat_history, user_preferences)
+            config = {
+                "recursion_limit": 50
             }
+            
+            final_state: Dict[str, Any] = {}
+            node_started_at: Dict[str, float] = {}
+            async for event in self.app.astream_events(initial_state, config=config, version="v2"):
+                kind = event["event"]
+                name = event.get("name")
+                # 节点自身的运行事件（排除节点内部的 LLM、路由函数等子运行）
+                is_node = (
+                    name in NODE_LABELS
+                    and event.get("metadata", {}).get("langgraph_node") == name
+                )
+                
+                if kind == "on_chain_start" and is_node:
+                    node_started_at[event["run_id"]] = time.perf_counter()
+                    yield {"type": "node_start", "node": name, "label": NODE_LABELS[name]}
+                
+                elif kind == "on_chain_end" and is_node:
+                    started_at = node_started_at.pop(event["run_id"], None)
+                    elapsed_ms = (
+                        round((time.perf_counter() - started_at) * 1000) if started_at else None
+                    )
+                    output = event["data"].get("output")
+                    yield {
+                        "type": "node_end",
+                        "node": name,
+                        "elapsed_ms": elapsed_ms,
+                        "partial": self._summarize_node_output(output) if isinstance(output, dict) else {}
+                    }
+                
+                elif kind == "on_chat_model_stream":
+                    node = event.get("metadata", {}).get("langgraph_node")
+                    if node not in STREAMING_NODES:
+                        continue
+                    delta = event["data"]["chunk"].content
+                    if delta:
+                        yield {"type": "token", "node": node, "delta": delta}
+                
+                elif kind == "on_chain_end" and not event.get("parent_ids"):
+                    # 根节点结束时的输出即为工作流最终状态
+                    output = event["data"].get("output")
+                    if isinstance(output, dict):
+                        final_state = output
+            
+            logger.info("流式音乐推荐完成")
+            
+            yield {"type": "result", "result": self._build_result(final_state)}
+            
+        except Exception as e:
+            logger.error(f"流式处理音乐推荐请求时发生错误: {str(e)}", exc_info=True)
+            yield {"type": "result", "result": self._build_error_result(e)}
     
     async def search_music(
         self,
@@ -316,7 +500,16 @@ class MusicRecommendationAgent:
             "supported_genres": [
                 "流行", "摇滚", "民谣", "电子", 
                 "说唱", "抒情", "古风", "爵士"
-            ]
+            ],
+            "intent_fast_path": self.graph.get_intent_stats(),
+            "request_coalescing": {
+                "recommendations": self._single_flight.stats() if self._single_flight else None,
+                "playlist": self.playlist_service.coalescing_stats(),
+            },
+            "response_cache": {
+                "recommendations": self._response_cache.stats() if self._response_cache else None,
+                "playlist": self.playlist_service.cache_stats(),
+            }
         }
 
 
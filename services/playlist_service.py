@@ -5,56 +5,39 @@
 
 from __future__ import annotations
 
+import os
+import time
 from collections import defaultdict
 from datetime import datetime
-from typing import Any, Dict, List, Optional, Sequence, Tuple
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence, Tuple
 
 from config.logging_config import get_logger
 from schemas.music_state import UserPreferences
 from tools.mcp_adapter import MCPClientAdapter, PlaylistInfo
+from tools.mood_ranker import find_mood_target, get_mood_reranker
 from tools.music_tools import Song, get_music_search_tool
+from tools.response_cache import ResponseCache
+from tools.single_flight import SingleFlight, request_key
+from tools.task_plan import TaskPlan, upstream_timeout
+from tools.vocabulary import ACTIVITY_TO_GENRES, MOOD_TO_GENRES, get_vocabulary
 
 logger = get_logger(__name__)
 
-
-# 关键词 → Spotify 流派映射（与 MusicRecommenderEngine 对齐，补充中文别名）
-MOOD_TO_GENRES: Dict[str, Sequence[str]] = {
-    "开心": ("pop", "dance", "electronic"),
-    "快乐": ("pop", "dance", "electronic"),
-    "高兴": ("pop", "dance", "electronic"),
-    "兴奋": ("rock", "electronic", "dance"),
-    "激动": ("rock", "electronic", "dance"),
-    "悲伤": ("acoustic", "sad", "indie", "mellow"),
-    "伤心": ("acoustic", "sad", "indie", "mellow"),
-    "难过": ("acoustic", "sad", "indie", "piano"),
-    "丧": ("acoustic", "sad", "indie"),
-    "疗愈": ("acoustic", "mellow", "indie"),
-    "放松": ("chill", "acoustic", "jazz", "ambient"),
-    "舒缓": ("chill", "acoustic", "jazz", "ambient"),
-    "平静": ("ambient", "acoustic", "chill"),
-    "安静": ("ambient", "acoustic", "chill"),
-    "怀旧": ("classic", "pop", "rock", "indie"),
-    "浪漫": ("acoustic", "pop", "r-n-b", "soul"),
-    "甜蜜": ("pop", "r-n-b", "soul"),
-    "表白": ("r-n-b", "soul", "pop"),
-    "学习": ("lo-fi", "chill", "ambient", "acoustic"),
-    "专注": ("lo-fi", "ambient", "acoustic"),
-    "运动": ("electronic", "rock", "dance"),
-}
-
-ACTIVITY_TO_GENRES: Dict[str, Sequence[str]] = {
-    "运动": ("electronic", "rock", "dance"),
-    "健身": ("electronic", "rock", "dance"),
-    "跑步": ("electronic", "rock", "dance"),
-    "学习": ("acoustic", "jazz", "chill"),
-    "工作": ("acoustic", "jazz", "chill"),
-    "写作": ("lo-fi", "ambient", "acoustic"),
-    "开车": ("pop", "rock", "country"),
-    "通勤": ("pop", "indie", "electronic"),
-    "睡觉": ("ambient", "acoustic", "chill"),
-    "休息": ("acoustic", "chill", "jazz"),
-    "派对": ("dance", "pop", "electronic"),
-    "聚会": ("pop", "dance", "electronic"),
+# 推荐任务的默认超时（秒）：一次 LLM 生成（max_tokens=2000，客户端超时 120 秒）加上推荐结果的搜索
+DEFAULT_RECOMMEND_TIMEOUT = 150.0
+
+
+# 歌单生成阶段 → 进度提示文案（流式接口在阶段开始时展示）
+PLAYLIST_STAGE_LABELS: Dict[str, str] = {
+    "analyze_query": "正在分析你的需求...",
+    "prepare_seeds": "正在准备推荐种子...",
+    "recommend_by_names": "正在从Spotify获取推荐...",
+    "recommend_by_ids": "正在补充相似歌曲...",
+    "local_catalog": "正在从本地曲库补充相似歌曲...",
+    "top_tracks": "正在加入你常听的歌曲...",
+    "mood_rerank": "正在按心情挑选最合适的歌曲...",
+    "balance": "正在平衡歌单...",
+    "create_playlist": "正在创建 Spotify 歌单...",
 }
 
 
@@ -64,6 +47,23 @@ class PlaylistRecommendationService:
     def __init__(self, mcp_adapter: Optional[MCPClientAdapter] = None) -> None:
         self.mcp_adapter = mcp_adapter or MCPClientAdapter()
         self._search_tool = None
+        # 相同的并发歌单请求只生成一次（设置环境变量 REQUEST_COALESCING=false 可关闭）
+        self._single_flight = (
+            SingleFlight("playlist")
+            if os.getenv("REQUEST_COALESCING", "true").lower() != "false" else None
+        )
+        # 不创建 Spotify 播放列表的歌单结果会被缓存（设置环境变量 RESPONSE_CACHE=false 可关闭）
+        self._response_cache = (
+            ResponseCache("playlist_response")
+            if os.getenv("RESPONSE_CACHE", "true").lower() != "false" else None
+        )
+        # 推荐任务按 LLM 的成本单独设置超时（RECOMMEND_TIMEOUT，秒，0 表示不限），
+        # 只访问 Spotify 的任务仍使用 UPSTREAM_TIMEOUT
+        try:
+            self._recommend_timeout = float(os.getenv("RECOMMEND_TIMEOUT", DEFAULT_RECOMMEND_TIMEOUT))
+        except ValueError:
+            logger.warning("RECOMMEND_TIMEOUT 配置无效，使用默认值")
+            self._recommend_timeout = DEFAULT_RECOMMEND_TIMEOUT
         logger.info("PlaylistRecommendationService 初始化完成")
 
     # ------------------------------------------------------------------ #
@@ -95,7 +95,91 @@ class PlaylistRecommendationService:
                 "seed_summary": {...}
             }
         """
+        result: Dict[str, Any] = {}
+        async for event in self.astream_smart_playlist(
+            user_query=user_query,
+            user_preferences=user_preferences,
+            target_size=target_size,
+            create_spotify_playlist=create_spotify_playlist,
+            public=public,
+        ):
+            if event["type"] == "result":
+                result = event["result"]
+        return result
+
+    async def astream_smart_playlist(
+        self,
+        user_query: str,
+        user_preferences: Optional[UserPreferences] = None,
+        target_size: int = 30,
+        create_spotify_playlist: bool = True,
+        public: bool = False,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        分阶段生成智能歌单，每个阶段开始/结束时产出进度事件
+
+        参数同 generate_smart_playlist。
+
+        Yields:
+            {"type": "stage_start", "stage": 阶段名, "label": 进度文案}
+            {"type": "stage_end", "stage": 阶段名, "elapsed_ms": 耗时, "partial": 阶段结果}
+            {"type": "result", "result": 与 generate_smart_playlist 相同的返回值}（最后一个事件）
+
+        不创建 Spotify 播放列表时，命中缓存立即按原顺序重放缓存的事件；
+        与正在进行的相同请求（查询规范化后相同且参数一致）共享同一条事件流，
+        generate_smart_playlist 基于本方法，因此同样会被缓存和合并
+        """
+        key = request_key(
+            user_query,
+            user_preferences=user_preferences or {},
+            target_size=target_size,
+            create_spotify_playlist=create_spotify_playlist,
+            public=public,
+        )
+
+        def open_stream() -> AsyncIterator[Dict[str, Any]]:
+            if self._single_flight is None:
+                return self._astream_smart_playlist(
+                    user_query, user_preferences, target_size, create_spotify_playlist, public
+                )
+            return self._single_flight.stream(
+                key,
+                lambda: self._astream_smart_playlist(
+                    user_query, user_preferences, target_size, create_spotify_playlist, public
+                ),
+            )
+
+        # 创建播放列表有副作用，不走缓存
+        if self._response_cache is None or create_spotify_playlist:
+            stream = open_stream()
+        else:
+            stream = self._response_cache.stream(
+                key, open_stream, lambda result: "playlist" if result.get("songs") else None
+            )
+        async for event in stream:
+            yield event
+
+    def coalescing_stats(self) -> Optional[Dict[str, Any]]:
+        """请求合并统计（关闭时返回 None）"""
+        return self._single_flight.stats() if self._single_flight else None
+
+    def cache_stats(self) -> Optional[Dict[str, Any]]:
+        """响应缓存统计（关闭时返回 None）"""
+        return self._response_cache.stats() if self._response_cache else None
+
+    async def _astream_smart_playlist(
+        self,
+        user_query: str,
+        user_preferences: Optional[UserPreferences],
+        target_size: int,
+        create_spotify_playlist: bool,
+        public: bool,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """分阶段生成一次歌单并产出事件（见 astream_smart_playlist）"""
         prefs = user_preferences or {}
+
+        yield self._stage_start("analyze_query")
+        started_at = time.perf_counter()
         context = self._analyze_query(user_query)
         logger.info(
             "生成智能歌单: query='%s', target_size=%s, context=%s",
@@ -103,51 +187,93 @@ class PlaylistRecommendationService:
             target_size,
             context,
         )
+        yield self._stage_end("analyze_query", started_at, {"context": context})
 
-        # 准备种子
-        seed_track_names, seed_artist_names = await self._prepare_seed_names(
-            user_query, prefs
-        )
+        # 准备种子并获取推荐：query 搜索与偏好种子的 ID 解析互不依赖，同时进行；
+        # 推荐等两者都完成后开始，基于 ID 的补充推荐只在候选不足时才请求
         seed_genres = self._derive_seed_genres(context, prefs)
-
-        seed_summary = {
-            "tracks": seed_track_names[:5],
-            "artists": seed_artist_names[:5],
-            "genres": seed_genres[:5],
-        }
+        preference_tracks, preference_artists = self._preference_seed_names(prefs)
+        limit = max(target_size * 2, 20)
+        spotify_timeout = upstream_timeout()
+        plan = TaskPlan("playlist", timeout=self._recommend_timeout)
+        plan.add(
+            "search",
+            lambda: self._search_query_songs(user_query),
+            default=[],
+            timeout=spotify_timeout,
+        )
+        plan.add(
+            "preference_seeds",
+            lambda: self.mcp_adapter.resolve_seed_ids(preference_tracks, preference_artists),
+            default=([], []),
+            timeout=spotify_timeout,
+        )
+        plan.add(
+            "recommend_by_names",
+            lambda songs, preference_ids: self._recommend_by_seeds(
+                songs, preference_ids, seed_genres, limit
+            ),
+            after=("search", "preference_seeds"),
+            default=[],
+        )
+        plan.add(
+            "recommend_by_ids",
+            lambda songs: self._recommend_by_ids(songs, seed_genres, limit),
+            after=("search",),
+            default=[],
+            lazy=True,
+        )
 
         candidates: List[Song] = []
-
-        # Step 1: 通过名称获取推荐（自动解析 ID）
         try:
-            if seed_track_names or seed_artist_names or seed_genres:
-                candidates.extend(
-                    await self.mcp_adapter.get_recommendations_by_names(
-                        seed_track_names=seed_track_names or None,
-                        seed_artist_names=seed_artist_names or None,
-                        seed_genres=seed_genres or None,
-                        limit=max(target_size * 2, 20),
-                    )
-                )
-        except Exception as err:  # noqa: BLE001
-            logger.warning("通过名称获取推荐失败: %s", err)
+            yield self._stage_start("prepare_seeds")
+            started_at = time.perf_counter()
+            seed_track_names, seed_artist_names = self._prepare_seed_names(
+                prefs, await plan.result("search")
+            )
 
-        # Step 2: 如果还不够，尝试基于 ID 的推荐（使用 query 搜索的 Top 结果）
-        if len(candidates) < target_size:
-            track_ids = await self._search_track_ids_for_query(user_query)
-            if track_ids or seed_genres:
-                try:
-                    extra = await self.mcp_adapter.get_recommendations(
-                        seed_tracks=track_ids or None,
-                        seed_genres=seed_genres or None,
-                        limit=max(target_size * 2, 20),
-                    )
-                    candidates.extend(extra)
-                except Exception as err:  # noqa: BLE001
-                    logger.warning("通过 ID 获取推荐失败: %s", err)
-
-        # Step 3: 兜底使用用户热门歌曲
+            seed_summary = {
+                "tracks": seed_track_names[:5],
+                "artists": seed_artist_names[:5],
+                "genres": seed_genres[:5],
+            }
+            yield self._stage_end("prepare_seeds", started_at, {"seed_summary": seed_summary})
+
+            # Step 1: 基于种子获取推荐（偏好种子的 ID 已并发解析）
+            yield self._stage_start("recommend_by_names")
+            started_at = time.perf_counter()
+            candidates.extend(await plan.result("recommend_by_names"))
+            self._log_degraded(plan, "recommend_by_names")
+            yield self._stage_end("recommend_by_names", started_at, {"candidates": len(candidates)})
+
+            # Step 2: 如果还不够，使用基于 ID 的推荐（种子为 query 搜索的 Top 结果，只在候选不足时请求）
+            if len(candidates) < target_size:
+                yield self._stage_start("recommend_by_ids")
+                started_at = time.perf_counter()
+                candidates.extend(await plan.result("recommend_by_ids"))
+                self._log_degraded(plan, "recommend_by_ids")
+                yield self._stage_end("recommend_by_ids", started_at, {"candidates": len(candidates)})
+        finally:
+            plan.close()
+
+        # Step 3: 本地曲库中与种子歌曲相似的歌曲（所有种子一次批量计算）
+        if len(candidates) < target_size and seed_track_names:
+            yield self._stage_start("local_catalog")
+            started_at = time.perf_counter()
+            similar_groups = await self._get_search_tool().get_similar_songs_batch(
+                [
+                    {"title": item["song_name"], "artist": item.get("artist_name", "")}
+                    for item in seed_track_names
+                ],
+                limit=target_size,
+            )
+            candidates.extend(self._interleave(similar_groups))
+            yield self._stage_end("local_catalog", started_at, {"candidates": len(candidates)})
+
+        # Step 4: 兜底使用用户热门歌曲
         if len(candidates) < target_size:
+            yield self._stage_start("top_tracks")
+            started_at = time.perf_counter()
             try:
                 top_tracks = await self.mcp_adapter.get_user_top_tracks(
                     limit=target_size
@@ -155,22 +281,44 @@ class PlaylistRecommendationService:
                 candidates.extend(top_tracks)
             except Exception as err:  # noqa: BLE001
                 logger.debug("获取用户热门歌曲失败: %s", err)
+            yield self._stage_end("top_tracks", started_at, {"candidates": len(candidates)})
 
-        # 去重并平衡
         unique_candidates = self._merge_unique_songs(candidates)
+
+        # Step 5: 候选较多且识别到心情时，按心情的音频特征目标重排并收窄候选池
+        mood_target = self._mood_target(context)
+        if mood_target and len(unique_candidates) > target_size:
+            yield self._stage_start("mood_rerank")
+            started_at = time.perf_counter()
+            unique_candidates = await self._rerank_by_mood(
+                unique_candidates, mood_target, keep=target_size * 2
+            )
+            yield self._stage_end("mood_rerank", started_at, {"candidates": len(unique_candidates)})
+
+        # 去重并平衡
+        yield self._stage_start("balance")
+        started_at = time.perf_counter()
         balanced_songs = self.balance_playlist(unique_candidates, target_size)
+        songs = [song.to_dict() for song in balanced_songs]
+        yield self._stage_end("balance", started_at, {"songs": songs})
 
         if not balanced_songs:
             logger.error("无法生成歌单，候选歌曲为空")
-            return {
-                "songs": [],
-                "playlist": None,
-                "context": context,
-                "seed_summary": seed_summary,
+            yield {
+                "type": "result",
+                "result": {
+                    "songs": [],
+                    "playlist": None,
+                    "context": context,
+                    "seed_summary": seed_summary,
+                },
             }
+            return
 
         playlist_meta: Optional[PlaylistInfo] = None
         if create_spotify_playlist:
+            yield self._stage_start("create_playlist")
+            started_at = time.perf_counter()
             playlist_meta = await self._create_spotify_playlist(
                 songs=balanced_songs,
                 user_query=user_query,
@@ -178,6 +326,11 @@ class PlaylistRecommendationService:
                 preferences=prefs,
                 public=public,
             )
+            yield self._stage_end(
+                "create_playlist",
+                started_at,
+                {"playlist": playlist_meta.to_dict() if playlist_meta else None},
+            )
 
         logger.info(
             "歌单生成完成: songs=%s, playlist_created=%s",
@@ -185,11 +338,37 @@ class PlaylistRecommendationService:
             bool(playlist_meta),
         )
 
+        yield {
+            "type": "result",
+            "result": {
+                "songs": songs,
+                "playlist": playlist_meta.to_dict() if playlist_meta else None,
+                "context": context,
+                "seed_summary": seed_summary,
+            },
+        }
+
+    @staticmethod
+    def _interleave(groups: List[List[Song]]) -> List[Song]:
+        """轮流从每组取一首，避免候选集中在第一首种子的相似歌曲上"""
+        merged: List[Song] = []
+        for rank in range(max((len(group) for group in groups), default=0)):
+            merged.extend(group[rank] for group in groups if rank < len(group))
+        return merged
+
+    @staticmethod
+    def _stage_start(stage: str) -> Dict[str, Any]:
+        """构建阶段开始事件"""
+        return {"type": "stage_start", "stage": stage, "label": PLAYLIST_STAGE_LABELS[stage]}
+
+    @staticmethod
+    def _stage_end(stage: str, started_at: float, partial: Dict[str, Any]) -> Dict[str, Any]:
+        """构建阶段结束事件（带耗时与阶段结果）"""
         return {
-            "songs": [song.to_dict() for song in balanced_songs],
-            "playlist": playlist_meta.to_dict() if playlist_meta else None,
-            "context": context,
-            "seed_summary": seed_summary,
+            "type": "stage_end",
+            "stage": stage,
+            "elapsed_ms": round((time.perf_counter() - started_at) * 1000),
+            "partial": partial,
         }
 
     # ------------------------------------------------------------------ #
@@ -269,16 +448,10 @@ class PlaylistRecommendationService:
         return self._search_tool
 
     def _analyze_query(self, user_query: str) -> Dict[str, Any]:
-        query = user_query.lower() if user_query else ""
-        detected_moods = [
-            mood for mood in MOOD_TO_GENRES.keys() if mood in user_query
-        ]
-        detected_activities = [
-            act for act in ACTIVITY_TO_GENRES.keys() if act in user_query
-        ]
+        hits = get_vocabulary().scan(user_query or "")
         return {
-            "moods": detected_moods,
-            "activities": detected_activities,
+            "moods": hits["mood"],
+            "activities": hits["activity"],
             "has_query": bool(user_query.strip()),
         }
 
@@ -305,13 +478,20 @@ class PlaylistRecommendationService:
         logger.debug("生成种子流派: %s", unique_genres)
         return unique_genres
 
-    async def _prepare_seed_names(
-        self, user_query: str, preferences: UserPreferences
+    async def _search_query_songs(self, user_query: str) -> List[Song]:
+        """根据 query 搜索候选歌曲（帮助 cold-start，同时提供 ID 推荐的种子）"""
+        if not user_query.strip():
+            return []
+        return await self._get_search_tool().search_songs(user_query, limit=5)
+
+    @staticmethod
+    def _preference_seed_names(
+        preferences: UserPreferences,
     ) -> Tuple[List[Dict[str, str]], List[str]]:
+        """用户显式偏好中的种子歌曲与艺术家（各取前 5 个）"""
         track_seeds: List[Dict[str, str]] = []
         artist_seeds: List[str] = []
 
-        # 用户显式偏好
         for fav in preferences.get("favorite_artists", [])[:5]:
             if fav and isinstance(fav, str):
                 artist_seeds.append(fav)
@@ -324,19 +504,19 @@ class PlaylistRecommendationService:
                 track_seeds.append(
                     {"song_name": title, "artist_name": artist or ""}
                 )
+        return track_seeds, artist_seeds
 
-        # 从 query 搜索候选歌曲（帮助 cold-start）
-        if user_query:
-            try:
-                search_results = await self._get_search_tool().search_songs(
-                    user_query, limit=3
-                )
-                for song in search_results:
-                    track_seeds.append(
-                        {"song_name": song.title, "artist_name": song.artist}
-                    )
-            except Exception as err:  # noqa: BLE001
-                logger.debug("根据 query 搜索歌曲失败: %s", err)
+    def _prepare_seed_names(
+        self, preferences: UserPreferences, search_results: Sequence[Song]
+    ) -> Tuple[List[Dict[str, str]], List[str]]:
+        # 用户显式偏好
+        track_seeds, artist_seeds = self._preference_seed_names(preferences)
+
+        # query 搜索结果的前 3 首
+        for song in search_results[:3]:
+            track_seeds.append(
+                {"song_name": song.title, "artist_name": song.artist}
+            )
 
         # 去重
         unique_tracks: List[Dict[str, str]] = []
@@ -362,19 +542,82 @@ class PlaylistRecommendationService:
         )
         return unique_tracks, unique_artists
 
-    async def _search_track_ids_for_query(self, query: str) -> List[str]:
-        if not query.strip():
+    async def _recommend_by_seeds(
+        self,
+        search_results: Sequence[Song],
+        preference_ids: Tuple[List[str], List[str]],
+        seed_genres: List[str],
+        limit: int,
+    ) -> List[Song]:
+        """偏好种子（已解析的 ID）在前、query 搜索的前 3 首在后，最多 5 首种子歌曲"""
+        preference_track_ids, preference_artist_ids = preference_ids
+        artist_ids = list(dict.fromkeys(preference_artist_ids))
+        top_songs = search_results[:3]
+        # 搜索结果通常已带 Spotify ID，只有本地曲库的结果需要按名称解析
+        unresolved = [
+            {"song_name": song.title, "artist_name": song.artist}
+            for song in top_songs
+            if not (song.spotify_id and song.spotify_id.strip())
+        ]
+        resolved_ids: List[str] = []
+        if unresolved:
+            resolved_ids, _ = await self.mcp_adapter.resolve_seed_ids(unresolved)
+        search_ids = [
+            song.spotify_id for song in top_songs if song.spotify_id and song.spotify_id.strip()
+        ]
+        track_ids = list(dict.fromkeys(preference_track_ids + search_ids + resolved_ids))[:5]
+        if not (track_ids or artist_ids or seed_genres):
             return []
+        return await self.mcp_adapter.get_recommendations(
+            seed_tracks=track_ids or None,
+            seed_artists=artist_ids or None,
+            seed_genres=seed_genres or None,
+            limit=limit,
+        )
+
+    @staticmethod
+    def _log_degraded(plan: TaskPlan, name: str) -> None:
+        """推荐任务超时或失败时说明候选会由后续步骤补充"""
+        status = plan.stats()[name]["status"]
+        if status in ("timeout", "error"):
+            logger.warning("推荐任务 %s 降级（%s），候选将由后续步骤补充", name, status)
+
+    async def _recommend_by_ids(
+        self, search_results: Sequence[Song], seed_genres: List[str], limit: int
+    ) -> List[Song]:
+        track_ids = [
+            song.spotify_id
+            for song in search_results
+            if song.spotify_id and song.spotify_id.strip()
+        ][:5]
+        if not (track_ids or seed_genres):
+            return []
+        return await self.mcp_adapter.get_recommendations(
+            seed_tracks=track_ids or None,
+            seed_genres=seed_genres or None,
+            limit=limit,
+        )
+
+    @staticmethod
+    def _mood_target(context: Dict[str, Any]) -> Optional[Dict[str, float]]:
+        for mood in context.get("moods", []):
+            target = find_mood_target(mood)
+            if target:
+                return target
+        return None
+
+    async def _rerank_by_mood(
+        self, songs: List[Song], target: Dict[str, float], keep: int
+    ) -> List[Song]:
+        """批量获取候选的音频特征（经缓存），向量化打分后保留得分最高的 keep 首"""
         try:
-            songs = await self._get_search_tool().search_songs(query, limit=5)
-            return [
-                song.spotify_id
-                for song in songs
-                if song.spotify_id and song.spotify_id.strip()
-            ][:5]
+            features_by_id = await self.mcp_adapter.get_audio_features(
+                [song.spotify_id for song in songs if song.spotify_id]
+            )
+            return get_mood_reranker().rerank(songs, features_by_id, target)[:keep]
         except Exception as err:  # noqa: BLE001
-            logger.debug("搜索歌曲 ID 失败: %s", err)
-            return []
+            logger.debug("按心情重排候选失败: %s", err)
+            return songs
 
     def _merge_unique_songs(self, songs: List[Song]) -> List[Song]:
         merged: List[Song] = []
@@ -0,0 +1,88 @@
+"""
+曲库向量索引（tools/embedding_index.py）的离线测试
+使用本地特征哈希嵌入（HashingEmbedding），不需要网络和凭证
+
+运行：python -m unittest tests.test_embedding_index
+"""
+
+import tempfile
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+import numpy as np
+
+from tools import embedding_index
+from tools.embedding_index import EmbeddingIndex, HashingEmbedding, load_or_build_index
+
+
+def make_song(title, artist, genre, year=2010, album=""):
+    return SimpleNamespace(title=title, artist=artist, album=album, genre=genre, year=year)
+
+
+CATALOG = [
+    make_song("晴天", "周杰伦", "流行"),
+    make_song("七里香", "周杰伦", "流行"),
+    make_song("Take Five", "Dave Brubeck", "爵士", 1959),
+    make_song("So What", "Miles Davis", "爵士", 1959),
+    make_song("光辉岁月", "Beyond", "摇滚", 1990),
+    make_song("海阔天空", "Beyond", "摇滚", 1993),
+    make_song("南山南", "马頔", "民谣", 2014),
+    make_song("成都", "赵雷", "民谣", 2016),
+]
+
+
+class EmbeddingIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.embedding = HashingEmbedding()
+        self.index = EmbeddingIndex.build(CATALOG, self.embedding)
+
+    def test_build_normalizes_vectors(self):
+        self.assertEqual(len(self.index), len(CATALOG))
+        self.assertIsNone(self.index.centroids)
+        norms = np.linalg.norm(np.asarray(self.index.vectors), axis=1)
+        np.testing.assert_allclose(norms, 1.0, rtol=1e-5)
+
+    def test_search_text_matches_genre_tags(self):
+        hits = self.index.search_text("放松 爵士", 2)
+        self.assertEqual({CATALOG[row].genre for row, _ in hits}, {"爵士"})
+        self.assertGreaterEqual(hits[0][1], hits[1][1])
+
+    def test_more_like_excludes_seeds(self):
+        hits = self.index.more_like([4], 3)
+        rows = [row for row, _ in hits]
+        self.assertNotIn(4, rows)
+        self.assertEqual(rows[0], 5)
+
+    def test_save_and_load_round_trip(self):
+        with tempfile.TemporaryDirectory() as path:
+            self.index.save(path)
+            loaded = EmbeddingIndex.load(path, self.embedding)
+            np.testing.assert_array_equal(np.asarray(loaded.vectors), np.asarray(self.index.vectors))
+            self.assertEqual(loaded.search_text("摇滚", 3), self.index.search_text("摇滚", 3))
+
+            with self.assertRaises(ValueError):
+                EmbeddingIndex.load(path, HashingEmbedding(dim=64))
+
+    def test_inverted_lists_are_saved_and_searched(self):
+        with mock.patch.object(embedding_index, "EXACT_SEARCH_MAX_ROWS", 4):
+            index = EmbeddingIndex.build(CATALOG, self.embedding)
+        self.assertIsNotNone(index.centroids)
+        self.assertEqual(sorted(np.asarray(index.list_rows).tolist()), list(range(len(CATALOG))))
+
+        with tempfile.TemporaryDirectory() as path:
+            index.save(path)
+            loaded = EmbeddingIndex.load(path, self.embedding)
+            self.assertEqual(len(loaded.centroids), len(index.centroids))
+            self.assertEqual(loaded.more_like([0], 3), index.more_like([0], 3))
+
+    def test_load_or_build_index_ignores_mismatched_catalog(self):
+        with tempfile.TemporaryDirectory() as path:
+            self.index.save(path)
+            self.assertEqual(len(load_or_build_index(path, CATALOG, self.embedding)), len(CATALOG))
+            rebuilt = load_or_build_index(path, CATALOG[:3], self.embedding)
+            self.assertEqual(len(rebuilt), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,136 @@
+"""
+收藏曲库增量同步（mcp/library_sync.py）的离线测试
+用假的 Spotify 客户端模拟按 added_at 倒序分页的收藏曲库，不需要网络和凭证
+
+运行：python -m unittest tests.test_library_sync
+"""
+
+import os
+import sys
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "mcp"))
+
+from library_sync import PAGE_SIZE, LibrarySync  # noqa: E402
+
+
+class FakeSpotify:
+    """按 added_at 倒序返回收藏曲库的假客户端，记录每次请求的 offset"""
+
+    def __init__(self, library):
+        # [(track_id 或 None, added_at)]，track_id 为 None 表示本地/不可用歌曲
+        self.library = library
+        self.offsets = []
+        self._lock = threading.Lock()
+
+    def add(self, track_id, added_at):
+        self.library.insert(0, (track_id, added_at))
+
+    def current_user(self):
+        return {"id": "user-1"}
+
+    def current_user_saved_tracks(self, limit, offset):
+        with self._lock:
+            self.offsets.append(offset)
+        items = [
+            {"added_at": added_at, "track": {"id": track_id} if track_id else None}
+            for track_id, added_at in self.library[offset:offset + limit]
+        ]
+        return {"total": len(self.library), "items": items}
+
+
+def make_library(size):
+    """size 首歌，added_at 各不相同，按新到旧排列"""
+    library = [(f"t{i}", f"2024-01-01T00:00:00Z#{i:06d}") for i in range(size)]
+    library.reverse()
+    return library
+
+
+class LibrarySyncTest(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "library_sync.sqlite3")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def _sync(self, sp):
+        return LibrarySync(lambda: sp, path=self.path, concurrency=4)
+
+    def test_full_sync_fetches_every_page(self):
+        sp = FakeSpotify(make_library(PAGE_SIZE * 4 + 7))
+        library = self._sync(sp)
+
+        track_ids = library.sync()
+
+        self.assertEqual(len(track_ids), PAGE_SIZE * 4 + 7)
+        self.assertEqual(sorted(sp.offsets), [0, 50, 100, 150, 200])
+        self.assertEqual(library.full_syncs, 1)
+
+    def test_incremental_sync_stops_at_known_items(self):
+        sp = FakeSpotify(make_library(PAGE_SIZE * 3))
+        library = self._sync(sp)
+        library.sync()
+
+        sp.offsets.clear()
+        library.sync()
+        self.assertEqual(sp.offsets, [0])
+        self.assertEqual(library.full_syncs, 1)
+
+        sp.add("new-1", "2025-01-01T00:00:00Z")
+        sp.add("new-2", "2025-01-02T00:00:00Z")
+        sp.offsets.clear()
+        library.sync()
+        self.assertEqual(sp.offsets, [0])
+        self.assertIn("new-1", library)
+        self.assertIn("new-2", library)
+        self.assertEqual(len(library), PAGE_SIZE * 3 + 2)
+        self.assertEqual(library.full_syncs, 1)
+
+    def test_removal_triggers_resync(self):
+        sp = FakeSpotify(make_library(PAGE_SIZE * 2))
+        library = self._sync(sp)
+        library.sync()
+
+        removed_id, _ = sp.library.pop(30)
+        library.sync()
+
+        self.assertEqual(library.full_syncs, 2)
+        self.assertNotIn(removed_id, library)
+        self.assertEqual(len(library), PAGE_SIZE * 2 - 1)
+
+    def test_items_without_track_id_do_not_force_resync(self):
+        library_items = make_library(PAGE_SIZE + 10)
+        library_items[3] = (None, library_items[3][1])
+        library_items[55] = (None, library_items[55][1])
+        sp = FakeSpotify(library_items)
+        library = self._sync(sp)
+        library.sync()
+        self.assertEqual(len(library), PAGE_SIZE + 8)
+
+        sp.add(None, "2025-01-01T00:00:00Z")
+        sp.add("new-1", "2025-01-02T00:00:00Z")
+        for _ in range(3):
+            library.sync()
+
+        self.assertEqual(library.full_syncs, 1)
+        self.assertIn("new-1", library)
+
+    def test_restart_resumes_incrementally(self):
+        sp = FakeSpotify(make_library(PAGE_SIZE * 2 + 5))
+        self._sync(sp).sync()
+
+        sp.offsets.clear()
+        restarted = self._sync(sp)
+        restarted.sync()
+
+        self.assertEqual(sp.offsets, [0])
+        self.assertEqual(restarted.full_syncs, 0)
+        self.assertEqual(len(restarted), PAGE_SIZE * 2 + 5)
+
+
+if __name__ == "__main__":
+    unittest.main()
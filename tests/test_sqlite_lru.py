@@ -0,0 +1,94 @@
+"""
+共享 SQLite LRU+TTL 存储（mcp/sqlite_lru.py）及其两个使用方的离线测试：
+应用侧的 SQLiteTTLCache（tools/cache.py）和 MCP 服务器的 TrackResolutionCache（mcp/track_cache.py）
+
+运行：python -m unittest tests.test_sqlite_lru
+"""
+
+import os
+import sys
+import tempfile
+import time
+import unittest
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / "mcp"))
+
+from sqlite_lru import SQLiteLRU, normalize_text  # noqa: E402
+from track_cache import TrackResolutionCache  # noqa: E402
+from tools.cache import SQLiteTTLCache, normalize_query  # noqa: E402
+
+
+class SQLiteLRUTest(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "cache.sqlite3")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_get_set_and_expiry(self):
+        store = SQLiteLRU(self.path, "t", ttl=60)
+        store.set("a", {"x": [1, 2]})
+        store.set("gone", 1, ttl=-1)
+        store.set("none", None)
+
+        self.assertEqual(store.get("a"), (True, {"x": [1, 2]}))
+        self.assertEqual(store.get("gone"), (False, None))
+        self.assertEqual(store.get("none"), (True, None))
+        self.assertEqual(store.get("missing"), (False, None))
+        self.assertEqual((store.hits, store.misses), (2, 2))
+
+    def test_batch_reads_and_writes(self):
+        store = SQLiteLRU(self.path, "t", max_entries=5000)
+        store.set_many({f"k{i}": i for i in range(1200)})
+        store.set("stale", 0, ttl=-1)
+
+        found = store.get_many([f"k{i}" for i in range(0, 1300, 2)] + ["stale", "k0"])
+
+        self.assertEqual(found, {f"k{i}": i for i in range(0, 1200, 2)})
+        self.assertEqual(store.hits, 600)
+
+    def test_evicts_least_recently_used(self):
+        store = SQLiteLRU(self.path, "t", max_entries=100)
+        store.EVICT_EVERY = 1
+        for i in range(100):
+            store.set(f"k{i}", i)
+        time.sleep(0.01)
+        store.get("k0")
+        store.set("k100", 100)
+
+        self.assertLessEqual(store.stats()["entries"], 100)
+        self.assertTrue(store.get("k0")[0])
+        self.assertTrue(store.get("k100")[0])
+        self.assertFalse(store.get("k1")[0])
+
+    def test_namespaces_share_a_file_independently(self):
+        intent = SQLiteTTLCache("intent", path=self.path)
+        tracks = TrackResolutionCache(path=self.path)
+        intent.set("晴天", {"intent_type": "search"})
+        tracks.set("晴天", "周杰伦", {"id": "t1", "available_markets": ["CN"]})
+
+        intent.clear()
+
+        self.assertEqual(intent.get("晴天"), (False, None))
+        self.assertEqual(tracks.get("晴天", "周杰伦"), (True, {"id": "t1"}))
+        self.assertEqual(intent.stats()["backend"], "sqlite")
+
+    def test_track_cache_normalizes_keys_and_remembers_misses(self):
+        tracks = TrackResolutionCache(path=self.path, negative_ttl=60)
+        tracks.set("晴天！", "周杰伦", {"id": "t1"})
+        tracks.set("不存在的歌", "", None)
+
+        self.assertEqual(tracks.get("  晴天 ", "周杰伦"), (True, {"id": "t1"}))
+        self.assertEqual(tracks.get("不存在的歌"), (True, None))
+
+    def test_app_and_mcp_share_one_normalization(self):
+        self.assertEqual(normalize_query("推荐一些放松的音乐！"), "推荐一些放松的音乐")
+        self.assertEqual(normalize_query("ＰＯＰ、Rock…"), normalize_text("pop rock"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,137 @@
+"""
+共享词表（tools/vocabulary.py）与原先按类别编译的多模式正则的一致性测试
+
+参照实现取自 Aho–Corasick 自动机引入之前 graphs/intent_classifier.py 中的 _build_matcher / _find：
+长词优先的多模式正则 + finditer，纯 ASCII 关键词按词边界匹配
+
+运行：python -m unittest tests.test_vocabulary
+"""
+
+import random
+import re
+import sys
+import unicodedata
+import unittest
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from tools.vocabulary import (  # noqa: E402
+    ACTIVITY_ALIASES,
+    ACTIVITY_TO_GENRES,
+    GENRE_VOCABULARY,
+    MOOD_ALIASES,
+    MOOD_TO_GENRES,
+    KeywordMatcher,
+    Vocabulary,
+)
+
+
+def _normalize(text: str) -> str:
+    """全角转半角并统一大小写"""
+    return unicodedata.normalize("NFKC", text or "").strip().lower()
+
+
+def _build_matcher(words: Iterable[str]) -> Optional["re.Pattern[str]"]:
+    """把词表编译成一个多模式正则（长词优先，英文词按词边界匹配）"""
+    patterns = []
+    for word in sorted({w.lower() for w in words if w}, key=len, reverse=True):
+        escaped = re.escape(word)
+        if word.isascii():
+            escaped = rf"(?<![a-z0-9]){escaped}(?![a-z0-9])"
+        patterns.append(escaped)
+    if not patterns:
+        return None
+    return re.compile("|".join(patterns))
+
+
+def _find(matcher: Optional["re.Pattern[str]"], text: str, canonical: Dict[str, str]) -> List[str]:
+    """返回文本中命中的标准词（按出现顺序去重）"""
+    if matcher is None:
+        return []
+    hits: List[str] = []
+    for match in matcher.finditer(text):
+        word = canonical[match.group(0)]
+        if word not in hits:
+            hits.append(word)
+    return hits
+
+
+# 与原分类器相同的三张表：关键词（小写）→ 标准词
+TABLES: Dict[str, Dict[str, str]] = {
+    "mood": {k.lower(): v for k, v in {**{w: w for w in MOOD_TO_GENRES}, **MOOD_ALIASES}.items()},
+    "activity": {k.lower(): v for k, v in {**{w: w for w in ACTIVITY_TO_GENRES}, **ACTIVITY_ALIASES}.items()},
+    "genre": {k.lower(): v for k, v in GENRE_VOCABULARY.items()},
+}
+
+# 容易出错的边界情况：英文词边界、大小写、全角、重叠与包含关系、别名
+EDGE_CASES = [
+    "",
+    "来点 trap music",
+    "rap",
+    "Rap和摇滚",
+    "hip hop 和 hip-hop 还有 hiphop",
+    "ＰＯＰ 音乐",
+    "pop-rock",
+    "pop2",
+    "k-pop",
+    "jazzy jazz",
+    "edm跑步",
+    "心情很好，想听开心的歌",
+    "心情不错心情很好",
+    "运动的时候听点激动的",
+    "学习和专注",
+    "emo了，来点丧的",
+    "EMO",
+    "电子电音",
+    "睡前助眠入睡",
+    "撸铁健身锻炼运动",
+    "摇滚rock摇滚",
+    "folk民谣folklore",
+]
+
+# 随机拼接用的片段：全部关键词、关键词的前后缀片段、以及会影响词边界的字符
+FRAGMENTS = sorted({keyword for table in TABLES.values() for keyword in table}) + [
+    "的", "歌", "音乐", "想听", "一点", " ", "  ", "-", ",", "，", "!", "a", "s", "1", "x", "ing", "心情", "很好",
+    "开", "心", "伤", "hip", "hop", "po", "ja", "zz", "ed", "m", "ＰＯＰ", "Rock", "JAZZ",
+]
+
+
+def random_texts(count: int, seed: int = 20240117) -> List[str]:
+    rng = random.Random(seed)
+    return ["".join(rng.choice(FRAGMENTS) for _ in range(rng.randint(1, 8))) for _ in range(count)]
+
+
+class VocabularyParityTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.vocabulary = Vocabulary()
+        cls.regexes = {kind: _build_matcher(table) for kind, table in TABLES.items()}
+        cls.matchers = {kind: KeywordMatcher(table) for kind, table in TABLES.items()}
+        cls.texts = EDGE_CASES + random_texts(3000)
+
+    def test_keyword_matcher_matches_regex_finditer(self):
+        for kind, table in TABLES.items():
+            regex, matcher = self.regexes[kind], self.matchers[kind]
+            for text in self.texts:
+                normalized = _normalize(text)
+                expected = [match.group(0) for match in regex.finditer(normalized)]
+                self.assertEqual(matcher.find(normalized), expected, f"{kind}: {text!r}")
+
+    def test_scan_matches_per_table_regexes(self):
+        for text in self.texts:
+            normalized = _normalize(text)
+            expected = {
+                kind: _find(self.regexes[kind], normalized, table) for kind, table in TABLES.items()
+            }
+            self.assertEqual(self.vocabulary.scan(text), expected, repr(text))
+
+    def test_ascii_keywords_respect_word_boundaries(self):
+        self.assertEqual(self.vocabulary.scan("来点 trap music")["genre"], [])
+        self.assertEqual(self.vocabulary.scan("来点 hip hop")["genre"], ["说唱"])
+        self.assertEqual(self.vocabulary.scan("EMO 了")["mood"], ["丧"])
+
+
+if __name__ == "__main__":
+    unittest.main()
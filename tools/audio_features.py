@@ -0,0 +1,163 @@
+"""
+音频特征存储
+按歌曲缓存 Spotify 音频特征（valence、energy、danceability、tempo 等）：
+进程内 LRU 在前，持久化缓存（默认 SQLite，多个 worker 共享）在后；
+批量获取时只请求两级缓存都没有的 ID，按每批 100 个并发请求
+"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional
+
+from config.logging_config import get_logger
+from tools.cache import TTLCache, create_cache
+
+logger = get_logger(__name__)
+
+# Spotify audio-features 接口单次最多 100 个 ID
+BATCH_SIZE = 100
+
+# 保留的特征字段
+AUDIO_FEATURE_KEYS = (
+    "danceability",
+    "energy",
+    "valence",
+    "tempo",
+    "acousticness",
+    "instrumentalness",
+    "speechiness",
+    "liveness",
+    "loudness",
+)
+
+# 批量获取函数：一批（不超过 BATCH_SIZE 个）ID → Spotify 返回的特征列表（无特征的歌曲为 None）
+FeatureFetcher = Callable[[List[str]], Awaitable[Optional[List[Optional[Dict[str, Any]]]]]]
+
+
+def extract_features(raw: Dict[str, Any]) -> Dict[str, Any]:
+    """从 Spotify 音频特征中取出保留的字段"""
+    return {key: raw.get(key) for key in AUDIO_FEATURE_KEYS}
+
+
+class AudioFeatureStore:
+    """
+    两级音频特征缓存
+
+    音频特征不随时间变化，默认缓存 30 天；Spotify 没有特征的歌曲记为空字典，缓存 1 天，
+    避免反复请求；请求失败的批次不写缓存
+    """
+
+    def __init__(
+        self,
+        memory_entries: int = 20000,
+        ttl: float = 30 * 86400,
+        missing_ttl: float = 86400,
+    ):
+        """
+        Args:
+            memory_entries: 进程内 LRU 的最大歌曲数
+            ttl: 特征的缓存时间（秒）
+            missing_ttl: 无特征歌曲的缓存时间（秒）
+        """
+        self.memory = TTLCache(max_entries=memory_entries, ttl=ttl)
+        # 持久化层由 AUDIO_FEATURES_CACHE_BACKEND 等环境变量控制（默认 sqlite，none 关闭）
+        self.persistent = create_cache("audio_features", max_entries=500000, ttl=ttl, default_backend="sqlite")
+        self.missing_ttl = missing_ttl
+        self.fetched = 0
+
+    def _lookup_many(self, track_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        依次查询进程内缓存和持久化缓存（一条批量查询），持久化层命中时回填进程内缓存
+
+        Returns:
+            命中的 {track_id: 特征字典}（无特征的歌曲为空字典）
+        """
+        found: Dict[str, Dict[str, Any]] = {}
+        for track_id in track_ids:
+            hit, features = self.memory.get(track_id)
+            if hit:
+                found[track_id] = features
+        rest = [track_id for track_id in track_ids if track_id not in found]
+        if rest and self.persistent is not None:
+            for track_id, features in self.persistent.get_many(rest).items():
+                self.memory.set(track_id, features, ttl=None if features else self.missing_ttl)
+                found[track_id] = features
+        return found
+
+    def _store_many(self, features_by_id: Dict[str, Dict[str, Any]]) -> None:
+        """写入两级缓存；持久化层按有无特征分两次批量写入（各一次提交）"""
+        groups: Dict[Optional[float], Dict[str, Dict[str, Any]]] = {}
+        for track_id, features in features_by_id.items():
+            ttl = None if features else self.missing_ttl
+            self.memory.set(track_id, features, ttl=ttl)
+            groups.setdefault(ttl, {})[track_id] = features
+        if self.persistent is not None:
+            try:
+                for ttl, items in groups.items():
+                    self.persistent.set_many(items, ttl=ttl)
+            except Exception as e:
+                logger.debug(f"写入音频特征持久化缓存失败: {e}")
+
+    async def get_many(self, track_ids: Iterable[str], fetch: FeatureFetcher) -> Dict[str, Dict[str, Any]]:
+        """
+        批量获取音频特征
+
+        缓存读写都是批量的 SQLite 操作，放到线程中执行，不阻塞事件循环
+
+        Args:
+            track_ids: Spotify 歌曲 ID（可重复，空值忽略）
+            fetch: 缓存未命中时按批调用的获取函数
+
+        Returns:
+            {track_id: 特征字典}，没有特征或获取失败的歌曲不在结果中
+        """
+        unique_ids = list(dict.fromkeys(track_id for track_id in track_ids if track_id))
+        if not unique_ids:
+            return {}
+        cached = await asyncio.to_thread(self._lookup_many, unique_ids)
+        result = {track_id: features for track_id, features in cached.items() if features}
+        missing = [track_id for track_id in unique_ids if track_id not in cached]
+        if not missing:
+            return result
+
+        chunks = [missing[i:i + BATCH_SIZE] for i in range(0, len(missing), BATCH_SIZE)]
+        responses = await asyncio.gather(*(fetch(chunk) for chunk in chunks), return_exceptions=True)
+        fetched: Dict[str, Dict[str, Any]] = {}
+        for chunk, response in zip(chunks, responses):
+            if isinstance(response, BaseException):
+                logger.debug(f"获取音频特征失败（{len(chunk)} 首）: {response}")
+                continue
+            by_id = {raw["id"]: raw for raw in response or [] if raw and raw.get("id")}
+            for track_id in chunk:
+                raw = by_id.get(track_id)
+                fetched[track_id] = extract_features(raw) if raw else {}
+            self.fetched += len(chunk)
+        if fetched:
+            await asyncio.to_thread(self._store_many, fetched)
+            result.update((track_id, features) for track_id, features in fetched.items() if features)
+        logger.debug(f"音频特征: 缓存命中 {len(cached)} 首，请求 {len(missing)} 首")
+        return result
+
+    def clear(self) -> None:
+        """清空两级缓存"""
+        self.memory.clear()
+        if self.persistent is not None:
+            self.persistent.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """两级缓存的命中统计与已请求的歌曲数"""
+        return {
+            "memory": self.memory.stats(),
+            "persistent": self.persistent.stats() if self.persistent is not None else None,
+            "fetched": self.fetched,
+        }
+
+
+_audio_feature_store: Optional[AudioFeatureStore] = None
+
+
+def get_audio_feature_store() -> AudioFeatureStore:
+    """获取进程级共享的音频特征存储"""
+    global _audio_feature_store
+    if _audio_feature_store is None:
+        _audio_feature_store = AudioFeatureStore()
+    return _audio_feature_store
@@ -0,0 +1,181 @@
+"""
+通用缓存
+提供进程内 LRU+TTL 缓存，以及可在多个 worker 之间共享的 SQLite 后端
+"""
+
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Mapping, Optional, Tuple
+
+from config.logging_config import get_logger
+
+# SQLite 存储和文本规范化与 MCP 服务器共用 mcp/sqlite_lru.py 中的同一份实现
+# （MCP 服务器独立运行时只能看到 mcp/ 目录，共享代码因此放在那里）
+_MCP_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "mcp")
+if _MCP_DIR not in sys.path:
+    sys.path.append(_MCP_DIR)
+
+from sqlite_lru import SQLiteLRU, normalize_text  # noqa: E402
+
+logger = get_logger(__name__)
+
+# 默认的 SQLite 缓存文件位置（项目根目录下）
+DEFAULT_SQLITE_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app_cache.sqlite3"
+)
+
+
+def normalize_query(text: str) -> str:
+    """
+    规范化查询文本，用作缓存键
+
+    全角转半角、统一大小写、去掉标点并折叠空白，
+    使 "推荐一些放松的音乐！" 与 "推荐一些放松的音乐" 命中同一条缓存
+    """
+    return normalize_text(text)
+
+
+class TTLCache:
+    """线程安全的进程内 LRU+TTL 缓存"""
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 3600):
+        """
+        Args:
+            max_entries: 最大条目数，超出后淘汰最久未使用的条目
+            ttl: 条目存活时间（秒）
+        """
+        self.max_entries = max(1, max_entries)
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Tuple[bool, Any]:
+        """
+        读取缓存
+
+        Returns:
+            (found, value)：未命中或已过期时 found 为 False
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[0] < now:
+                if entry is not None:
+                    del self._data[key]
+                self.misses += 1
+                return False, None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return True, entry[1]
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        """写入缓存，ttl 为 None 时使用默认存活时间"""
+        expires_at = time.time() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Any]:
+        """批量读取，返回命中的 {key: value}"""
+        found: Dict[str, Any] = {}
+        for key in keys:
+            hit, value = self.get(key)
+            if hit:
+                found[key] = value
+        return found
+
+    def set_many(self, items: Mapping[str, Any], ttl: Optional[float] = None) -> None:
+        """批量写入，ttl 为 None 时使用默认存活时间"""
+        for key, value in items.items():
+            self.set(key, value, ttl=ttl)
+
+    def delete(self, key: str) -> None:
+        """删除单个条目"""
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        """清空缓存"""
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """返回命中统计与当前条目数"""
+        total = self.hits + self.misses
+        return {
+            "backend": "memory",
+            "entries": len(self._data),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+        }
+
+
+class SQLiteTTLCache(SQLiteLRU):
+    """
+    基于 SQLite 的 LRU+TTL 缓存
+
+    接口与 TTLCache 一致，值以 JSON 存储；多个进程指向同一文件即可共享缓存，
+    不同用途通过 namespace 区分。读写、淘汰逻辑见 mcp/sqlite_lru.py
+    """
+
+    def __init__(
+        self,
+        namespace: str,
+        path: Optional[str] = None,
+        max_entries: int = 10000,
+        ttl: float = 3600,
+    ):
+        """
+        Args:
+            namespace: 缓存命名空间（如 "intent"）
+            path: SQLite 文件路径，默认读取环境变量 APP_CACHE_PATH
+            max_entries: 该命名空间的最大条目数
+            ttl: 条目存活时间（秒）
+        """
+        super().__init__(
+            path or os.getenv("APP_CACHE_PATH", DEFAULT_SQLITE_PATH),
+            namespace,
+            max_entries=max_entries,
+            ttl=ttl,
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        """返回命中统计与当前条目数"""
+        return {"backend": "sqlite", **super().stats()}
+
+
+def create_cache(namespace: str, max_entries: int = 1024, ttl: float = 3600, default_backend: str = "memory"):
+    """
+    按环境变量创建缓存实例
+
+    读取 {NAMESPACE}_CACHE_BACKEND（memory / sqlite / none，默认 default_backend）、
+    {NAMESPACE}_CACHE_MAX_ENTRIES 和 {NAMESPACE}_CACHE_TTL 覆盖默认参数；
+    SQLite 后端不可用时退回进程内缓存
+
+    Returns:
+        TTLCache / SQLiteTTLCache 实例，backend 为 none 时返回 None
+    """
+    prefix = namespace.upper()
+    backend = os.getenv(f"{prefix}_CACHE_BACKEND", default_backend).lower()
+    try:
+        max_entries = int(os.getenv(f"{prefix}_CACHE_MAX_ENTRIES", max_entries))
+        ttl = float(os.getenv(f"{prefix}_CACHE_TTL", ttl))
+    except ValueError:
+        logger.warning(f"{prefix} 缓存配置无效，使用默认值")
+
+    if backend == "none":
+        return None
+    if backend == "sqlite":
+        try:
+            return SQLiteTTLCache(namespace, max_entries=max_entries, ttl=ttl)
+        except Exception as e:
+            logger.warning(f"SQLite 缓存不可用，使用进程内缓存: {str(e)}")
+    return TTLCache(max_entries=max_entries, ttl=ttl)
@@ -0,0 +1,208 @@
+"""
+本地曲库索引
+在加载曲库时一次性建立倒排索引和预排序顺序，查询时不再对整个曲库做线性扫描和排序
+"""
+
+import heapq
+from collections import defaultdict
+from itertools import islice
+from typing import TYPE_CHECKING, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
+
+if TYPE_CHECKING:
+    from tools.music_tools import Song
+
+# 年代相近的判定范围（年）
+YEAR_WINDOW = 3
+
+
+class SubstringIndex:
+    """
+    对一组去重后的小写字符串建立字符 n-gram 倒排表，支持 "query in value" 子串查询
+
+    单字查询使用单字倒排，两个字及以上取查询中各二元组倒排的交集后再逐个确认，
+    候选集合通常远小于全部取值
+    """
+
+    def __init__(self, values: Iterable[str]):
+        self.values: Set[str] = set(values)
+        self._unigrams: Dict[str, Set[str]] = defaultdict(set)
+        self._bigrams: Dict[str, Set[str]] = defaultdict(set)
+        for value in self.values:
+            for ch in value:
+                self._unigrams[ch].add(value)
+            for i in range(len(value) - 1):
+                self._bigrams[value[i:i + 2]].add(value)
+
+    def find(self, query: str) -> List[str]:
+        """返回包含 query 的全部取值"""
+        if not query:
+            return list(self.values)
+        if len(query) == 1:
+            return list(self._unigrams.get(query, ()))
+
+        postings = []
+        for i in range(len(query) - 1):
+            posting = self._bigrams.get(query[i:i + 2])
+            if not posting:
+                return []
+            postings.append(posting)
+        postings.sort(key=len)
+        candidates = set(postings[0])
+        for posting in postings[1:]:
+            candidates &= posting
+            if not candidates:
+                return []
+        return [value for value in candidates if query in value]
+
+
+class CatalogIndex:
+    """
+    本地曲库的内存索引
+
+    - 流派 / 艺术家：小写取值 → 歌曲下标倒排（流派按流行度、艺术家按年份预排序），
+      配合子串索引保持原先 "关键词 in 字段" 的匹配语义
+    - 流行度降序的全局顺序
+    - (歌名, 艺术家) 精确查找
+    - 流派、年份、(流派, 年份) 倒排，用于相似歌曲的分层候选
+
+    所有排序都是稳定的，与原先在整个曲库上 sort 的结果一致
+    """
+
+    def __init__(self, songs: Sequence["Song"]):
+        self.songs = list(songs)
+
+        genre_postings: Dict[str, List[int]] = defaultdict(list)
+        artist_postings: Dict[str, List[int]] = defaultdict(list)
+        self._by_title_artist: Dict[Tuple[str, str], int] = {}
+        self._by_exact_genre: Dict[Optional[str], List[int]] = defaultdict(list)
+        self._by_exact_artist: Dict[str, List[int]] = defaultdict(list)
+        self._by_year: Dict[int, List[int]] = defaultdict(list)
+        self._by_genre_year: Dict[Tuple[Optional[str], int], List[int]] = defaultdict(list)
+
+        for i, song in enumerate(self.songs):
+            if song.genre:
+                genre_postings[song.genre.lower()].append(i)
+            artist_postings[song.artist.lower()].append(i)
+            self._by_title_artist.setdefault((song.title.lower(), song.artist.lower()), i)
+            self._by_exact_genre[song.genre].append(i)
+            self._by_exact_artist[song.artist].append(i)
+            if song.year:
+                self._by_year[song.year].append(i)
+                self._by_genre_year[(song.genre, song.year)].append(i)
+
+        # 倒排表内预先排好序：流派按流行度降序，艺术家按年份降序（同值保持曲库顺序）
+        self._popularity_key: Callable[[int], int] = [-(song.popularity or 0) for song in self.songs].__getitem__
+        self._year_key: Callable[[int], int] = [-(song.year or 0) for song in self.songs].__getitem__
+        self._genre_postings: Dict[str, Sequence[int]] = {
+            genre: sorted(ids, key=self._popularity_key)
+            for genre, ids in genre_postings.items()
+        }
+        self._artist_postings: Dict[str, Sequence[int]] = {
+            artist: sorted(ids, key=self._year_key)
+            for artist, ids in artist_postings.items()
+        }
+        self._genre_values = SubstringIndex(self._genre_postings)
+        self._artist_values = SubstringIndex(self._artist_postings)
+
+        self._popularity_order: Sequence[int] = sorted(range(len(self.songs)), key=self._popularity_key)
+
+    def __len__(self) -> int:
+        return len(self.songs)
+
+    def _merge(self, postings: List[Sequence[int]], sort_key: Callable[[int], int], limit: int) -> List["Song"]:
+        """合并多个已排序的倒排表，取前 limit 首"""
+        if len(postings) == 1:
+            ids: Iterable[int] = postings[0]
+        else:
+            ids = heapq.merge(*postings, key=lambda i: (sort_key(i), i))
+        return [self.songs[i] for i in islice(ids, max(limit, 0))]
+
+    def songs_by_genre(self, genre: str, limit: int) -> List["Song"]:
+        """流派包含关键词的歌曲，按流行度降序"""
+        postings = [self._genre_postings[g] for g in self._genre_values.find(genre.lower())]
+        return self._merge(postings, self._popularity_key, limit)
+
+    def songs_by_artist(self, artist: str, limit: int) -> List["Song"]:
+        """艺术家包含关键词的歌曲，按年份降序"""
+        postings = [self._artist_postings[a] for a in self._artist_values.find(artist.lower())]
+        return self._merge(postings, self._year_key, limit)
+
+    def popular_songs(self, limit: int) -> List["Song"]:
+        """流行度最高的歌曲"""
+        return [self.songs[i] for i in self._popularity_order[:max(limit, 0)]]
+
+    def artists(self) -> Set[str]:
+        """曲库中出现过的全部艺术家名"""
+        return {song.artist for song in self.songs}
+
+    def find_row(self, title: str, artist: str) -> Optional[int]:
+        """按 (歌名, 艺术家) 精确查找（不区分大小写），返回曲库中第一首匹配歌曲的下标"""
+        return self._by_title_artist.get((title.lower(), artist.lower()))
+
+    def find_song(self, title: str, artist: str) -> Optional["Song"]:
+        """按 (歌名, 艺术家) 精确查找（不区分大小写），返回曲库中第一首匹配的歌曲"""
+        i = self.find_row(title, artist)
+        return None if i is None else self.songs[i]
+
+    # 相似歌曲使用的分桶，均按曲库顺序返回下标
+    def _artist_rows(self, artist: str) -> Sequence[int]:
+        return self._by_exact_artist.get(artist, ())
+
+    def _genre_rows(self, genre: Optional[str]) -> Iterable[int]:
+        return self._by_exact_genre.get(genre, ())
+
+    def _genre_year_rows(self, genre: Optional[str], year: int) -> Sequence[int]:
+        return self._by_genre_year.get((genre, year), ())
+
+    def _year_rows(self, year: int) -> Sequence[int]:
+        return self._by_year.get(year, ())
+
+    def similar_songs(self, original: "Song", limit: int) -> List["Song"]:
+        """
+        与原曲相似的歌曲，评分规则：
+        流派相同 +50；艺术家相同 +40，否则流派相同（且非空）再 +20；年份相差 3 年以内 +10
+
+        同一层候选的分数相同，按层生成后按 (分数降序, 曲库顺序) 归并，
+        只会读取到凑满 limit 首为止
+        """
+        genre_score = 50 + (20 if original.genre else 0)
+        year = original.year
+
+        def is_self(song: "Song") -> bool:
+            return song.title == original.title and song.artist == original.artist
+
+        def near_year(song: "Song") -> bool:
+            return bool(year and song.year and abs(song.year - year) <= YEAR_WINDOW)
+
+        def near_years(rows: Callable[[int], Sequence[int]]) -> Iterator[int]:
+            if not year:
+                return iter(())
+            return heapq.merge(*(rows(y) for y in range(year - YEAR_WINDOW, year + YEAR_WINDOW + 1)))
+
+        # 同艺术家：数量少，逐首计算分数
+        same_artist = []
+        for i in self._artist_rows(original.artist):
+            song = self.songs[i]
+            if is_self(song):
+                continue
+            score = 40 + (50 if song.genre == original.genre else 0) + (10 if near_year(song) else 0)
+            same_artist.append((-score, i))
+        same_artist.sort()
+
+        def tier(ids: Iterable[int], score: int, keep) -> Iterator[Tuple[int, int]]:
+            for i in ids:
+                song = self.songs[i]
+                if song.artist != original.artist and keep(song):
+                    yield (-score, i)
+
+        genre_near = near_years(lambda y: self._genre_year_rows(original.genre, y))
+        genre_far = self._genre_rows(original.genre)
+        year_near = near_years(self._year_rows)
+
+        tiers = heapq.merge(
+            iter(same_artist),
+            tier(genre_near, genre_score + 10, lambda song: True),
+            tier(genre_far, genre_score, lambda song: not near_year(song)),
+            tier(year_near, 10, lambda song: song.genre != original.genre),
+        )
+        return [self.songs[i] for _, i in islice(tiers, max(limit, 0))]
@@ -0,0 +1,383 @@
+"""
+列式曲库存储
+把曲库转换为 NumPy 列 + 字符串表，以内存映射方式加载：
+多个 uvicorn worker 共享同一份只读页面，启动时不再解析整个 JSON，进程内存不随曲库增长
+
+目录结构：
+    meta.json                 格式版本与歌曲数（最后写入，存在即表示转换完成）
+    strings.bin               去重后的 UTF-8 字符串拼接
+    string_offsets.npy        第 i 个字符串为 strings.bin[offsets[i]:offsets[i+1]]
+    title/artist/album/genre.npy          字符串 ID（int32，-1 表示空）
+    year/duration/popularity.npy          整数列（int32，-1 表示空）
+    popularity_order.npy                  按流行度降序的行号
+    {分组}_rows/_offsets/_keys.npy        预先分组排序好的行号（见 convert_catalog）
+    key_hash.npy / key_rows.npy           (歌名, 艺术家) 小写哈希的有序表
+
+转换：
+    python -m tools.catalog_store data/music_database.json data/catalog
+    python -m tools.catalog_store catalog.csv data/catalog
+"""
+
+import csv
+import hashlib
+import json
+import mmap
+import os
+import sys
+from collections.abc import Sequence
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+
+import numpy as np
+
+from config.logging_config import get_logger
+from tools.catalog_index import CatalogIndex, SubstringIndex
+
+logger = get_logger(__name__)
+
+FORMAT_VERSION = 1
+
+_STRING_COLUMNS = ("title", "artist", "album", "genre")
+_INT_COLUMNS = ("year", "duration", "popularity")
+
+
+def key_hash(title: str, artist: str) -> int:
+    """(歌名, 艺术家) 小写后的 64 位稳定哈希（不受 PYTHONHASHSEED 影响）"""
+    data = f"{title.lower()}\0{artist.lower()}".encode("utf-8")
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), "little")
+
+
+def _to_int(value: Any) -> int:
+    """CSV/JSON 中的整数字段，空值记为 -1"""
+    if value is None or value == "":
+        return -1
+    try:
+        return int(float(value))
+    except (TypeError, ValueError):
+        return -1
+
+
+def _read_records(source: Path) -> List[Dict[str, Any]]:
+    """读取 JSON 数组或带表头的 CSV"""
+    if source.suffix.lower() == ".csv":
+        with open(source, "r", encoding="utf-8-sig", newline="") as f:
+            return list(csv.DictReader(f))
+    with open(source, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+class _StringTable:
+    """构建去重字符串表"""
+
+    def __init__(self):
+        self.ids: Dict[str, int] = {}
+        self.values: List[str] = []
+
+    def add(self, value: Optional[str], keep_empty: bool = False) -> int:
+        """返回字符串 ID；None 以及（keep_empty 为 False 时的）空串记为 -1"""
+        if value is None or (value == "" and not keep_empty):
+            return -1
+        value = str(value)
+        string_id = self.ids.get(value)
+        if string_id is None:
+            string_id = len(self.values)
+            self.ids[value] = string_id
+            self.values.append(value)
+        return string_id
+
+
+def _save_groups(output_dir: Path, name: str, rows: np.ndarray, *keys: np.ndarray) -> None:
+    """
+    保存按 keys 分组的行号
+
+    rows 已按 (keys..., 组内顺序) 排好；写出 {name}_rows、每组起点 {name}_offsets（末尾为总数）
+    和每组的键 {name}_keys（多个键时为二维数组）
+    """
+    if len(rows):
+        stacked = np.stack(keys, axis=1)
+        changed = np.any(stacked[1:] != stacked[:-1], axis=1)
+        starts = np.concatenate(([0], np.flatnonzero(changed) + 1))
+    else:
+        stacked = np.zeros((0, len(keys)), dtype=np.int64)
+        starts = np.zeros(0, dtype=np.int64)
+    group_keys = stacked[starts] if len(keys) > 1 else stacked[starts, 0]
+    np.save(output_dir / f"{name}_rows.npy", rows.astype(np.int32))
+    np.save(output_dir / f"{name}_offsets.npy", np.concatenate((starts, [len(rows)])).astype(np.int64))
+    np.save(output_dir / f"{name}_keys.npy", group_keys.astype(np.int64))
+
+
+def convert_catalog(source: str, output_dir: str) -> int:
+    """
+    把 music_database.json / CSV 转换为列式曲库
+
+    除了原始列，还预先计算查询需要的顺序，加载时直接内存映射使用：
+    - genre_lower：按小写流派分组，组内按流行度降序
+    - artist_lower：按小写艺术家分组，组内按年份降序
+    - genre / genre_year / year：按流派 / (流派, 年份) / 年份分组，组内按曲库顺序
+    所有排序都是稳定的（同值保持曲库顺序）
+
+    Args:
+        source: JSON 数组或 CSV 文件路径（字段与 Song 一致）
+        output_dir: 输出目录
+
+    Returns:
+        转换的歌曲数
+    """
+    source_path = Path(source)
+    output = Path(output_dir)
+    output.mkdir(parents=True, exist_ok=True)
+    meta_path = output / "meta.json"
+    if meta_path.exists():
+        meta_path.unlink()
+
+    records = _read_records(source_path)
+    count = len(records)
+    strings = _StringTable()
+    columns = {name: np.full(count, -1, dtype=np.int32) for name in _STRING_COLUMNS + _INT_COLUMNS}
+    hashes = np.zeros(count, dtype=np.uint64)
+
+    for i, item in enumerate(records):
+        title = str(item.get("title") or "")
+        artist = str(item.get("artist") or "")
+        # 歌名/艺术家是 Song 的必填字段，空值保留为空串
+        columns["title"][i] = strings.add(title, keep_empty=True)
+        columns["artist"][i] = strings.add(artist, keep_empty=True)
+        columns["album"][i] = strings.add(item.get("album"))
+        columns["genre"][i] = strings.add(item.get("genre"))
+        for name in _INT_COLUMNS:
+            columns[name][i] = _to_int(item.get(name))
+        hashes[i] = key_hash(title, artist)
+
+    rows = np.arange(count, dtype=np.int64)
+    neg_popularity = -np.maximum(columns["popularity"], 0).astype(np.int64)
+    year_key = np.maximum(columns["year"], 0).astype(np.int64)
+
+    # 小写取值作为分组键，写入同一张字符串表
+    def lower_ids(column: np.ndarray) -> np.ndarray:
+        mapping = {sid: strings.add(strings.values[sid].lower(), keep_empty=True) for sid in np.unique(column[column >= 0]).tolist()}
+        return np.array([mapping.get(int(sid), -1) for sid in column], dtype=np.int64)
+
+    genre_lower = lower_ids(columns["genre"])
+    artist_lower = lower_ids(columns["artist"])
+
+    np.save(output / "popularity_order.npy", np.argsort(neg_popularity, kind="stable").astype(np.int32))
+
+    has_genre = rows[genre_lower >= 0]
+    order = has_genre[np.lexsort((has_genre, neg_popularity[has_genre], genre_lower[has_genre]))]
+    _save_groups(output, "genre_lower", order, genre_lower[order])
+
+    order = np.lexsort((rows, -year_key, artist_lower))
+    _save_groups(output, "artist_lower", order, artist_lower[order])
+
+    genre = columns["genre"].astype(np.int64)
+    order = np.lexsort((rows, genre))
+    _save_groups(output, "genre", order, genre[order])
+
+    has_year = rows[year_key > 0]
+    order = has_year[np.lexsort((has_year, year_key[has_year], genre[has_year]))]
+    _save_groups(output, "genre_year", order, genre[order], year_key[order])
+
+    order = has_year[np.lexsort((has_year, year_key[has_year]))]
+    _save_groups(output, "year", order, year_key[order])
+
+    order = np.lexsort((rows, hashes))
+    np.save(output / "key_hash.npy", hashes[order])
+    np.save(output / "key_rows.npy", order.astype(np.int32))
+
+    for name, column in columns.items():
+        np.save(output / f"{name}.npy", column)
+
+    encoded = [value.encode("utf-8") for value in strings.values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(b) for b in encoded], out=offsets[1:])
+    with open(output / "strings.bin", "wb") as f:
+        for b in encoded:
+            f.write(b)
+    np.save(output / "string_offsets.npy", offsets)
+
+    with open(meta_path, "w", encoding="utf-8") as f:
+        json.dump({"version": FORMAT_VERSION, "count": count, "strings": len(encoded)}, f)
+
+    logger.info(f"已转换 {count} 首歌曲到列式曲库: {output}")
+    return count
+
+
+class _Groups:
+    """内存映射的分组行号（_save_groups 的读取端）"""
+
+    def __init__(self, path: Path, name: str):
+        self.rows = np.load(path / f"{name}_rows.npy", mmap_mode="r")
+        self.offsets = np.load(path / f"{name}_offsets.npy", mmap_mode="r")
+        self.keys = np.load(path / f"{name}_keys.npy", mmap_mode="r")
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def group(self, n: int) -> np.ndarray:
+        return self.rows[self.offsets[n]:self.offsets[n + 1]]
+
+    def find(self, key: Any) -> np.ndarray:
+        """按键查找一组（keys 有序，二分查找）"""
+        if self.keys.ndim == 1:
+            n = int(np.searchsorted(self.keys, key))
+            if n < len(self.keys) and self.keys[n] == key:
+                return self.group(n)
+        else:
+            # 多列键按字典序排列，逐列缩小范围
+            lo, hi = 0, len(self.keys)
+            for col, value in enumerate(key):
+                column = self.keys[lo:hi, col]
+                lo, hi = lo + int(np.searchsorted(column, value, "left")), lo + int(np.searchsorted(column, value, "right"))
+                if lo >= hi:
+                    break
+            if lo < hi:
+                return self.group(lo)
+        return self.rows[0:0]
+
+
+class ColumnarCatalog(Sequence):
+    """
+    内存映射的列式曲库
+
+    行为与 List[Song] 一致：按下标读取时才构造 Song 对象
+    """
+
+    def __init__(self, path: str):
+        from tools.music_tools import Song
+
+        self.path = Path(path)
+        with open(self.path / "meta.json", "r", encoding="utf-8") as f:
+            self.meta = json.load(f)
+        if self.meta.get("version") != FORMAT_VERSION:
+            raise ValueError(f"不支持的列式曲库版本: {self.meta.get('version')}")
+
+        self._song_cls = Song
+        self.columns = {
+            name: np.load(self.path / f"{name}.npy", mmap_mode="r")
+            for name in _STRING_COLUMNS + _INT_COLUMNS
+        }
+        self._string_offsets = np.load(self.path / "string_offsets.npy", mmap_mode="r")
+        self._strings_file = open(self.path / "strings.bin", "rb")
+        size = os.fstat(self._strings_file.fileno()).st_size
+        self._strings = mmap.mmap(self._strings_file.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+
+    def __len__(self) -> int:
+        return int(self.meta["count"])
+
+    def string(self, string_id: int) -> Optional[str]:
+        """字符串表取值，-1 为 None"""
+        if string_id < 0:
+            return None
+        start, end = self._string_offsets[string_id], self._string_offsets[string_id + 1]
+        return self._strings[start:end].decode("utf-8")
+
+    def _int(self, name: str, i: int) -> Optional[int]:
+        value = int(self.columns[name][i])
+        return None if value < 0 else value
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        i = int(i)
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        return self._song_cls(
+            title=self.string(int(self.columns["title"][i])) or "",
+            artist=self.string(int(self.columns["artist"][i])) or "",
+            album=self.string(int(self.columns["album"][i])),
+            genre=self.string(int(self.columns["genre"][i])),
+            year=self._int("year", i),
+            duration=self._int("duration", i),
+            popularity=self._int("popularity", i),
+        )
+
+    def __iter__(self) -> Iterator:
+        for i in range(len(self)):
+            yield self[i]
+
+
+class ColumnarCatalogIndex(CatalogIndex):
+    """
+    列式曲库的索引
+
+    查询接口与 CatalogIndex 相同；倒排表和排序都在转换时写好并内存映射，
+    启动时只为去重后的流派/艺术家建立子串索引
+    """
+
+    def __init__(self, catalog: ColumnarCatalog):
+        self.songs = catalog
+        path = catalog.path
+        popularity = catalog.columns["popularity"]
+        year = catalog.columns["year"]
+        self._popularity_key = lambda i: -max(int(popularity[i]), 0)
+        self._year_key = lambda i: -max(int(year[i]), 0)
+        self._popularity_order = np.load(path / "popularity_order.npy", mmap_mode="r")
+
+        genre_groups = _Groups(path, "genre_lower")
+        artist_groups = _Groups(path, "artist_lower")
+        self._genre_postings = {catalog.string(int(k)): genre_groups.group(n) for n, k in enumerate(genre_groups.keys)}
+        self._artist_postings = {catalog.string(int(k)): artist_groups.group(n) for n, k in enumerate(artist_groups.keys)}
+        self._genre_values = SubstringIndex(self._genre_postings)
+        self._artist_values = SubstringIndex(self._artist_postings)
+
+        self._genres = _Groups(path, "genre")
+        self._genre_year = _Groups(path, "genre_year")
+        self._years = _Groups(path, "year")
+        self._genre_ids = {catalog.string(int(g)): int(g) for g in self._genres.keys}
+        self._key_hash = np.load(path / "key_hash.npy", mmap_mode="r")
+        self._key_rows = np.load(path / "key_rows.npy", mmap_mode="r")
+
+    def artists(self) -> Set[str]:
+        artist_ids = np.unique(self.songs.columns["artist"])
+        return {self.songs.string(int(a)) for a in artist_ids if a >= 0}
+
+    def find_row(self, title: str, artist: str) -> Optional[int]:
+        target = np.uint64(key_hash(title, artist))
+        n = int(np.searchsorted(self._key_hash, target))
+        # 哈希相同的行按曲库顺序排列，逐个确认以排除碰撞
+        while n < len(self._key_hash) and self._key_hash[n] == target:
+            row = int(self._key_rows[n])
+            song = self.songs[row]
+            if song.title.lower() == title.lower() and song.artist.lower() == artist.lower():
+                return row
+            n += 1
+        return None
+
+    def _artist_rows(self, artist: str) -> Sequence[int]:
+        artist_column = self.songs.columns["artist"]
+        rows = self._artist_postings.get(artist.lower(), ())
+        return sorted(int(i) for i in rows if self.songs.string(int(artist_column[i])) == artist)
+
+    def _genre_id(self, genre: Optional[str]) -> Optional[int]:
+        """流派字符串 → 字符串 ID（None 对应 -1），曲库中不存在时返回 None"""
+        return self._genre_ids.get(genre)
+
+    def _genre_year_rows(self, genre: Optional[str], year: int) -> Sequence[int]:
+        genre_id = self._genre_id(genre)
+        if genre_id is None:
+            return ()
+        return self._genre_year.find((genre_id, year))
+
+    def _genre_rows(self, genre: Optional[str]) -> Sequence[int]:
+        genre_id = self._genre_id(genre)
+        if genre_id is None:
+            return ()
+        return self._genres.find(genre_id)
+
+    def _year_rows(self, year: int) -> Sequence[int]:
+        return self._years.find(year)
+
+
+def load_catalog(path: str) -> Tuple[ColumnarCatalog, ColumnarCatalogIndex]:
+    """加载列式曲库及其索引"""
+    catalog = ColumnarCatalog(path)
+    return catalog, ColumnarCatalogIndex(catalog)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        print("用法: python -m tools.catalog_store <music_database.json|catalog.csv> <输出目录>")
+        sys.exit(1)
+    convert_catalog(sys.argv[1], sys.argv[2])
@@ -0,0 +1,369 @@
+"""
+曲库向量索引
+把每首歌的文本/元数据（歌名、艺术家、专辑、流派、年代、情绪标签）编码为向量，
+建立可离线构建的近似最近邻（IVF）索引，用于"更多类似的歌"和按心情文本推荐
+
+嵌入函数可插拔：
+    hashing     本地特征哈希（默认，无需网络，确定性）
+    dashscope   DashScope/OpenAI 兼容的嵌入接口（DASH_SCOPE_EMBEDDING_MODEL）
+    也可以用 register_embedding_backend 注册自定义嵌入函数
+
+目录结构：
+    meta.json                 嵌入函数名、维度、歌曲数等（最后写入，存在即表示构建完成）
+    vectors.npy               L2 归一化后的歌曲向量（float32，内存映射加载）
+    centroids.npy             倒排列表的聚类中心（歌曲数较少时不分桶，直接精确搜索）
+    list_rows.npy / list_offsets.npy      第 c 个倒排列表为 list_rows[offsets[c]:offsets[c+1]]
+
+构建：
+    python -m tools.embedding_index data/embeddings
+    python -m tools.embedding_index data/embeddings data/music_database.json dashscope
+"""
+
+import hashlib
+import json
+import os
+import sys
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from config.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+FORMAT_VERSION = 1
+
+# 歌曲数不超过该值时不分桶，直接对全部向量做精确搜索
+EXACT_SEARCH_MAX_ROWS = 50_000
+# 每次查询探查的倒排列表数
+DEFAULT_NPROBE = 8
+# 分块计算时每块矩阵的最大元素数，限制内存占用
+MAX_BLOCK_ELEMENTS = 2_000_000
+
+# 流派关键词 → 情绪/场景标签（同时给出英文流派名），写入歌曲文本，
+# 使 "开心"、"放松"、"rock" 这类查询能命中本地中文流派
+GENRE_TAGS: Dict[str, str] = {
+    "流行": "pop 开心 快乐 甜蜜 浪漫",
+    "摇滚": "rock 兴奋 激动 运动 热血",
+    "民谣": "folk acoustic 怀旧 安静 疗愈 治愈",
+    "电子": "electronic dance 派对 兴奋 运动",
+    "抒情": "ballad mellow 悲伤 伤心 难过 浪漫",
+    "古风": "chinese traditional 平静 怀旧 安静",
+    "说唱": "hip-hop rap 兴奋 运动",
+    "爵士": "jazz 放松 舒缓 学习 专注",
+}
+
+
+def track_text(song: Any) -> str:
+    """歌曲用于嵌入的文本：歌名、艺术家、专辑、流派、年代与流派对应的情绪标签"""
+    parts = [song.title, song.artist, song.album or "", song.genre or ""]
+    if song.year:
+        parts.append(f"{song.year // 10 * 10}年代")
+    if song.genre:
+        parts.extend(tags for keyword, tags in GENRE_TAGS.items() if keyword in song.genre)
+    return " ".join(part for part in parts if part)
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    """按行 L2 归一化（零向量保持为零）"""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.where(norms > 0, norms, 1.0)
+
+
+class HashingEmbedding:
+    """
+    本地特征哈希嵌入
+
+    文本按空白切词，每个词本身和词内的相邻二字组合（适配中文）哈希到 dim 维并带随机符号，
+    结果 L2 归一化；不需要网络和模型文件，同一文本在任何进程中得到相同向量
+    """
+
+    local = True
+
+    def __init__(self, dim: int = 256):
+        self.dim = dim
+        self.name = f"hashing-{dim}"
+        self._buckets: Dict[str, Tuple[int, float]] = {}
+
+    def _bucket(self, token: str) -> Tuple[int, float]:
+        bucket = self._buckets.get(token)
+        if bucket is None:
+            h = int.from_bytes(hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest(), "little")
+            bucket = self._buckets[token] = (h % self.dim, 1.0 if (h >> 63) & 1 else -1.0)
+        return bucket
+
+    @staticmethod
+    def _tokens(text: str) -> Iterable[str]:
+        for word in text.lower().split():
+            yield word
+            for i in range(len(word) - 1):
+                yield word[i:i + 2]
+
+    def __call__(self, texts: Sequence[str]) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for token in self._tokens(text):
+                column, sign = self._bucket(token)
+                vectors[row, column] += sign
+        return _normalize(vectors)
+
+
+class DashScopeEmbedding:
+    """DashScope（OpenAI 兼容模式）嵌入接口，配置来自 setting.json / 环境变量"""
+
+    local = False
+
+    def __init__(self, model: Optional[str] = None, batch_size: int = 10):
+        from config.settings_loader import get_settings
+        settings = get_settings()
+        self.model = model or settings.get("DASH_SCOPE_EMBEDDING_MODEL") or os.getenv(
+            "DASH_SCOPE_EMBEDDING_MODEL", "text-embedding-v3"
+        )
+        self.api_key = settings.get("DASH_SCOPE_API_KEY") or os.getenv("DASH_SCOPE_API_KEY", "")
+        self.base_url = settings.get("DASH_SCOPE_BASE_URL") or os.getenv(
+            "DASH_SCOPE_BASE_URL", "https://dashscope.aliyuncs.com/compatible-mode/v1"
+        )
+        self.batch_size = batch_size
+        self.name = f"dashscope-{self.model}"
+        self._client = None
+
+    def __call__(self, texts: Sequence[str]) -> np.ndarray:
+        if self._client is None:
+            from openai import OpenAI
+            self._client = OpenAI(api_key=self.api_key, base_url=self.base_url)
+        vectors: List[List[float]] = []
+        for start in range(0, len(texts), self.batch_size):
+            response = self._client.embeddings.create(
+                model=self.model, input=list(texts[start:start + self.batch_size])
+            )
+            vectors.extend(item.embedding for item in sorted(response.data, key=lambda item: item.index))
+        return _normalize(np.array(vectors, dtype=np.float32).reshape(len(texts), -1))
+
+
+# 嵌入函数：texts → (len(texts), dim) 的 L2 归一化矩阵，需带 name 属性（用于校验索引）
+EmbeddingFunction = Callable[[Sequence[str]], np.ndarray]
+
+EMBEDDING_BACKENDS: Dict[str, Callable[[], EmbeddingFunction]] = {
+    "hashing": lambda: HashingEmbedding(int(os.getenv("MUSIC_EMBEDDING_DIM", "256"))),
+    "dashscope": DashScopeEmbedding,
+}
+
+
+def register_embedding_backend(name: str, factory: Callable[[], EmbeddingFunction]) -> None:
+    """注册自定义嵌入函数（如测试用的本地模型），之后可通过 MUSIC_EMBEDDING_BACKEND 选择"""
+    EMBEDDING_BACKENDS[name] = factory
+
+
+def get_embedding_function(backend: Optional[str] = None) -> EmbeddingFunction:
+    """按名称（默认环境变量 MUSIC_EMBEDDING_BACKEND，未设置为 hashing）创建嵌入函数"""
+    backend = backend or os.getenv("MUSIC_EMBEDDING_BACKEND", "hashing")
+    factory = EMBEDDING_BACKENDS.get(backend)
+    if factory is None:
+        raise ValueError(f"未知的嵌入函数: {backend}，可选: {', '.join(EMBEDDING_BACKENDS)}")
+    return factory()
+
+
+def _kmeans(vectors: np.ndarray, nlist: int, iterations: int = 10, seed: int = 0) -> np.ndarray:
+    """球面 k-means（在采样上训练），返回归一化的聚类中心"""
+    rng = np.random.default_rng(seed)
+    sample = vectors[rng.choice(len(vectors), size=min(len(vectors), nlist * 64), replace=False)]
+    centroids = sample[rng.choice(len(sample), size=nlist, replace=False)].copy()
+    for _ in range(iterations):
+        assignment = np.argmax(sample @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignment, sample)
+        empty = ~sums.any(axis=1)
+        sums[empty] = centroids[empty]
+        centroids = _normalize(sums)
+    return centroids
+
+
+class EmbeddingIndex:
+    """
+    歌曲向量的 IVF 近似最近邻索引
+
+    歌曲数较少时（不超过 EXACT_SEARCH_MAX_ROWS）不分桶，每次查询对全部向量做一次矩阵乘法；
+    否则按聚类中心分成约 sqrt(n) 个倒排列表，查询只计算最近 nprobe 个列表中的歌曲
+    """
+
+    def __init__(
+        self,
+        vectors: np.ndarray,
+        embedding: EmbeddingFunction,
+        centroids: Optional[np.ndarray] = None,
+        list_rows: Optional[np.ndarray] = None,
+        list_offsets: Optional[np.ndarray] = None,
+        nprobe: int = DEFAULT_NPROBE,
+    ):
+        self.vectors = vectors
+        self.embedding = embedding
+        self.centroids = centroids
+        self.list_rows = list_rows
+        self.list_offsets = list_offsets
+        self.nprobe = nprobe
+
+    def __len__(self) -> int:
+        return len(self.vectors)
+
+    @classmethod
+    def build(cls, songs: Sequence[Any], embedding: EmbeddingFunction, batch_size: int = 1024) -> "EmbeddingIndex":
+        """为曲库中的全部歌曲计算向量并建立倒排列表"""
+        blocks = [
+            embedding([track_text(songs[i]) for i in range(start, min(start + batch_size, len(songs)))])
+            for start in range(0, len(songs), batch_size)
+        ]
+        vectors = np.concatenate(blocks) if blocks else np.zeros((0, 0), dtype=np.float32)
+        if len(vectors) <= EXACT_SEARCH_MAX_ROWS:
+            return cls(vectors, embedding)
+
+        centroids = _kmeans(vectors, int(np.sqrt(len(vectors))))
+        block = max(1, MAX_BLOCK_ELEMENTS // len(centroids))
+        assignment = np.concatenate([
+            np.argmax(vectors[start:start + block] @ centroids.T, axis=1)
+            for start in range(0, len(vectors), block)
+        ])
+        list_rows = np.argsort(assignment, kind="stable").astype(np.int64)
+        list_offsets = np.searchsorted(assignment[list_rows], np.arange(len(centroids) + 1)).astype(np.int64)
+        return cls(vectors, embedding, centroids, list_rows, list_offsets)
+
+    def save(self, output_dir: str) -> None:
+        """写入索引目录（meta.json 最后写入）"""
+        out = Path(output_dir)
+        out.mkdir(parents=True, exist_ok=True)
+        meta_path = out / "meta.json"
+        if meta_path.exists():
+            meta_path.unlink()
+        np.save(out / "vectors.npy", np.asarray(self.vectors, dtype=np.float32))
+        if self.centroids is not None:
+            np.save(out / "centroids.npy", self.centroids)
+            np.save(out / "list_rows.npy", self.list_rows)
+            np.save(out / "list_offsets.npy", self.list_offsets)
+        meta = {
+            "format_version": FORMAT_VERSION,
+            "embedding": self.embedding.name,
+            "count": len(self.vectors),
+            "dim": int(self.vectors.shape[1]) if len(self.vectors) else 0,
+            "nlist": 0 if self.centroids is None else len(self.centroids),
+        }
+        with open(meta_path, "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False, indent=2)
+        logger.info(f"向量索引已写入 {out}: {meta['count']} 首歌曲, 嵌入 {meta['embedding']}, 分桶 {meta['nlist']}")
+
+    @classmethod
+    def load(cls, path: str, embedding: EmbeddingFunction) -> "EmbeddingIndex":
+        """以内存映射方式加载索引目录，嵌入函数必须与构建时一致"""
+        root = Path(path)
+        with open(root / "meta.json", "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("format_version") != FORMAT_VERSION:
+            raise ValueError(f"不支持的向量索引格式版本: {meta.get('format_version')}")
+        if meta.get("embedding") != embedding.name:
+            raise ValueError(f"向量索引由 {meta.get('embedding')} 构建，与当前嵌入函数 {embedding.name} 不一致")
+        vectors = np.load(root / "vectors.npy", mmap_mode="r")
+        if not meta.get("nlist"):
+            return cls(vectors, embedding)
+        return cls(
+            vectors,
+            embedding,
+            centroids=np.load(root / "centroids.npy"),
+            list_rows=np.load(root / "list_rows.npy", mmap_mode="r"),
+            list_offsets=np.load(root / "list_offsets.npy"),
+        )
+
+    def _candidates(self, query: np.ndarray) -> Optional[np.ndarray]:
+        """查询向量最近的 nprobe 个倒排列表中的歌曲行号（不分桶时为 None，表示全部）"""
+        if self.centroids is None:
+            return None
+        nprobe = min(self.nprobe, len(self.centroids))
+        probe = np.argpartition(-(self.centroids @ query), nprobe - 1)[:nprobe]
+        return np.sort(np.concatenate([
+            self.list_rows[self.list_offsets[c]:self.list_offsets[c + 1]] for c in probe
+        ]))
+
+    def search_vector(self, query: np.ndarray, limit: int, exclude: Iterable[int] = ()) -> List[Tuple[int, float]]:
+        """与查询向量余弦相似度最高的歌曲 [(行号, 相似度)]，同分按曲库顺序"""
+        if limit <= 0 or not len(self.vectors):
+            return []
+        query = _normalize(query)
+        rows = self._candidates(query)
+        scores = np.asarray((self.vectors if rows is None else self.vectors[rows]) @ query)
+        if rows is None:
+            rows = np.arange(len(scores))
+        exclude = np.fromiter(exclude, dtype=np.int64)
+        if len(exclude):
+            keep = ~np.isin(rows, exclude)
+            rows, scores = rows[keep], scores[keep]
+        k = min(limit, len(rows))
+        if k <= 0:
+            return []
+        if k < len(rows):
+            top = np.argpartition(-scores, k - 1)[:k]
+        else:
+            top = np.arange(len(rows))
+        top = top[np.lexsort((rows[top], -scores[top]))]
+        return [(int(rows[i]), float(scores[i])) for i in top if scores[i] > 0]
+
+    def search_text(self, text: str, limit: int, exclude: Iterable[int] = ()) -> List[Tuple[int, float]]:
+        """按自由文本（如心情描述）查询"""
+        return self.search_vector(self.embedding([text])[0], limit, exclude)
+
+    def more_like(self, rows: Sequence[int], limit: int) -> List[Tuple[int, float]]:
+        """与一组种子歌曲整体最相似的歌曲（种子向量取平均），结果不含种子本身"""
+        if not len(rows):
+            return []
+        centroid = np.asarray(self.vectors[np.asarray(rows, dtype=np.int64)]).mean(axis=0)
+        return self.search_vector(centroid, limit, exclude=rows)
+
+
+def load_or_build_index(path: str, songs: Sequence[Any], embedding: Optional[EmbeddingFunction] = None) -> Optional[EmbeddingIndex]:
+    """
+    加载与曲库匹配的索引目录；不存在或不匹配时，本地嵌入函数现场构建（不写盘），
+    需要网络的嵌入函数返回 None（请先离线构建）
+    """
+    embedding = embedding or get_embedding_function()
+    if (Path(path) / "meta.json").exists():
+        try:
+            index = EmbeddingIndex.load(path, embedding)
+            if len(index) == len(songs):
+                logger.info(f"成功加载向量索引 {len(index)} 首歌曲: {path}")
+                return index
+            logger.warning(f"向量索引歌曲数 {len(index)} 与曲库 {len(songs)} 不一致，忽略该索引")
+        except Exception as e:
+            logger.warning(f"加载向量索引失败: {str(e)}")
+    if not getattr(embedding, "local", False):
+        logger.warning(f"未找到可用的向量索引，请先运行 python -m tools.embedding_index {path}")
+        return None
+    return EmbeddingIndex.build(songs, embedding)
+
+
+def _load_songs(source: str) -> Sequence[Any]:
+    """读取列式曲库目录或 JSON/CSV 文件"""
+    if Path(source).is_dir():
+        from tools.catalog_store import ColumnarCatalog
+        return ColumnarCatalog(source)
+    from tools.catalog_store import _read_records, _to_int
+    from tools.music_tools import Song
+    songs = []
+    for record in _read_records(Path(source)):
+        year = _to_int(record.get("year"))
+        songs.append(Song(
+            title=record.get("title") or "",
+            artist=record.get("artist") or "",
+            album=record.get("album") or None,
+            genre=record.get("genre") or None,
+            year=year if year > 0 else None,
+        ))
+    return songs
+
+if __name__ == "__main__":
+    if not 2 <= len(sys.argv) <= 4:
+        print("用法: python -m tools.embedding_index <输出目录> [曲库目录|music_database.json|catalog.csv] [嵌入函数]")
+        sys.exit(1)
+    default_source = Path(__file__).parent.parent / "data" / "catalog"
+    if not (default_source / "meta.json").exists():
+        default_source = default_source.parent / "music_database.json"
+    songs = _load_songs(sys.argv[2] if len(sys.argv) > 2 else str(default_source))
+    embedding = get_embedding_function(sys.argv[3] if len(sys.argv) > 3 else None)
+    EmbeddingIndex.build(songs, embedding).save(sys.argv[1])
@@ -3,9 +3,11 @@ MCP 客户端适配器
 封装 MCP 工具调用，提供统一的接口
 """
 
+import asyncio
 import json
 import os
-from typing import List, Dict, Any, Optional
+import re
+from typing import List, Dict, Any, Optional, Tuple
 from dataclasses import dataclass
 from pathlib import Path
 
@@ -17,7 +19,9 @@ except Exception as e:
     print(f"警告: 无法从 setting.json 加载配置: {e}")
 
 from config.logging_config import get_logger
+from tools.audio_features import get_audio_feature_store
 from tools.music_tools import Song
+from tools.spotify_transport import AsyncSpotifyTransport, get_spotify_transport
 
 logger = get_logger(__name__)
 
@@ -65,8 +69,28 @@ class Artist:
 class MCPClientAdapter:
     """MCP 客户端适配器 - 直接调用 MCP 服务器函数"""
     
-    def __init__(self):
-        """初始化适配器"""
+    def __init__(
+        self,
+        transport: Optional[AsyncSpotifyTransport] = None,
+        resolve_concurrency: Optional[int] = None
+    ):
+        """
+        初始化适配器
+        
+        Args:
+            transport: Spotify 异步传输层，如果为 None 则使用进程级共享实例
+            resolve_concurrency: 推荐歌曲并发解析上限，如果为 None 则从环境变量
+                SPOTIFY_RESOLVE_CONCURRENCY 读取（默认 8）
+        """
+        self._transport = transport or get_spotify_transport()
+        if resolve_concurrency is None:
+            try:
+                resolve_concurrency = int(os.getenv("SPOTIFY_RESOLVE_CONCURRENCY", "8"))
+            except ValueError:
+                resolve_concurrency = 8
+        self._resolve_concurrency = max(1, resolve_concurrency)
+        # 推荐候选来源：llm（默认，硅基流动API）或 index（本地曲库向量索引，不可用时回退到 llm）
+        self._recommendation_source = os.getenv("RECOMMENDATION_SOURCE", "llm").lower()
         self._spotify_client = None
         self._mcp_server = None
         self._spotify_initialized = False
@@ -121,6 +145,76 @@ class MCPClientAdapter:
                 raise
         return self._mcp_server
     
+    def _get_track_cache(self):
+        """获取 MCP 服务器共享的持久化歌曲解析缓存（不可用时返回 None）"""
+        try:
+            return self._get_mcp_server().get_track_cache()
+        except Exception as e:
+            logger.debug(f"歌曲解析缓存不可用: {e}")
+            return None
+    
+    async def _get_user_profile(self, limit: int, time_range: str):
+        """
+        获取当前用户的画像快照（MCP 服务器共享的用户画像存储）
+        
+        快照有效时直接从内存/磁盘返回，不发起请求；进程内首次使用时先向 Spotify 确认当前用户，
+        没有快照时只拉取 top 列表（收藏曲库由后台线程同步），之后由后台线程定时刷新。
+        快照只覆盖 medium_term 的前 50 项，超出范围或不可用时返回 None，由调用方实时请求
+        """
+        try:
+            store = self._get_mcp_server().get_profile_store()
+            if store is None or time_range != store.time_range or limit > store.top_limit:
+                return None
+            profile = store.get()
+            if profile is None:
+                return await self._run(store.current)
+            store.start_background_refresh()
+            return profile
+        except Exception as e:
+            logger.debug(f"用户画像不可用，实时请求: {e}")
+            return None
+    
+    async def _resolve_track_by_name(self, sp, song_name: str, artist_name: str = "") -> Optional[Dict[str, Any]]:
+        """
+        通过歌曲名和艺术家解析 Spotify 歌曲（优先读取持久化缓存）
+        
+        缓存是 SQLite 文件，读写放到线程中执行，不阻塞事件循环
+        
+        Returns:
+            Spotify track 字典，未找到时返回 None
+        """
+        cache = self._get_track_cache()
+        if cache is not None:
+            found, track = await asyncio.to_thread(cache.get, song_name, artist_name)
+            if found:
+                return track
+        
+        query = song_name
+        if artist_name:
+            query += f" artist:{artist_name}"
+        search_results = await self._run(sp.search, q=query, type="track", limit=1)
+        tracks = search_results["tracks"]["items"]
+        track = tracks[0] if tracks else None
+        
+        if cache is not None:
+            await asyncio.to_thread(cache.set, song_name, artist_name, track)
+        return track
+    
+    async def _run(self, func, *args, **kwargs):
+        """通过传输层执行同步 spotipy 调用，不阻塞事件循环"""
+        return await self._transport.call(func, *args, **kwargs)
+    
+    @staticmethod
+    def _spotify_artist_to_artist(artist: Dict[str, Any]) -> Artist:
+        """将 Spotify artist 数据转换为内部 Artist 格式"""
+        return Artist(
+            name=artist.get("name", "未知"),
+            id=artist.get("id"),
+            genres=artist.get("genres", []),
+            popularity=artist.get("popularity", 0),
+            external_url=artist.get("external_urls", {}).get("spotify") if isinstance(artist.get("external_urls"), dict) else None
+        )
+    
     def _spotify_track_to_song(self, track: Dict[str, Any]) -> Song:
         """将 Spotify track 数据转换为内部 Song 格式"""
         artists = track.get("artists", [])
@@ -167,7 +261,7 @@ class MCPClientAdapter:
             logger.info(f"搜索歌曲: query='{query}', limit={limit}")
             
             sp = self._get_spotify_client()
-            results = sp.search(q=query, type="track", limit=limit)
+            results = await self._run(sp.search, q=query, type="track", limit=limit)
             tracks = results["tracks"]["items"]
             
             songs = [self._spotify_track_to_song(track) for track in tracks]
@@ -232,7 +326,7 @@ class MCPClientAdapter:
                 logger.info(f"获取 {len(seed_tracks)} 首种子歌曲的信息...")
                 for track_id in seed_tracks:
                     try:
-                        track_info = sp.track(track_id)
+                        track_info = await self._run(sp.track, track_id)
                         if track_info and track_info.get("name"):
                             artist_names = [a.get("name", "") for a in track_info.get("artists", [])]
                             seed_info["songs"].append({
@@ -248,7 +342,7 @@ class MCPClientAdapter:
                 logger.info(f"获取 {len(seed_artists)} 个种子艺术家的信息...")
                 for artist_id in seed_artists:
                     try:
-                        artist_info = sp.artist(artist_id)
+                        artist_info = await self._run(sp.artist, artist_id)
                         if artist_info and artist_info.get("name"):
                             seed_info["artists"].append(artist_info.get("name"))
                     except Exception as e:
@@ -267,7 +361,7 @@ class MCPClientAdapter:
                     
                     for query in search_strategies:
                         try:
-                            search_results = sp.search(q=query, type="track", limit=10)
+                            search_results = await self._run(sp.search, q=query, type="track", limit=10)
                             if search_results["tracks"]["items"]:
                                 tracks = [
                                     track for track in search_results["tracks"]["items"]
@@ -296,14 +390,38 @@ class MCPClientAdapter:
                 logger.error("无法获取种子信息，无法生成推荐")
                 return []
             
-            # 使用硅基流动API生成推荐
-            logger.info("使用硅基流动API生成推荐...")
-            try:
-                from llms.siliconflow_llm import SiliconFlowLLM
-                llm = SiliconFlowLLM()
-                
-                # 构建提示词
-                system_prompt = """你是一个专业的音乐推荐专家。根据用户提供的种子信息（喜欢的歌曲、艺术家、流派），推荐相似风格的音乐。
+            # 生成推荐候选 (歌曲名, 艺术家)：RECOMMENDATION_SOURCE=index 时优先使用本地曲库向量索引，
+            # 索引不可用或无结果时回退到硅基流动API
+            recommendations_data: List[Dict[str, Any]] = []
+            if self._recommendation_source == "index":
+                recommendations_data = await self._recommend_from_index(seed_info, limit * 2)
+            if not recommendations_data:
+                recommendations_data = await self._recommend_with_llm(seed_info, limit)
+            if not recommendations_data:
+                return []
+            
+            # 使用Spotify搜索API并发查找推荐的歌曲
+            found_songs = await self._resolve_recommended_songs(
+                sp, recommendations_data[:limit * 2], limit  # 搜索更多以增加找到的概率
+            )
+            
+            logger.info(f"成功找到 {len(found_songs)} 首推荐歌曲")
+            return found_songs[:limit]
+            
+        except Exception as e:
+            error_msg = str(e)
+            logger.error(f"获取推荐失败: {error_msg}", exc_info=True)
+            return []
+    
+    async def _recommend_with_llm(self, seed_info: Dict[str, Any], limit: int) -> List[Dict[str, Any]]:
+        """使用硅基流动API根据种子信息生成推荐候选 [{"song": ..., "artist": ...}]，失败返回空列表"""
+        logger.info("使用硅基流动API生成推荐...")
+        try:
+            from llms.siliconflow_llm import get_siliconflow_llm
+            llm = get_siliconflow_llm()
+            
+            # 构建提示词
+            system_prompt = """你是一个专业的音乐推荐专家。根据用户提供的种子信息（喜欢的歌曲、艺术家、流派），推荐相似风格的音乐。
 请返回推荐的歌曲列表，格式为JSON数组，每个推荐包含歌曲名和艺术家名。
 格式示例：
 [
@@ -311,130 +429,251 @@ class MCPClientAdapter:
   {"song": "歌曲名2", "artist": "艺术家名2"}
 ]
 只返回JSON数组，不要其他文字说明。"""
-                
-                user_prompt = f"""根据以下信息推荐 {limit} 首相似风格的音乐：
+            
+            user_prompt = f"""根据以下信息推荐 {limit} 首相似风格的音乐：
 
 """
-                if seed_info["songs"]:
-                    user_prompt += "喜欢的歌曲：\n"
-                    for song in seed_info["songs"]:
-                        user_prompt += f"- {song['name']} by {song['artist']}\n"
-                    user_prompt += "\n"
-                
-                if seed_info["artists"]:
-                    user_prompt += f"喜欢的艺术家：{', '.join(seed_info['artists'])}\n\n"
-                
-                if seed_info["genres"]:
-                    user_prompt += f"喜欢的流派：{', '.join(seed_info['genres'])}\n\n"
-                
-                user_prompt += f"请推荐 {limit} 首相似风格的音乐，返回JSON数组格式。"
-                
-                # 调用硅基流动API
-                response_text = llm.invoke(system_prompt, user_prompt, temperature=0.3, max_tokens=2000)
-                
-                # 解析JSON响应
-                import re
-                # 尝试提取JSON数组
-                json_match = re.search(r'\[.*\]', response_text, re.DOTALL)
-                if json_match:
-                    recommendations_data = json.loads(json_match.group())
-                else:
-                    # 如果找不到JSON，尝试直接解析整个响应
-                    recommendations_data = json.loads(response_text)
-                
-                if not isinstance(recommendations_data, list):
-                    logger.error(f"硅基流动API返回格式错误: {type(recommendations_data)}")
-                    return []
-                
-                logger.info(f"硅基流动API生成了 {len(recommendations_data)} 首推荐")
-                
-            except Exception as e:
-                logger.error(f"使用硅基流动API生成推荐失败: {e}", exc_info=True)
-                return []
+            if seed_info["songs"]:
+                user_prompt += "喜欢的歌曲：\n"
+                for song in seed_info["songs"]:
+                    user_prompt += f"- {song['name']} by {song['artist']}\n"
+                user_prompt += "\n"
             
-            # 使用Spotify搜索API查找推荐的歌曲
-            found_songs = []
-            def _build_queries(song_name: str, artist_name: Optional[str]) -> List[str]:
-                # 尝试多种查询以提高命中率（去除标点、添加引号、不同字段组合）
-                import re as _re
-                def _normalize(s: str) -> str:
-                    return _re.sub(r"[\"'“”‘’·.,，。!?！？()\(\)\[\]【】]", " ", s).strip()
-                name_norm = _normalize(song_name)
-                artist_norm = _normalize(artist_name) if artist_name else None
-                queries = []
-                if artist_norm:
-                    queries.append(f'track:"{name_norm}" artist:"{artist_norm}"')
-                    queries.append(f"{name_norm} {artist_norm}")
-                    queries.append(f"track:{name_norm} artist:{artist_norm}")
-                queries.append(f'track:"{name_norm}"')
-                queries.append(name_norm)
-                return queries
-            
-            for rec in recommendations_data[:limit * 2]:  # 搜索更多以增加找到的概率
-                try:
-                    song_name = rec.get("song") or rec.get("name") or rec.get("title")
-                    artist_name = rec.get("artist") or rec.get("artist_name")
-                    
-                    if not song_name:
-                        continue
-                    
-                    # 多策略搜索
-                    queries = _build_queries(song_name, artist_name)
-                    matched = False
-                    for q in queries:
-                        search_results = sp.search(q=q, type="track", limit=5)
-                        tracks = search_results.get("tracks", {}).get("items", [])
-                        if tracks:
-                            # 按流行度排序取最优
-                            tracks = sorted(tracks, key=lambda x: x.get("popularity", 0), reverse=True)
-                            for track in tracks:
-                                song = self._spotify_track_to_song(track)
-                                if song.spotify_id and song.spotify_id not in [s.spotify_id for s in found_songs]:
-                                    found_songs.append(song)
-                                    matched = True
-                                    logger.debug(f"找到推荐歌曲: {song.title} by {song.artist}")
-                                    break
-                        if matched:
-                            break
-                    
-                    if len(found_songs) >= limit:
-                        break
-                        
-                except Exception as e:
-                    logger.debug(f"搜索推荐歌曲失败: {e}")
-                    continue
+            if seed_info["artists"]:
+                user_prompt += f"喜欢的艺术家：{', '.join(seed_info['artists'])}\n\n"
             
-            logger.info(f"成功找到 {len(found_songs)} 首推荐歌曲")
-            return found_songs[:limit]
+            if seed_info["genres"]:
+                user_prompt += f"喜欢的流派：{', '.join(seed_info['genres'])}\n\n"
+            
+            user_prompt += f"请推荐 {limit} 首相似风格的音乐，返回JSON数组格式。"
+            
+            # 调用硅基流动API
+            response_text = await llm.ainvoke(system_prompt, user_prompt, temperature=0.3, max_tokens=2000)
+            
+            # 解析JSON响应
+            # 尝试提取JSON数组
+            json_match = re.search(r'\[.*\]', response_text, re.DOTALL)
+            if json_match:
+                recommendations_data = json.loads(json_match.group())
+            else:
+                # 如果找不到JSON，尝试直接解析整个响应
+                recommendations_data = json.loads(response_text)
+            
+            if not isinstance(recommendations_data, list):
+                logger.error(f"硅基流动API返回格式错误: {type(recommendations_data)}")
+                return []
+            
+            logger.info(f"硅基流动API生成了 {len(recommendations_data)} 首推荐")
             
         except Exception as e:
-            error_msg = str(e)
-            logger.error(f"获取推荐失败: {error_msg}", exc_info=True)
+            logger.error(f"使用硅基流动API生成推荐失败: {e}", exc_info=True)
+            return []
+        
+        return recommendations_data
+    
+    async def _recommend_from_index(self, seed_info: Dict[str, Any], limit: int) -> List[Dict[str, Any]]:
+        """
+        使用本地曲库向量索引根据种子信息生成推荐候选 [{"song": ..., "artist": ...}]
+        
+        种子歌曲在曲库中时按 "更多类似的歌" 查询，否则把种子歌曲、艺术家、流派拼成文本查询；
+        索引不可用时返回空列表
+        """
+        try:
+            from tools.music_tools import get_music_search_tool
+            search_tool = get_music_search_tool()
+            
+            seed_songs = [{"title": song["name"], "artist": song["artist"]} for song in seed_info["songs"]]
+            hits = await search_tool.get_songs_like(seed_songs, limit) if seed_songs else []
+            if not hits:
+                text = " ".join(
+                    [f"{song['name']} {song['artist']}" for song in seed_info["songs"]]
+                    + list(seed_info["artists"])
+                    + list(seed_info["genres"])
+                )
+                hits = await search_tool.search_songs_by_text(text, limit)
+            
+            logger.info(f"曲库向量索引生成了 {len(hits)} 首推荐候选")
+            return [{"song": song.title, "artist": song.artist} for song, _ in hits]
+        except Exception as e:
+            logger.warning(f"使用曲库向量索引生成推荐失败: {e}")
             return []
     
+    @staticmethod
+    def _build_search_queries(song_name: str, artist_name: Optional[str]) -> List[str]:
+        """构建多种查询以提高命中率（去除标点、添加引号、不同字段组合），按精确度排序"""
+        def _normalize(s: str) -> str:
+            return re.sub(r"[\"'“”‘’·.,，。!?！？()\(\)\[\]【】]", " ", s).strip()
+        name_norm = _normalize(song_name)
+        artist_norm = _normalize(artist_name) if artist_name else None
+        queries = []
+        if artist_norm:
+            queries.append(f'track:"{name_norm}" artist:"{artist_norm}"')
+            queries.append(f"{name_norm} {artist_norm}")
+            queries.append(f"track:{name_norm} artist:{artist_norm}")
+        queries.append(f'track:"{name_norm}"')
+        queries.append(name_norm)
+        return queries
+    
+    async def _resolve_recommended_songs(
+        self,
+        sp,
+        recommendations_data: List[Dict[str, Any]],
+        limit: int
+    ) -> List[Song]:
+        """
+        并发地把 LLM 推荐的 (歌曲名, 艺术家) 解析为 Spotify 歌曲
+        
+        每首歌按精确度依次尝试查询变体，命中后不再发出剩余变体；
+        多首歌之间并发执行（受 resolve_concurrency 限制），
+        凑够 limit 首不重复的歌曲后立即取消仍在进行的查找。
+        
+        Args:
+            sp: Spotify 客户端
+            recommendations_data: LLM 返回的推荐列表
+            limit: 需要的歌曲数量
+            
+        Returns:
+            按 LLM 推荐顺序排列的歌曲列表
+        """
+        semaphore = asyncio.Semaphore(self._resolve_concurrency)
+        taken_ids: set = set()
+        
+        async def _resolve_one(index: int, rec: Dict[str, Any]) -> Optional[Tuple[int, Song]]:
+            # 单首歌解析出错（缓存损坏、返回数据格式异常等）只丢弃这一首，不中断整批解析
+            try:
+                return await _lookup(index, rec)
+            except Exception as e:
+                logger.warning(f"解析推荐歌曲失败: {rec}: {e}")
+                return None
+        
+        async def _lookup(index: int, rec: Dict[str, Any]) -> Optional[Tuple[int, Song]]:
+            song_name = rec.get("song") or rec.get("name") or rec.get("title")
+            artist_name = rec.get("artist") or rec.get("artist_name")
+            if not song_name:
+                return None
+            
+            cache = self._get_track_cache()
+            if cache is not None:
+                found, cached_track = await asyncio.to_thread(cache.get, song_name, artist_name or "")
+                if found:
+                    if cached_track is None:
+                        return None
+                    song = self._spotify_track_to_song(cached_track)
+                    if song.spotify_id and song.spotify_id not in taken_ids:
+                        taken_ids.add(song.spotify_id)
+                        return index, song
+            
+            async with semaphore:
+                cached_resolution = False
+                # 至少一次查询成功返回时，"查无此歌"才是确定的结论；全部失败（如限流、网络故障）时不写负缓存
+                searched = False
+                for q in self._build_search_queries(song_name, artist_name):
+                    try:
+                        search_results = await self._run(sp.search, q=q, type="track", limit=5)
+                    except Exception as e:
+                        logger.debug(f"搜索推荐歌曲失败: {e}")
+                        continue
+                    searched = True
+                    tracks = search_results.get("tracks", {}).get("items", [])
+                    # 按流行度排序取最优
+                    tracks = sorted(tracks, key=lambda x: x.get("popularity", 0), reverse=True)
+                    if tracks and cache is not None and not cached_resolution:
+                        await asyncio.to_thread(cache.set, song_name, artist_name or "", tracks[0])
+                        cached_resolution = True
+                    for track in tracks:
+                        song = self._spotify_track_to_song(track)
+                        if song.spotify_id and song.spotify_id not in taken_ids:
+                            taken_ids.add(song.spotify_id)
+                            logger.debug(f"找到推荐歌曲: {song.title} by {song.artist}")
+                            return index, song
+                if cache is not None and searched and not cached_resolution:
+                    await asyncio.to_thread(cache.set, song_name, artist_name or "", None)
+            return None
+        
+        tasks = [
+            asyncio.create_task(_resolve_one(i, rec))
+            for i, rec in enumerate(recommendations_data)
+            if isinstance(rec, dict)
+        ]
+        resolved: List[Tuple[int, Song]] = []
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                result = await next_done
+                if result is not None:
+                    resolved.append(result)
+                    if len(resolved) >= limit:
+                        break
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+        
+        resolved.sort(key=lambda item: item[0])
+        return [song for _, song in resolved]
+    
     async def get_audio_features(self, track_ids: List[str]) -> Dict[str, Any]:
-        """批量获取 Spotify 音频特征"""
+        """
+        批量获取 Spotify 音频特征（经音频特征存储缓存）
+        
+        已缓存的歌曲不再请求，其余按每批 100 个并发请求，不限制 ID 数量
+        
+        Returns:
+            {track_id: 特征字典}
+        """
         try:
             sp = self._get_spotify_client()
             if sp is None or not track_ids:
                 return {}
-            features_list = sp.audio_features(tracks=track_ids[:100])
-            features_by_id: Dict[str, Any] = {}
-            for feat in features_list or []:
-                if feat and feat.get("id"):
-                    features_by_id[feat["id"]] = {
-                        "danceability": feat.get("danceability"),
-                        "energy": feat.get("energy"),
-                        "valence": feat.get("valence"),
-                        "tempo": feat.get("tempo"),
-                        "acousticness": feat.get("acousticness"),
-                        "instrumentalness": feat.get("instrumentalness"),
-                    }
-            return features_by_id
+            
+            async def _fetch(chunk: List[str]):
+                return await self._run(sp.audio_features, tracks=chunk)
+            
+            return await get_audio_feature_store().get_many(track_ids, _fetch)
         except Exception as e:
             logger.debug(f"获取音频特征失败: {e}")
             return {}
-
+    
+    async def resolve_seed_ids(
+        self,
+        seed_track_names: Optional[List[Dict[str, str]]] = None,
+        seed_artist_names: Optional[List[str]] = None,
+    ) -> Tuple[List[str], List[str]]:
+        """
+        并发解析种子歌曲和艺术家的 Spotify ID（各取前 5 个，未找到的跳过）
+        
+        Args:
+            seed_track_names: 种子歌曲列表 [{"song_name": "...", "artist_name": "..."}]
+            seed_artist_names: 种子艺术家名称列表
+            
+        Returns:
+            (歌曲 ID 列表, 艺术家 ID 列表)，保持输入顺序
+        """
+        track_names = (seed_track_names or [])[:5]
+        artist_names = (seed_artist_names or [])[:5]
+        if not (track_names or artist_names):
+            return [], []
+        
+        sp = self._get_spotify_client()
+        
+        async def resolve_artist(artist_name: str) -> Optional[str]:
+            search_results = await self._run(sp.search, q=f"artist:{artist_name}", type="artist", limit=1)
+            artists = search_results["artists"]["items"]
+            return artists[0]["id"] if artists else None
+        
+        results = await asyncio.gather(
+            *(
+                self._resolve_track_by_name(sp, item.get("song_name", ""), item.get("artist_name", ""))
+                for item in track_names
+            ),
+            *(resolve_artist(name) for name in artist_names),
+        )
+        tracks, artist_ids = results[:len(track_names)], results[len(track_names):]
+        return (
+            [track["id"] for track in tracks if track],
+            [artist_id for artist_id in artist_ids if artist_id],
+        )
+    
     async def get_recommendations_by_names(
         self,
         seed_track_names: Optional[List[Dict[str, str]]] = None,
@@ -455,32 +694,7 @@ class MCPClientAdapter:
             推荐歌曲列表
         """
         try:
-            sp = self._get_spotify_client()
-            
-            # 查找歌曲 ID
-            track_ids = []
-            if seed_track_names:
-                for track_data in seed_track_names[:5]:
-                    song_name = track_data.get("song_name", "")
-                    artist_name = track_data.get("artist_name", "")
-                    
-                    query = song_name
-                    if artist_name:
-                        query += f" artist:{artist_name}"
-                    
-                    search_results = sp.search(q=query, type="track", limit=1)
-                    tracks = search_results["tracks"]["items"]
-                    if tracks:
-                        track_ids.append(tracks[0]["id"])
-            
-            # 查找艺术家 ID
-            artist_ids = []
-            if seed_artist_names:
-                for artist_name in seed_artist_names[:5]:
-                    search_results = sp.search(q=f"artist:{artist_name}", type="artist", limit=1)
-                    artists = search_results["artists"]["items"]
-                    if artists:
-                        artist_ids.append(artists[0]["id"])
+            track_ids, artist_ids = await self.resolve_seed_ids(seed_track_names, seed_artist_names)
             
             # 使用找到的 ID 获取推荐
             return await self.get_recommendations(
@@ -506,11 +720,15 @@ class MCPClientAdapter:
         Returns:
             用户热门歌曲列表
         """
+        profile = await self._get_user_profile(limit, time_range)
+        if profile is not None:
+            return [self._spotify_track_to_song(track) for track in profile.top_tracks[:limit]]
+        
         try:
             logger.info(f"获取用户热门歌曲: limit={limit}, time_range={time_range}")
             
             sp = self._get_spotify_client()
-            results = sp.current_user_top_tracks(limit=min(limit, 50), time_range=time_range)
+            results = await self._run(sp.current_user_top_tracks, limit=min(limit, 50), time_range=time_range)
             tracks = results["items"]
             
             songs = [self._spotify_track_to_song(track) for track in tracks]
@@ -538,22 +756,18 @@ class MCPClientAdapter:
         Returns:
             用户热门艺术家列表
         """
+        profile = await self._get_user_profile(limit, time_range)
+        if profile is not None:
+            return [self._spotify_artist_to_artist(artist) for artist in profile.top_artists[:limit]]
+        
         try:
             logger.info(f"获取用户热门艺术家: limit={limit}, time_range={time_range}")
             
             sp = self._get_spotify_client()
-            results = sp.current_user_top_artists(limit=min(limit, 50), time_range=time_range)
+            results = await self._run(sp.current_user_top_artists, limit=min(limit, 50), time_range=time_range)
             artists = results["items"]
             
-            artist_list = []
-            for artist in artists:
-                artist_list.append(Artist(
-                    name=artist.get("name", "未知"),
-                    id=artist.get("id"),
-                    genres=artist.get("genres", []),
-                    popularity=artist.get("popularity", 0),
-                    external_url=artist.get("external_urls", {}).get("spotify") if isinstance(artist.get("external_urls"), dict) else None
-                ))
+            artist_list = [self._spotify_artist_to_artist(artist) for artist in artists]
             
             logger.info(f"获取到 {len(artist_list)} 个用户热门艺术家")
             return artist_list
@@ -592,11 +806,12 @@ class MCPClientAdapter:
             sp = self._get_spotify_client()
             
             # 获取当前用户 ID
-            user = sp.current_user()
+            user = await self._run(sp.current_user)
             user_id = user["id"]
             
             # 创建播放列表
-            playlist = sp.user_playlist_create(
+            playlist = await self._run(
+                sp.user_playlist_create,
                 user=user_id,
                 name=name,
                 public=public,
@@ -611,21 +826,16 @@ class MCPClientAdapter:
                 if song.spotify_id:
                     track_uris.append(f"spotify:track:{song.spotify_id}")
                 else:
-                    # 如果没有 ID，尝试搜索
-                    search_results = sp.search(
-                        q=f"track:{song.title} artist:{song.artist}",
-                        type="track",
-                        limit=1
-                    )
-                    tracks = search_results["tracks"]["items"]
-                    if tracks:
-                        track_uris.append(tracks[0]["uri"])
+                    # 如果没有 ID，尝试搜索（优先读取持久化缓存）
+                    track = await self._resolve_track_by_name(sp, song.title, song.artist)
+                    if track:
+                        track_uris.append(track["uri"])
             
             # 添加歌曲到播放列表（分批添加，每批最多100首）
             if track_uris:
                 for i in range(0, len(track_uris), 100):
                     batch = track_uris[i:i+100]
-                    sp.playlist_add_items(playlist_id, batch)
+                    await self._run(sp.playlist_add_items, playlist_id, batch)
             
             playlist_info = PlaylistInfo(
                 id=playlist_id,
@@ -0,0 +1,128 @@
+"""
+按心情目标重排候选歌曲
+候选歌曲的音频特征组成矩阵，心情目标和权重为向量，一次向量化计算为全部候选打分；
+缺失的特征用掩码跳过，没有音频特征的歌曲按流行度兜底
+"""
+
+import json
+import os
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+from config.logging_config import get_logger
+from tools.vocabulary import get_vocabulary
+
+logger = get_logger(__name__)
+
+# 各特征的默认权重
+DEFAULT_WEIGHTS: Dict[str, float] = {"valence": 0.4, "energy": 0.3, "danceability": 0.2, "tempo": 0.1}
+
+# 差值归一化尺度：tempo 差 60 BPM 记为完全不匹配，其余特征本身在 0-1 范围
+FEATURE_SCALES: Dict[str, float] = {"tempo": 60.0}
+
+
+def find_mood_target(mood: str) -> Optional[Mapping[str, float]]:
+    """心情描述对应的音频特征目标（取第一个有目标的心情命中）"""
+    for hit in get_vocabulary().lookup("mood", mood):
+        if hit.target:
+            return hit.target
+    return None
+
+
+class MoodReRanker:
+    """
+    向量化的心情目标重排
+
+    每个特征的得分为 weight * max(0, 1 - |特征 - 目标| / 尺度)，缺失的特征不计分；
+    有音频特征的歌曲再加 popularity_weight * 流行度/100，
+    没有音频特征的歌曲得分为 0.3 + 流行度/200；同分保持原顺序
+    """
+
+    def __init__(self, weights: Optional[Mapping[str, float]] = None, popularity_weight: float = 0.1):
+        """
+        Args:
+            weights: 特征 → 权重，默认 DEFAULT_WEIGHTS
+            popularity_weight: 流行度加权系数
+        """
+        weights = dict(weights or DEFAULT_WEIGHTS)
+        self.features: Tuple[str, ...] = tuple(weights)
+        self.weights = np.array([weights[name] for name in self.features], dtype=np.float64)
+        self.scales = np.array([FEATURE_SCALES.get(name, 1.0) for name in self.features], dtype=np.float64)
+        self.popularity_weight = popularity_weight
+
+    def feature_matrix(
+        self,
+        songs: Sequence[Any],
+        features_by_id: Mapping[str, Mapping[str, Any]],
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        候选歌曲的特征矩阵
+
+        Returns:
+            (values, present, has_features)：values 为 (n, 特征数)，缺失处为 NaN；
+            present 为特征是否存在的掩码；has_features 标记歌曲是否有音频特征
+        """
+        values = np.full((len(songs), len(self.features)), np.nan)
+        has_features = np.zeros(len(songs), dtype=bool)
+        for row, song in enumerate(songs):
+            feat = features_by_id.get(song.spotify_id or "")
+            if not feat:
+                continue
+            has_features[row] = True
+            values[row] = [np.nan if feat.get(name) is None else feat[name] for name in self.features]
+        return values, ~np.isnan(values), has_features
+
+    def score(
+        self,
+        songs: Sequence[Any],
+        features_by_id: Mapping[str, Mapping[str, Any]],
+        target: Mapping[str, float],
+    ) -> np.ndarray:
+        """一次计算全部候选歌曲的得分（越大越匹配）"""
+        values, present, has_features = self.feature_matrix(songs, features_by_id)
+        popularity = np.fromiter((song.popularity or 0 for song in songs), dtype=np.float64, count=len(songs))
+
+        # 目标中缺失的特征视为完全匹配
+        goal = np.array([target.get(name, np.nan) for name in self.features], dtype=np.float64)
+        goal = np.where(np.isnan(goal), values, goal)
+        diff = np.abs(values - goal) / self.scales
+        per_feature = np.where(present, self.weights * np.maximum(0.0, 1.0 - diff), 0.0)
+
+        matched = per_feature.sum(axis=1) + self.popularity_weight * (popularity / 100.0)
+        fallback = 0.3 + popularity / 200.0
+        return np.where(has_features, matched, fallback)
+
+    def rerank(
+        self,
+        songs: Sequence[Any],
+        features_by_id: Mapping[str, Mapping[str, Any]],
+        target: Mapping[str, float],
+    ) -> List[Any]:
+        """按得分降序重排（稳定排序）"""
+        if not songs:
+            return []
+        order = np.argsort(-self.score(songs, features_by_id, target), kind="stable")
+        return [songs[i] for i in order]
+
+
+_mood_reranker: Optional[MoodReRanker] = None
+
+
+def get_mood_reranker() -> MoodReRanker:
+    """
+    获取心情重排器单例
+
+    权重可通过环境变量 MOOD_RERANK_WEIGHTS（JSON，如 {"valence": 0.5, "energy": 0.5}）覆盖
+    """
+    global _mood_reranker
+    if _mood_reranker is None:
+        weights = None
+        raw = os.getenv("MOOD_RERANK_WEIGHTS")
+        if raw:
+            try:
+                weights = {str(name): float(weight) for name, weight in json.loads(raw).items()}
+            except (ValueError, AttributeError) as e:
+                logger.warning(f"MOOD_RERANK_WEIGHTS 配置无效，使用默认权重: {e}")
+        _mood_reranker = MoodReRanker(weights)
+    return _mood_reranker
@@ -7,8 +7,9 @@ import asyncio
 import aiohttp
 import json
 import os
+import threading
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 from dataclasses import dataclass, asdict
 
 # 在导入其他模块之前加载配置
@@ -19,6 +20,9 @@ except Exception as e:
     print(f"警告: 无法从 setting.json 加载配置: {e}")
 
 from config.logging_config import get_logger
+from tools.catalog_index import CatalogIndex
+from tools.mood_ranker import find_mood_target, get_mood_reranker
+from tools.vocabulary import get_vocabulary
 
 logger = get_logger(__name__)
 
@@ -74,16 +78,22 @@ class MusicSearchTool:
             mcp_adapter = get_mcp_adapter()
         self.mcp_adapter = mcp_adapter
         
-        # 保留本地数据库作为后备（可选）
-        self.music_db = self._initialize_music_db()
+        # 保留本地数据库作为后备（可选），加载时一次性建立曲库索引，查询时不再扫描整个曲库
+        self.music_db, self.catalog = self._initialize_catalog()
+        # 向量化相似度引擎（首次批量查询时构建）
+        self._similarity_engine = None
+        # 曲库向量索引（首次语义查询时加载或构建）
+        self._embedding_index = None
+        self._embedding_index_loaded = False
+        self._embedding_index_lock = threading.Lock()
         # 加载 tailyapi 配置（作为后备）
         self.tailyapi_config = self._load_tailyapi_config()
     
     def _load_tailyapi_config(self) -> Dict[str, str]:
         """加载 tailyapi 配置"""
         try:
-            from config.settings_loader import load_settings_from_json
-            settings = load_settings_from_json()
+            from config.settings_loader import get_settings
+            settings = get_settings()
             api_key = settings.get("TAILYAPI_API_KEY") or os.getenv("TAILYAPI_API_KEY", "")
             base_url = settings.get("TAILYAPI_BASE_URL") or os.getenv("TAILYAPI_BASE_URL", "https://api.tavily.com")
             
@@ -95,6 +105,29 @@ class MusicSearchTool:
             logger.warning(f"加载 tailyapi 配置失败: {str(e)}")
             return {"api_key": "", "base_url": "https://api.tavily.com"}
     
+    def _initialize_catalog(self):
+        """
+        加载本地曲库及其索引
+        
+        优先使用内存映射的列式曲库（环境变量 MUSIC_CATALOG_PATH，默认 data/catalog，
+        由 python -m tools.catalog_store 生成），不存在时解析 music_database.json
+        """
+        catalog_path = Path(os.getenv(
+            "MUSIC_CATALOG_PATH",
+            str(Path(__file__).parent.parent / "data" / "catalog")
+        ))
+        if (catalog_path / "meta.json").exists():
+            try:
+                from tools.catalog_store import load_catalog
+                music_db, catalog = load_catalog(str(catalog_path))
+                logger.info(f"成功加载列式曲库 {len(music_db)} 首歌曲: {catalog_path}")
+                return music_db, catalog
+            except Exception as e:
+                logger.warning(f"加载列式曲库失败，改用JSON文件: {str(e)}")
+        
+        music_db = self._initialize_music_db()
+        return music_db, CatalogIndex(music_db)
+    
     def _initialize_music_db(self) -> List[Song]:
         """从JSON文件初始化音乐数据库"""
         try:
@@ -347,15 +380,8 @@ class MusicSearchTool:
         try:
             logger.info(f"按流派获取歌曲: genre='{genre}'")
             
-            results = [
-                song for song in self.music_db 
-                if song.genre and genre.lower() in song.genre.lower()
-            ]
-            
             # 按流行度排序
-            results.sort(key=lambda x: x.popularity or 0, reverse=True)
-            
-            return results[:limit]
+            return self.catalog.songs_by_genre(genre, limit)
             
         except Exception as e:
             logger.error(f"按流派获取歌曲失败: {str(e)}")
@@ -375,15 +401,8 @@ class MusicSearchTool:
         try:
             logger.info(f"按艺术家获取歌曲: artist='{artist}'")
             
-            results = [
-                song for song in self.music_db 
-                if artist.lower() in song.artist.lower()
-            ]
-            
             # 按年份排序（最新的在前）
-            results.sort(key=lambda x: x.year or 0, reverse=True)
-            
-            return results[:limit]
+            return self.catalog.songs_by_artist(artist, limit)
             
         except Exception as e:
             logger.error(f"按艺术家获取歌曲失败: {str(e)}")
@@ -405,45 +424,14 @@ class MusicSearchTool:
             logger.info(f"获取相似歌曲: song='{song_title}', artist='{artist}'")
             
             # 找到原始歌曲
-            original_song = None
-            for song in self.music_db:
-                if song.title.lower() == song_title.lower() and song.artist.lower() == artist.lower():
-                    original_song = song
-                    break
+            original_song = self.catalog.find_song(song_title, artist)
             
             if not original_song:
                 logger.warning(f"未找到原始歌曲: {song_title} - {artist}")
                 return []
             
-            # 查找相似歌曲
-            similar_songs = []
-            for song in self.music_db:
-                if song.title == original_song.title and song.artist == original_song.artist:
-                    continue  # 跳过自己
-                
-                # 计算相似度分数
-                score = 0
-                if song.genre == original_song.genre:
-                    score += 50  # 流派相同
-                if song.artist == original_song.artist:
-                    score += 40  # 艺术家相同
-                elif song.genre and original_song.genre and song.genre == original_song.genre:
-                    score += 20  # 流派相同但艺术家不同
-                
-                # 年代相近加分
-                if song.year and original_song.year:
-                    year_diff = abs(song.year - original_song.year)
-                    if year_diff <= 3:
-                        score += 10
-                
-                if score > 0:
-                    similar_songs.append((song, score))
-            
-            # 按分数排序
-            similar_songs.sort(key=lambda x: x[1], reverse=True)
-            
-            # 只返回歌曲对象
-            results = [song for song, score in similar_songs[:limit]]
+            # 按相似度分数排序（流派、艺术家、年代）
+            results = self.catalog.similar_songs(original_song, limit)
             logger.info(f"找到 {len(results)} 首相似歌曲")
             
             return results
@@ -452,6 +440,136 @@ class MusicSearchTool:
             logger.error(f"获取相似歌曲失败: {str(e)}")
             return []
     
+    def _get_similarity_engine(self):
+        """获取向量化相似度引擎（延迟构建）"""
+        if self._similarity_engine is None:
+            from tools.similarity import SimilarityEngine
+            self._similarity_engine = SimilarityEngine.for_catalog(self.music_db)
+        return self._similarity_engine
+    
+    async def get_similar_songs_batch(
+        self,
+        seed_songs: List[Dict[str, str]],
+        limit: int = 5
+    ) -> List[List[Song]]:
+        """
+        批量获取相似歌曲（一次向量化计算所有种子歌曲）
+        
+        Args:
+            seed_songs: 种子歌曲 [{"title": "歌名", "artist": "歌手"}, ...]
+            limit: 每首种子返回的结果数量
+            
+        Returns:
+            与 seed_songs 一一对应的相似歌曲列表，曲库中找不到的种子对应空列表
+        """
+        try:
+            logger.info(f"批量获取相似歌曲: {len(seed_songs)} 首种子")
+            
+            rows = [
+                self.catalog.find_row(seed.get("title", ""), seed.get("artist", ""))
+                for seed in seed_songs
+            ]
+            found = [row for row in rows if row is not None]
+            if not found:
+                return [[] for _ in seed_songs]
+            
+            similar_rows = iter(self._get_similarity_engine().similar_batch(found, limit))
+            return [
+                [] if row is None else [self.music_db[i] for i in next(similar_rows)]
+                for row in rows
+            ]
+            
+        except Exception as e:
+            logger.error(f"批量获取相似歌曲失败: {str(e)}")
+            return [[] for _ in seed_songs]
+    
+    def _get_embedding_index(self):
+        """
+        获取曲库向量索引（延迟加载）
+        
+        优先加载 MUSIC_EMBEDDING_INDEX_PATH（默认 data/embeddings，由 python -m tools.embedding_index 生成），
+        不存在时使用本地嵌入函数现场构建；不可用时返回 None。
+        加载和构建都是阻塞操作，异步方法应通过 asyncio.to_thread 调用；并发的首次调用会等待同一次加载
+        """
+        if not self._embedding_index_loaded:
+            with self._embedding_index_lock:
+                if not self._embedding_index_loaded:
+                    try:
+                        from tools.embedding_index import load_or_build_index
+                        index_path = os.getenv(
+                            "MUSIC_EMBEDDING_INDEX_PATH",
+                            str(Path(__file__).parent.parent / "data" / "embeddings")
+                        )
+                        self._embedding_index = load_or_build_index(index_path, self.music_db)
+                    except Exception as e:
+                        logger.warning(f"初始化曲库向量索引失败: {str(e)}")
+                    self._embedding_index_loaded = True
+        return self._embedding_index
+    
+    async def get_songs_like(
+        self,
+        seed_songs: List[Dict[str, str]],
+        limit: int = 10
+    ) -> List[Tuple[Song, float]]:
+        """
+        "更多类似的歌"：按向量索引查找与一组种子歌曲整体最相似的歌曲
+        
+        Args:
+            seed_songs: 种子歌曲 [{"title": "歌名", "artist": "歌手"}, ...]
+            limit: 返回结果数量
+            
+        Returns:
+            [(歌曲, 余弦相似度)]，不含种子本身；种子都不在曲库中时按其文本查询
+        """
+        try:
+            if not seed_songs:
+                return []
+            index = await asyncio.to_thread(self._get_embedding_index)
+            if index is None:
+                return []
+            
+            rows = [
+                row for row in (
+                    self.catalog.find_row(seed.get("title", ""), seed.get("artist", ""))
+                    for seed in seed_songs
+                )
+                if row is not None
+            ]
+            # 查询需要对文本做嵌入并扫描整个向量矩阵，放到线程中执行
+            if rows:
+                hits = await asyncio.to_thread(index.more_like, rows, limit)
+            else:
+                text = " ".join(f"{seed.get('title', '')} {seed.get('artist', '')}" for seed in seed_songs)
+                hits = await asyncio.to_thread(index.search_text, text, limit)
+            return [(self.music_db[i], score) for i, score in hits]
+            
+        except Exception as e:
+            logger.error(f"按向量索引查找类似歌曲失败: {str(e)}")
+            return []
+    
+    async def search_songs_by_text(self, text: str, limit: int = 10) -> List[Tuple[Song, float]]:
+        """
+        按自由文本（心情、场景、风格描述）在向量索引中查找歌曲
+        
+        Args:
+            text: 查询文本
+            limit: 返回结果数量
+            
+        Returns:
+            [(歌曲, 余弦相似度)]
+        """
+        try:
+            if not text:
+                return []
+            index = await asyncio.to_thread(self._get_embedding_index)
+            if index is None:
+                return []
+            hits = await asyncio.to_thread(index.search_text, text, limit)
+            return [(self.music_db[i], score) for i, score in hits]
+        except Exception as e:
+            logger.error(f"按文本查找歌曲失败: {str(e)}")
+            return []
+    
     async def get_popular_songs(self, limit: int = 10) -> List[Song]:
         """
         获取热门歌曲
@@ -466,13 +584,7 @@ class MusicSearchTool:
             logger.info(f"获取热门歌曲")
             
             # 按流行度排序
-            popular = sorted(
-                self.music_db, 
-                key=lambda x: x.popularity or 0, 
-                reverse=True
-            )
-            
-            return popular[:limit]
+            return self.catalog.popular_songs(limit)
             
         except Exception as e:
             logger.error(f"获取热门歌曲失败: {str(e)}")
@@ -518,61 +630,10 @@ class MusicRecommenderEngine:
         try:
             logger.info(f"根据心情推荐音乐: mood='{mood}'")
             
-            # 心情到 Spotify 流派的映射（扩充中文同义词）
-            mood_genre_map = {
-                "开心": ["pop", "dance", "electronic"],
-                "快乐": ["pop", "dance", "electronic"],
-                "高兴": ["pop", "dance", "electronic"],
-                "兴奋": ["rock", "electronic", "dance"],
-                "激动": ["rock", "electronic", "dance"],
-                "悲伤": ["acoustic", "sad", "indie", "mellow"],
-                "伤心": ["acoustic", "sad", "indie", "mellow"],
-                "难过": ["acoustic", "sad", "indie", "piano"],
-                "丧": ["acoustic", "sad", "indie"],
-                "疗愈": ["acoustic", "mellow", "indie"],
-                "放松": ["chill", "acoustic", "jazz", "ambient"],
-                "舒缓": ["chill", "acoustic", "jazz", "ambient"],
-                "平静": ["ambient", "acoustic", "chill"],
-                "安静": ["ambient", "acoustic", "chill"],
-                "怀旧": ["classic", "pop", "rock", "indie"],
-                "浪漫": ["acoustic", "pop", "r-n-b", "soul"],
-                "甜蜜": ["pop", "r-n-b", "soul"],
-                "表白": ["r-n-b", "soul", "pop"],
-                "学习": ["lo-fi", "chill", "ambient", "acoustic"],
-                "专注": ["lo-fi", "ambient", "acoustic"],
-                "运动": ["electronic", "rock", "dance"],
-            }
-
-            # 心情到音频特征目标（0-1范围，tempo单位 BPM）
-            mood_target_features = {
-                "开心": {"valence": 0.7, "energy": 0.7, "danceability": 0.6, "tempo": 120},
-                "快乐": {"valence": 0.7, "energy": 0.7, "danceability": 0.6, "tempo": 120},
-                "高兴": {"valence": 0.7, "energy": 0.7, "danceability": 0.6, "tempo": 120},
-                "兴奋": {"valence": 0.6, "energy": 0.85, "danceability": 0.7, "tempo": 130},
-                "激动": {"valence": 0.6, "energy": 0.85, "danceability": 0.7, "tempo": 130},
-                "悲伤": {"valence": 0.25, "energy": 0.3, "danceability": 0.3, "tempo": 80},
-                "伤心": {"valence": 0.25, "energy": 0.3, "danceability": 0.3, "tempo": 80},
-                "难过": {"valence": 0.2, "energy": 0.25, "danceability": 0.3, "tempo": 75},
-                "丧": {"valence": 0.2, "energy": 0.25, "danceability": 0.3, "tempo": 75},
-                "疗愈": {"valence": 0.4, "energy": 0.3, "danceability": 0.35, "tempo": 85},
-                "放松": {"valence": 0.5, "energy": 0.35, "danceability": 0.4, "tempo": 90},
-                "舒缓": {"valence": 0.5, "energy": 0.35, "danceability": 0.4, "tempo": 90},
-                "平静": {"valence": 0.45, "energy": 0.25, "danceability": 0.35, "tempo": 80},
-                "安静": {"valence": 0.45, "energy": 0.25, "danceability": 0.35, "tempo": 80},
-                "怀旧": {"valence": 0.5, "energy": 0.45, "danceability": 0.45, "tempo": 100},
-                "浪漫": {"valence": 0.65, "energy": 0.45, "danceability": 0.5, "tempo": 95},
-                "甜蜜": {"valence": 0.7, "energy": 0.5, "danceability": 0.55, "tempo": 100},
-                "表白": {"valence": 0.65, "energy": 0.45, "danceability": 0.5, "tempo": 95},
-                "学习": {"valence": 0.45, "energy": 0.3, "danceability": 0.35, "tempo": 85},
-                "专注": {"valence": 0.4, "energy": 0.25, "danceability": 0.3, "tempo": 80},
-                "运动": {"valence": 0.6, "energy": 0.85, "danceability": 0.75, "tempo": 130},
-            }
-            
-            # 匹配流派
-            spotify_genres = []
-            for key, value in mood_genre_map.items():
-                if key in mood or mood in key:
-                    spotify_genres.extend(value)
+            # 匹配流派（共享词表，一次扫描得到全部心情命中）
+            spotify_genres = [
+                genre for hit in get_vocabulary().lookup("mood", mood) for genre in hit.genres
+            ]
             
             if not spotify_genres:
                 spotify_genres = ["pop"]  # 默认流派
@@ -587,43 +648,13 @@ class MusicRecommenderEngine:
                 logger.warning(f"Spotify 推荐未返回结果，请检查 MCP 配置")
                 return []
             
-            # 获取音频特征并基于心情做重排
+            # 获取音频特征（经缓存）并基于心情做向量化重排
             try:
-                target = None
-                for k, v in mood_target_features.items():
-                    if k in mood or mood in k:
-                        target = v
-                        break
-                features_by_id = {}
+                target = find_mood_target(mood)
                 if target:
                     track_ids = [s.spotify_id for s in songs if s.spotify_id]
                     features_by_id = await self.mcp_adapter.get_audio_features(track_ids)
-
-                    def _score(song: Song) -> float:
-                        feat = features_by_id.get(song.spotify_id or "", {})
-                        if not feat:
-                            # 回退使用流行度
-                            return 0.3 + (song.popularity or 0) / 200.0
-                        # 计算与目标的距离分数（越小越好，这里转为分数越大越好）
-                        w = {"valence": 0.4, "energy": 0.3, "danceability": 0.2, "tempo": 0.1}
-                        score = 0.0
-                        for kf, weight in w.items():
-                            if kf == "tempo":
-                                v = feat.get(kf)
-                                if v is None:
-                                    continue
-                                diff = abs(v - target.get(kf, v)) / 60.0  # 60 BPM 归一
-                            else:
-                                v = feat.get(kf)
-                                if v is None:
-                                    continue
-                                diff = abs(v - target.get(kf, v))
-                            score += weight * max(0.0, 1.0 - diff)
-                        # 结合流行度做轻微加权
-                        score += 0.1 * ((song.popularity or 0) / 100.0)
-                        return score
-
-                    songs = sorted(songs, key=_score, reverse=True)
+                    songs = get_mood_reranker().rerank(songs, features_by_id, target)
             except Exception as e:
                 logger.debug(f"按音频特征重排失败: {e}")
 
@@ -724,24 +755,10 @@ class MusicRecommenderEngine:
         try:
             logger.info(f"根据活动场景推荐: activity='{activity}'")
             
-            # 活动到 Spotify 流派的映射
-            activity_genre_map = {
-                "运动": ["electronic", "rock", "dance"],
-                "健身": ["electronic", "rock", "dance"],
-                "学习": ["acoustic", "jazz", "chill"],
-                "工作": ["acoustic", "jazz", "chill"],
-                "开车": ["pop", "rock", "country"],
-                "睡觉": ["ambient", "acoustic", "chill"],
-                "休息": ["acoustic", "chill", "jazz"],
-                "派对": ["dance", "pop", "electronic"],
-                "聚会": ["pop", "dance", "electronic"],
-            }
-            
-            # 匹配流派
-            spotify_genres = []
-            for key, value in activity_genre_map.items():
-                if key in activity.lower() or activity.lower() in key:
-                    spotify_genres.extend(value)
+            # 匹配流派（共享词表）
+            spotify_genres = [
+                genre for hit in get_vocabulary().lookup("activity", activity) for genre in hit.genres
+            ]
             
             if not spotify_genres:
                 spotify_genres = ["pop"]
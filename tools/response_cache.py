@@ -0,0 +1,294 @@
+"""
+完整响应缓存
+缓存推荐/歌单的最终结果以及生成过程中产出的事件序列，命中时直接返回结果或按原顺序重放事件；
+进程内 LRU 在前，可选的持久化缓存（SQLite，多个 worker 共享）在后。
+缓存时间按意图区分，经常被请求的键缓存更久；过期后的一段时间内先返回旧结果，同时在后台刷新
+"""
+
+import asyncio
+import copy
+import json
+import os
+import time
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Mapping, Optional
+
+from config.logging_config import get_logger
+from tools.cache import TTLCache, create_cache
+
+logger = get_logger(__name__)
+
+# 事件流中携带最终结果的事件类型（推荐与歌单的流式接口都以该事件结束）
+RESULT_EVENT = "result"
+
+# 各意图的缓存时间（秒）；以 * 结尾的键按前缀匹配，0 表示不缓存
+DEFAULT_INTENT_TTLS: Dict[str, float] = {
+    "search": 6 * 3600,
+    "recommend_by_artist": 6 * 3600,
+    "recommend_by_genre": 3 * 3600,
+    "recommend_by_mood": 3600,
+    "recommend_by_activity": 3600,
+    "recommend_by_favorites": 900,
+    "general_chat": 600,
+    "playlist": 3600,
+    # 创建 Spotify 播放列表有副作用，每次都要真正执行
+    "create_playlist*": 0,
+}
+
+
+class CachedResponse:
+    """一条缓存的响应"""
+
+    __slots__ = ("result", "events", "intent", "stale")
+
+    def __init__(self, result: Any, events: Optional[List[Any]], intent: str, stale: bool):
+        self.result = result
+        # 由流式接口写入时保存完整事件序列，由非流式接口写入时为 None
+        self.events = events
+        self.intent = intent
+        self.stale = stale
+
+    def replay(self) -> List[Any]:
+        """按原顺序重放的事件；只有结果时退化为单个结果事件"""
+        if self.events:
+            return self.events
+        return [{"type": RESULT_EVENT, "result": self.result}]
+
+
+class ResponseCache:
+    """
+    两级响应缓存
+
+    - 缓存时间由意图决定（DEFAULT_INTENT_TTLS，可用 {NAMESPACE}_CACHE_TTLS 覆盖），
+      每 popular_hits 次请求延长一倍基础时间，最多 max_boost 倍
+    - 过期后 stale_ttl 秒内仍返回旧结果，并在后台刷新（同一个键同时只刷新一次）
+    """
+
+    def __init__(
+        self,
+        namespace: str,
+        default_ttl: float = 1800,
+        intent_ttls: Optional[Mapping[str, float]] = None,
+        stale_ttl: float = 600,
+        memory_entries: int = 256,
+        popular_hits: int = 5,
+        max_boost: float = 4.0,
+    ):
+        """
+        Args:
+            namespace: 缓存命名空间，同时决定环境变量前缀（如 "response" → RESPONSE_CACHE_*）
+            default_ttl: 意图不在表中时的缓存时间（秒）
+            intent_ttls: 意图 → 缓存时间，默认 DEFAULT_INTENT_TTLS
+            stale_ttl: 过期后仍可返回旧结果的时间（秒）
+            memory_entries: 进程内 LRU 的最大条目数
+            popular_hits: 每多少次请求延长一倍缓存时间
+            max_boost: 缓存时间最多延长到基础时间的倍数
+        """
+        prefix = namespace.upper()
+        self.namespace = namespace
+        self.default_ttl = default_ttl
+        self.intent_ttls = dict(DEFAULT_INTENT_TTLS if intent_ttls is None else intent_ttls)
+        raw = os.getenv(f"{prefix}_CACHE_TTLS")
+        if raw:
+            try:
+                self.intent_ttls.update({str(name): float(ttl) for name, ttl in json.loads(raw).items()})
+            except (ValueError, AttributeError) as e:
+                logger.warning(f"{prefix}_CACHE_TTLS 配置无效，使用默认缓存时间: {e}")
+        try:
+            stale_ttl = float(os.getenv(f"{prefix}_CACHE_STALE_TTL", stale_ttl))
+        except ValueError:
+            logger.warning(f"{prefix}_CACHE_STALE_TTL 配置无效，使用默认值")
+        self.stale_ttl = stale_ttl
+        self.popular_hits = max(1, popular_hits)
+        self.max_boost = max_boost
+
+        self.memory = TTLCache(max_entries=memory_entries, ttl=default_ttl)
+        # 持久化层由 {NAMESPACE}_CACHE_BACKEND 等环境变量控制（默认不启用，sqlite 可在 worker 间共享）
+        self.persistent = create_cache(
+            namespace, max_entries=memory_entries * 20, ttl=default_ttl, default_backend="none"
+        )
+        # 最近一天内每个键被请求的次数
+        self._requests = TTLCache(max_entries=memory_entries * 8, ttl=86400)
+        self._refreshing: Dict[str, "asyncio.Task[None]"] = {}
+        self.stale_hits = 0
+        self.refreshes = 0
+
+    def ttl_for(self, intent: str) -> float:
+        """意图的基础缓存时间"""
+        if intent in self.intent_ttls:
+            return self.intent_ttls[intent]
+        for name, ttl in self.intent_ttls.items():
+            if name.endswith("*") and intent.startswith(name[:-1]):
+                return ttl
+        return self.default_ttl
+
+    def _count_request(self, key: str) -> int:
+        _, count = self._requests.get(key)
+        count = (count or 0) + 1
+        self._requests.set(key, count)
+        return count
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        """
+        查询缓存，未命中返回 None；持久化层命中时回填进程内缓存
+
+        返回的结果与事件是缓存条目的深拷贝，调用方可以随意修改
+        """
+        self._count_request(key)
+        found, entry = self.memory.get(key)
+        if not found and self.persistent is not None:
+            found, entry = self.persistent.get(key)
+            if found:
+                self.memory.set(key, entry, ttl=max(0.0, entry["expires_at"] - time.time()))
+        if not found:
+            return None
+        stale = entry["fresh_until"] < time.time()
+        if stale:
+            self.stale_hits += 1
+        return CachedResponse(
+            copy.deepcopy(entry["result"]), copy.deepcopy(entry.get("events")), entry.get("intent", ""), stale
+        )
+
+    def put(self, key: str, result: Any, intent: str, events: Optional[List[Any]] = None) -> bool:
+        """
+        写入缓存（保存结果与事件的深拷贝，调用方之后对它们的修改不会影响缓存）
+
+        Returns:
+            是否写入（意图的缓存时间为 0 时不写入）
+        """
+        ttl = self.ttl_for(intent)
+        if ttl <= 0:
+            return False
+        _, count = self._requests.get(key)
+        ttl *= min(self.max_boost, 1 + ((count or 1) - 1) / self.popular_hits)
+        now = time.time()
+        entry = {
+            "result": copy.deepcopy(result),
+            "events": copy.deepcopy(events),
+            "intent": intent,
+            "fresh_until": now + ttl,
+            "expires_at": now + ttl + self.stale_ttl,
+        }
+        self.memory.set(key, entry, ttl=ttl + self.stale_ttl)
+        if self.persistent is not None:
+            try:
+                self.persistent.set(key, entry, ttl=ttl + self.stale_ttl)
+            except Exception as e:
+                logger.debug(f"写入响应持久化缓存失败: {e}")
+        return True
+
+    async def call(
+        self,
+        key: str,
+        func: Callable[[], Awaitable[Any]],
+        intent_of: Callable[[Any], Optional[str]],
+    ) -> Any:
+        """
+        返回缓存的结果，未命中时执行 func 并缓存
+
+        Args:
+            key: 缓存键
+            func: 计算结果的协程函数
+            intent_of: 结果 → 意图，返回 None 表示结果不应缓存（如失败的结果）
+        """
+        cached = self.get(key)
+        if cached is not None:
+            if cached.stale:
+                self._revalidate(key, lambda: self._compute(key, func, intent_of))
+            return cached.result
+        return await self._compute(key, func, intent_of)
+
+    async def _compute(
+        self,
+        key: str,
+        func: Callable[[], Awaitable[Any]],
+        intent_of: Callable[[Any], Optional[str]],
+    ) -> Any:
+        result = await func()
+        intent = intent_of(result)
+        if intent is not None:
+            self.put(key, result, intent)
+        return result
+
+    async def stream(
+        self,
+        key: str,
+        factory: Callable[[], AsyncIterator[Any]],
+        intent_of: Callable[[Any], Optional[str]],
+    ) -> AsyncIterator[Any]:
+        """
+        按原顺序重放缓存的事件，未命中时转发 factory() 的事件并在结果事件到达后缓存整条序列
+
+        Args:
+            key: 缓存键
+            factory: 创建事件流的函数，事件流以 {"type": "result", "result": ...} 结束
+            intent_of: 结果 → 意图，返回 None 表示不缓存
+        """
+        cached = self.get(key)
+        if cached is not None:
+            if cached.stale:
+                self._revalidate(key, lambda: self._drain(key, factory, intent_of))
+            for event in cached.replay():
+                yield event
+            return
+
+        async for event in self._record(key, factory, intent_of):
+            yield event
+
+    async def _record(
+        self,
+        key: str,
+        factory: Callable[[], AsyncIterator[Any]],
+        intent_of: Callable[[Any], Optional[str]],
+    ) -> AsyncIterator[Any]:
+        """转发事件流，结果事件到达时连同之前的事件一起写入缓存"""
+        events: List[Any] = []
+        async for event in factory():
+            # 事件转发出去后可能被调用方修改，记录的是转发前的副本
+            events.append(copy.deepcopy(event))
+            if event.get("type") == RESULT_EVENT:
+                intent = intent_of(event["result"])
+                if intent is not None:
+                    self.put(key, event["result"], intent, events)
+            yield event
+
+    async def _drain(
+        self,
+        key: str,
+        factory: Callable[[], AsyncIterator[Any]],
+        intent_of: Callable[[Any], Optional[str]],
+    ) -> None:
+        """在后台完整运行一次事件流并刷新缓存"""
+        async for _ in self._record(key, factory, intent_of):
+            pass
+
+    def _revalidate(self, key: str, refresh: Callable[[], Awaitable[Any]]) -> None:
+        """后台刷新过期条目，同一个键同时只有一个刷新任务"""
+        if key in self._refreshing:
+            return
+        self.refreshes += 1
+
+        async def run() -> None:
+            try:
+                await refresh()
+            except Exception as e:
+                logger.warning(f"[{self.namespace}] 后台刷新缓存失败: {e}")
+            finally:
+                self._refreshing.pop(key, None)
+
+        self._refreshing[key] = asyncio.ensure_future(run())
+
+    def clear(self) -> None:
+        """清空两级缓存和请求计数"""
+        self.memory.clear()
+        self._requests.clear()
+        if self.persistent is not None:
+            self.persistent.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """两级缓存的命中统计、返回旧结果的次数和后台刷新次数"""
+        return {
+            "memory": self.memory.stats(),
+            "persistent": self.persistent.stats() if self.persistent is not None else None,
+            "stale_hits": self.stale_hits,
+            "refreshes": self.refreshes,
+        }
@@ -0,0 +1,122 @@
+"""
+向量化相似度计算
+流派、艺术家、歌名编码为整数数组，年份为数值数组，一个 NumPy 表达式即可为整个曲库打分，
+用 argpartition 取前 k 首，不需要对全部歌曲排序；支持一次计算多首种子歌曲
+"""
+
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+from tools.catalog_index import YEAR_WINDOW
+
+if TYPE_CHECKING:
+    from tools.music_tools import Song
+
+# 批量查询时每块分数矩阵的最大元素数，限制内存占用
+MAX_BLOCK_ELEMENTS = 2_000_000
+
+
+def _encode(values: Iterable[Optional[str]]) -> np.ndarray:
+    """字符串 → 整数编码（相同字符串编码相同，None 为 -1）"""
+    codes: Dict[str, int] = {}
+    return np.fromiter(
+        (-1 if v is None else codes.setdefault(v, len(codes)) for v in values),
+        dtype=np.int32,
+    )
+
+
+class SimilarityEngine:
+    """
+    基于整数编码的相似度引擎
+
+    评分规则与 CatalogIndex.similar_songs 一致：
+    流派相同 +50；艺术家相同 +40，否则流派相同（且非空）再 +20；年份相差 3 年以内 +10；
+    排除歌名和艺术家都相同的歌曲，分数为 0 的不返回，同分按曲库顺序
+    """
+
+    def __init__(self, titles: np.ndarray, artists: np.ndarray, genres: np.ndarray, years: np.ndarray):
+        """
+        Args:
+            titles / artists / genres: 整数编码（同一字符串编码相同，流派 None 为 -1）
+            years: 年份，缺失为 0 或负数
+        """
+        self.titles = np.asarray(titles)
+        self.artists = np.asarray(artists)
+        self.genres = np.asarray(genres)
+        self.years = np.maximum(np.asarray(years, dtype=np.int32), 0)
+        self.size = len(self.titles)
+
+    @classmethod
+    def from_songs(cls, songs: Sequence["Song"]) -> "SimilarityEngine":
+        """由 Song 列表构建"""
+        return cls(
+            titles=_encode(song.title for song in songs),
+            artists=_encode(song.artist for song in songs),
+            genres=_encode(song.genre for song in songs),
+            years=np.fromiter((song.year or 0 for song in songs), dtype=np.int32, count=len(songs)),
+        )
+
+    @classmethod
+    def for_catalog(cls, songs: Sequence["Song"]) -> "SimilarityEngine":
+        """列式曲库直接复用内存映射的字符串 ID 列，其余曲库现场编码"""
+        columns = getattr(songs, "columns", None)
+        if columns is not None:
+            return cls(columns["title"], columns["artist"], columns["genre"], columns["year"])
+        return cls.from_songs(songs)
+
+    def _scores(self, rows: np.ndarray) -> np.ndarray:
+        """种子行 × 全部歌曲的分数矩阵 (len(rows), size)"""
+        g0 = self.genres[rows][:, None]
+        a0 = self.artists[rows][:, None]
+        t0 = self.titles[rows][:, None]
+        y0 = self.years[rows][:, None]
+
+        same_genre = self.genres[None, :] == g0
+        same_artist = self.artists[None, :] == a0
+        near_year = (y0 > 0) & (self.years[None, :] > 0) & (np.abs(self.years[None, :] - y0) <= YEAR_WINDOW)
+
+        scores = (
+            50 * same_genre
+            + np.where(same_artist, 40, 20 * (same_genre & (g0 >= 0)))
+            + 10 * near_year
+        ).astype(np.int16)
+        scores[same_artist & (self.titles[None, :] == t0)] = 0
+        return scores
+
+    def _top_k(self, scores: np.ndarray, limit: int) -> List[List[int]]:
+        """每行取分数最高的 limit 首（同分按曲库顺序），只保留分数大于 0 的"""
+        n = self.size
+        k = min(limit, n)
+        if k <= 0:
+            return [[] for _ in range(len(scores))]
+        # 分数与曲库顺序合成一个键：分数高者在前，同分时下标小者在前
+        keys = scores.astype(np.int64) * n + (n - 1 - np.arange(n))
+        if k < n:
+            top = np.argpartition(-keys, k - 1, axis=1)[:, :k]
+        else:
+            top = np.broadcast_to(np.arange(n), keys.shape)
+        top_keys = np.take_along_axis(keys, top, axis=1)
+        order = np.argsort(-top_keys, axis=1, kind="stable")
+        top = np.take_along_axis(top, order, axis=1)
+        positive = np.take_along_axis(top_keys, order, axis=1) >= n
+        return [row[mask].tolist() for row, mask in zip(top, positive)]
+
+    def similar(self, row: int, limit: int) -> List[int]:
+        """与第 row 首歌最相似的歌曲下标"""
+        return self.similar_batch([row], limit)[0]
+
+    def similar_batch(self, rows: Sequence[int], limit: int) -> List[List[int]]:
+        """
+        批量查询：为每首种子歌曲返回最相似的歌曲下标
+
+        分块计算分数矩阵，每块不超过 MAX_BLOCK_ELEMENTS 个元素
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        if not len(rows) or not self.size:
+            return [[] for _ in range(len(rows))]
+        block = max(1, MAX_BLOCK_ELEMENTS // self.size)
+        results: List[List[int]] = []
+        for start in range(0, len(rows), block):
+            results.extend(self._top_k(self._scores(rows[start:start + block]), limit))
+        return results
@@ -0,0 +1,135 @@
+"""
+请求合并（single-flight）
+相同的请求同时到达时只执行一次：后到的请求等待正在进行的那次并共享结果；
+流式请求共享同一条事件流，后加入的订阅者先补发已产生的事件，再实时接收后续事件
+"""
+
+import asyncio
+import json
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Hashable, List, Optional, TypeVar
+
+from config.logging_config import get_logger
+from tools.cache import normalize_query
+
+logger = get_logger(__name__)
+
+T = TypeVar("T")
+
+
+def request_key(query: str, **params: Any) -> str:
+    """由规范化后的查询文本和其余参数构造合并键（参数按名称排序后序列化）"""
+    return json.dumps(
+        [normalize_query(query), params], ensure_ascii=False, sort_keys=True, default=str
+    )
+
+
+class _Broadcast:
+    """一条正在进行的事件流：保存已产生的事件，供所有订阅者按顺序读取"""
+
+    def __init__(self):
+        self.events: List[Any] = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self.subscribers = 0
+        self.task: Optional["asyncio.Task[None]"] = None
+        self._wakeup = asyncio.Event()
+
+    def notify(self) -> None:
+        """唤醒正在等待新事件的订阅者"""
+        self._wakeup.set()
+        self._wakeup = asyncio.Event()
+
+    async def wait(self) -> None:
+        await self._wakeup.wait()
+
+
+class SingleFlight:
+    """
+    按键合并同时进行的相同请求
+
+    - do：协程只执行一次，所有等待者拿到同一个结果（或同一个异常）；
+      等待者被取消不会取消共享的执行
+    - stream：异步生成器只运行一次，所有订阅者收到相同的完整事件序列；
+      所有订阅者都离开后才取消共享的生成器
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._calls: Dict[Hashable, "asyncio.Future[Any]"] = {}
+        self._streams: Dict[Hashable, _Broadcast] = {}
+        self.executed = 0
+        self.coalesced = 0
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[T]]) -> T:
+        """执行 func，或等待相同键上正在进行的执行"""
+        future = self._calls.get(key)
+        if future is None:
+            self.executed += 1
+            future = asyncio.ensure_future(func())
+            self._calls[key] = future
+            future.add_done_callback(lambda done: self._forget(self._calls, key, done))
+        else:
+            self.coalesced += 1
+            logger.debug(f"[{self.name}] 合并到进行中的请求")
+        return await asyncio.shield(future)
+
+    async def stream(self, key: Hashable, factory: Callable[[], AsyncIterator[T]]) -> AsyncIterator[T]:
+        """订阅 factory() 产生的事件流，相同键上已有进行中的流时直接加入"""
+        broadcast = self._streams.get(key)
+        if broadcast is None:
+            self.executed += 1
+            broadcast = _Broadcast()
+            self._streams[key] = broadcast
+            broadcast.task = asyncio.ensure_future(self._produce(broadcast, factory))
+            broadcast.task.add_done_callback(lambda _: self._finish(key, broadcast))
+        else:
+            self.coalesced += 1
+            logger.debug(f"[{self.name}] 加入进行中的事件流（已有 {len(broadcast.events)} 个事件）")
+
+        broadcast.subscribers += 1
+        try:
+            position = 0
+            while True:
+                while position < len(broadcast.events):
+                    yield broadcast.events[position]
+                    position += 1
+                if broadcast.done:
+                    if broadcast.error is not None:
+                        raise broadcast.error
+                    return
+                await broadcast.wait()
+        finally:
+            broadcast.subscribers -= 1
+            if broadcast.subscribers == 0 and not broadcast.done and broadcast.task is not None:
+                # 之后到达的相同请求重新开始，不会加入这条被取消的流
+                self._forget(self._streams, key, broadcast)
+                broadcast.task.cancel()
+
+    async def _produce(self, broadcast: _Broadcast, factory: Callable[[], AsyncIterator[Any]]) -> None:
+        try:
+            async for event in factory():
+                broadcast.events.append(event)
+                broadcast.notify()
+        except asyncio.CancelledError:
+            logger.debug(f"[{self.name}] 所有订阅者都已离开，停止事件流")
+        except Exception as e:
+            broadcast.error = e
+
+    def _finish(self, key: Hashable, broadcast: _Broadcast) -> None:
+        """事件流结束（包括尚未开始就被取消）时唤醒订阅者并移除记录"""
+        broadcast.done = True
+        broadcast.notify()
+        self._forget(self._streams, key, broadcast)
+
+    @staticmethod
+    def _forget(table: Dict[Hashable, Any], key: Hashable, entry: Any) -> None:
+        if table.get(key) is entry:
+            del table[key]
+
+    def stats(self) -> Dict[str, Any]:
+        """返回执行次数、被合并的请求数和当前进行中的请求数"""
+        return {
+            "executed": self.executed,
+            "coalesced": self.coalesced,
+            "in_flight": len(self._calls) + len(self._streams),
+        }
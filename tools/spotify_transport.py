@@ -0,0 +1,71 @@
+"""
+Spotify 异步传输层
+把同步的 spotipy 调用放到有界线程池中执行，避免阻塞 FastAPI 事件循环
+"""
+
+import asyncio
+import functools
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+from config.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+# 默认工作线程数，可通过环境变量 SPOTIFY_MAX_WORKERS 调整
+DEFAULT_MAX_WORKERS = 8
+
+
+class AsyncSpotifyTransport:
+    """在有界线程池中执行 spotipy 请求的异步传输层"""
+
+    def __init__(self, max_workers: Optional[int] = None):
+        """
+        初始化传输层
+
+        Args:
+            max_workers: 最大并发请求数，如果为 None 则从环境变量读取
+        """
+        if max_workers is None:
+            try:
+                max_workers = int(os.getenv("SPOTIFY_MAX_WORKERS", DEFAULT_MAX_WORKERS))
+            except ValueError:
+                max_workers = DEFAULT_MAX_WORKERS
+        self.max_workers = max(1, max_workers)
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_workers,
+            thread_name_prefix="spotify-io"
+        )
+        logger.info(f"AsyncSpotifyTransport 初始化: max_workers={self.max_workers}")
+
+    async def call(self, func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """
+        在线程池中执行一次同步 spotipy 调用
+
+        Args:
+            func: spotipy 客户端方法，如 sp.search
+            *args, **kwargs: 透传给 func 的参数
+
+        Returns:
+            func 的返回值（异常会原样抛出）
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._executor, functools.partial(func, *args, **kwargs)
+        )
+
+    def shutdown(self, wait: bool = False) -> None:
+        """关闭线程池"""
+        self._executor.shutdown(wait=wait)
+
+
+# 进程级共享实例
+_spotify_transport = None
+
+def get_spotify_transport() -> AsyncSpotifyTransport:
+    """获取 Spotify 传输层单例"""
+    global _spotify_transport
+    if _spotify_transport is None:
+        _spotify_transport = AsyncSpotifyTransport()
+    return _spotify_transport
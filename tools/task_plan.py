@@ -0,0 +1,232 @@
+"""
+依赖感知的并发任务计划
+把一次请求中的上游调用描述为带依赖的任务：依赖完成后任务立即开始，互不依赖的任务并发执行，
+整个计划共享一个截止时间；失败或超时的任务取默认值，不影响其他任务。
+按需任务（lazy）只在被请求结果时才开始，适合"结果不够时才需要"的补充请求。
+计划结束时在日志中给出本次请求的关键路径
+"""
+
+import asyncio
+import inspect
+import os
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from config.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+# 计划的默认截止时间（秒），可用环境变量 UPSTREAM_TIMEOUT 覆盖，0 表示不限
+DEFAULT_TIMEOUT = 20.0
+
+
+def upstream_timeout() -> Optional[float]:
+    """UPSTREAM_TIMEOUT（秒）的当前值，未设置时为 DEFAULT_TIMEOUT，0 表示不限（返回 None）"""
+    try:
+        timeout = float(os.getenv("UPSTREAM_TIMEOUT", DEFAULT_TIMEOUT))
+    except ValueError:
+        logger.warning("UPSTREAM_TIMEOUT 配置无效，使用默认值")
+        timeout = DEFAULT_TIMEOUT
+    return timeout or None
+
+
+class _Task:
+    """计划中的一个任务及其执行记录"""
+
+    __slots__ = (
+        "name", "func", "after", "default", "timeout", "lazy",
+        "future", "started_at", "finished_at", "status",
+    )
+
+    def __init__(
+        self,
+        name: str,
+        func: Callable[..., Any],
+        after: Tuple[str, ...],
+        default: Any,
+        timeout: Optional[float],
+        lazy: bool,
+    ):
+        self.name = name
+        self.func = func
+        self.after = after
+        self.default = default
+        self.timeout = timeout
+        self.lazy = lazy
+        self.future: Optional["asyncio.Future[Any]"] = None
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.status = "pending"
+
+
+class TaskPlan:
+    """
+    一次请求的任务计划
+
+    用法：
+        plan = TaskPlan("preferences")
+        plan.add("top_tracks", lambda: adapter.get_user_top_tracks(limit=20), default=[])
+        plan.add("top_artists", lambda: adapter.get_user_top_artists(limit=20), default=[])
+        results = await plan.run()
+
+    任务函数按 after 的顺序接收依赖任务的结果作为位置参数，可以是普通函数或协程函数；
+    需要边执行边产出进度时，先 start()，再用 result(name) 等待单个任务，最后 close()。
+    lazy=True 的任务不随 start() 开始，第一次 result(name) 时才开始（仍受计划截止时间约束），
+    close() 时仍未请求的按需任务记为 skipped
+    """
+
+    def __init__(self, name: str, timeout: Optional[float] = None):
+        """
+        Args:
+            name: 计划名称（用于日志）
+            timeout: 整个计划的截止时间（秒），默认读取 UPSTREAM_TIMEOUT，0 表示不限
+        """
+        self.name = name
+        self.timeout = upstream_timeout() if timeout is None else (timeout or None)
+        self._tasks: Dict[str, _Task] = {}
+        self._started_at: Optional[float] = None
+        self._closed = False
+
+    def add(
+        self,
+        name: str,
+        func: Callable[..., Any],
+        after: Sequence[str] = (),
+        default: Any = None,
+        timeout: Optional[float] = None,
+        lazy: bool = False,
+    ) -> "TaskPlan":
+        """
+        添加任务（依赖的任务必须先添加，因此计划中不会出现环）
+
+        Args:
+            name: 任务名称
+            func: 任务函数，参数为 after 中各任务的结果
+            after: 依赖的任务名称
+            default: 任务失败或超时时的结果
+            timeout: 单个任务的超时（秒），与计划剩余时间取较小值
+            lazy: 是否为按需任务（被请求结果时才开始）
+        """
+        if name in self._tasks:
+            raise ValueError(f"任务 {name} 已存在")
+        missing = [dep for dep in after if dep not in self._tasks]
+        if missing:
+            raise ValueError(f"任务 {name} 依赖的任务不存在: {missing}")
+        self._tasks[name] = _Task(name, func, tuple(after), default, timeout, lazy)
+        return self
+
+    def start(self) -> None:
+        """启动全部非按需任务（重复调用无效）"""
+        if self._started_at is not None:
+            return
+        self._started_at = time.perf_counter()
+        for task in self._tasks.values():
+            if not task.lazy:
+                self._launch(task)
+
+    def _launch(self, task: _Task) -> None:
+        """启动任务（依赖尚未启动时先启动依赖）"""
+        if task.future is not None:
+            return
+        for dep in task.after:
+            self._launch(self._tasks[dep])
+        task.future = asyncio.ensure_future(self._execute(task))
+
+    async def _execute(self, task: _Task) -> Any:
+        args = [await self._tasks[dep].future for dep in task.after]
+        task.started_at = time.perf_counter()
+        limit = task.timeout
+        if self.timeout is not None:
+            remaining = self._started_at + self.timeout - task.started_at
+            limit = remaining if limit is None else min(limit, remaining)
+        try:
+            if limit is not None and limit <= 0:
+                raise asyncio.TimeoutError()
+            result = task.func(*args)
+            if inspect.isawaitable(result):
+                result = await asyncio.wait_for(result, limit)
+            task.status = "ok"
+        except asyncio.TimeoutError:
+            logger.warning(f"[{self.name}] 任务 {task.name} 超时，使用默认值")
+            task.status = "timeout"
+            result = task.default
+        except Exception as e:
+            logger.warning(f"[{self.name}] 任务 {task.name} 失败，使用默认值: {e}")
+            task.status = "error"
+            result = task.default
+        task.finished_at = time.perf_counter()
+        return result
+
+    async def result(self, name: str) -> Any:
+        """等待单个任务完成并返回其结果（计划尚未启动时先启动，按需任务此时开始）"""
+        self.start()
+        task = self._tasks[name]
+        self._launch(task)
+        return await task.future
+
+    async def run(self) -> Dict[str, Any]:
+        """执行全部任务（包括按需任务），返回 {任务名称: 结果}"""
+        self.start()
+        for task in self._tasks.values():
+            self._launch(task)
+        try:
+            return {name: await task.future for name, task in self._tasks.items()}
+        finally:
+            self.close()
+
+    def close(self) -> None:
+        """取消尚未完成的任务并记录关键路径（重复调用无效）"""
+        if self._closed or self._started_at is None:
+            return
+        self._closed = True
+        for task in self._tasks.values():
+            if task.future is None:
+                task.status = "skipped"
+            elif not task.future.done():
+                task.future.cancel()
+                task.status = "cancelled"
+        self.log_critical_path()
+
+    def critical_path(self) -> List[Tuple[str, float]]:
+        """
+        关键路径：从最后完成的任务出发，沿最晚完成的依赖回溯
+
+        Returns:
+            [(任务名称, 任务自身耗时 ms)]，按执行顺序排列
+        """
+        finished = [task for task in self._tasks.values() if task.finished_at is not None]
+        if not finished:
+            return []
+        path: List[Tuple[str, float]] = []
+        task: Optional[_Task] = max(finished, key=lambda item: item.finished_at)
+        while task is not None:
+            path.append((task.name, round((task.finished_at - task.started_at) * 1000, 1)))
+            deps = [self._tasks[dep] for dep in task.after if self._tasks[dep].finished_at is not None]
+            task = max(deps, key=lambda item: item.finished_at) if deps else None
+        path.reverse()
+        return path
+
+    def log_critical_path(self) -> None:
+        """在日志中输出关键路径与计划总耗时"""
+        path = self.critical_path()
+        if not path:
+            return
+        last = max(task.finished_at for task in self._tasks.values() if task.finished_at is not None)
+        total_ms = round((last - self._started_at) * 1000)
+        steps = " → ".join(f"{name} {elapsed_ms:.0f}ms" for name, elapsed_ms in path)
+        degraded = [task.name for task in self._tasks.values() if task.status in ("timeout", "error")]
+        suffix = f"，降级任务: {degraded}" if degraded else ""
+        logger.info(f"[{self.name}] 关键路径: {steps}（总耗时 {total_ms}ms，{len(self._tasks)} 个任务{suffix}）")
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """各任务的状态与耗时（ms）"""
+        return {
+            name: {
+                "status": task.status,
+                "elapsed_ms": (
+                    round((task.finished_at - task.started_at) * 1000, 1)
+                    if task.finished_at is not None else None
+                ),
+            }
+            for name, task in self._tasks.items()
+        }
@@ -0,0 +1,304 @@
+"""
+心情 / 活动 / 流派词表
+整个应用共用的一份关键词表，模块加载后只编译一次为 Aho–Corasick 自动机：
+一次扫描查询文本即可得到全部心情、活动、流派命中，以及对应的 Spotify 流派和音频特征目标
+"""
+
+import unicodedata
+from collections import deque
+from dataclasses import dataclass
+from typing import Dict, Iterable, Iterator, List, Mapping, Optional, Sequence, Tuple
+
+# 心情关键词 → Spotify 流派
+MOOD_TO_GENRES: Dict[str, Sequence[str]] = {
+    "开心": ("pop", "dance", "electronic"),
+    "快乐": ("pop", "dance", "electronic"),
+    "高兴": ("pop", "dance", "electronic"),
+    "兴奋": ("rock", "electronic", "dance"),
+    "激动": ("rock", "electronic", "dance"),
+    "悲伤": ("acoustic", "sad", "indie", "mellow"),
+    "伤心": ("acoustic", "sad", "indie", "mellow"),
+    "难过": ("acoustic", "sad", "indie", "piano"),
+    "丧": ("acoustic", "sad", "indie"),
+    "疗愈": ("acoustic", "mellow", "indie"),
+    "放松": ("chill", "acoustic", "jazz", "ambient"),
+    "舒缓": ("chill", "acoustic", "jazz", "ambient"),
+    "平静": ("ambient", "acoustic", "chill"),
+    "安静": ("ambient", "acoustic", "chill"),
+    "怀旧": ("classic", "pop", "rock", "indie"),
+    "浪漫": ("acoustic", "pop", "r-n-b", "soul"),
+    "甜蜜": ("pop", "r-n-b", "soul"),
+    "表白": ("r-n-b", "soul", "pop"),
+    "学习": ("lo-fi", "chill", "ambient", "acoustic"),
+    "专注": ("lo-fi", "ambient", "acoustic"),
+    "运动": ("electronic", "rock", "dance"),
+}
+
+# 活动关键词 → Spotify 流派
+ACTIVITY_TO_GENRES: Dict[str, Sequence[str]] = {
+    "运动": ("electronic", "rock", "dance"),
+    "健身": ("electronic", "rock", "dance"),
+    "跑步": ("electronic", "rock", "dance"),
+    "学习": ("acoustic", "jazz", "chill"),
+    "工作": ("acoustic", "jazz", "chill"),
+    "写作": ("lo-fi", "ambient", "acoustic"),
+    "开车": ("pop", "rock", "country"),
+    "通勤": ("pop", "indie", "electronic"),
+    "睡觉": ("ambient", "acoustic", "chill"),
+    "休息": ("acoustic", "chill", "jazz"),
+    "派对": ("dance", "pop", "electronic"),
+    "聚会": ("pop", "dance", "electronic"),
+}
+
+# 心情关键词 → 音频特征目标（0-1范围，tempo单位 BPM）
+MOOD_TARGET_FEATURES: Dict[str, Dict[str, float]] = {
+    "开心": {"valence": 0.7, "energy": 0.7, "danceability": 0.6, "tempo": 120},
+    "快乐": {"valence": 0.7, "energy": 0.7, "danceability": 0.6, "tempo": 120},
+    "高兴": {"valence": 0.7, "energy": 0.7, "danceability": 0.6, "tempo": 120},
+    "兴奋": {"valence": 0.6, "energy": 0.85, "danceability": 0.7, "tempo": 130},
+    "激动": {"valence": 0.6, "energy": 0.85, "danceability": 0.7, "tempo": 130},
+    "悲伤": {"valence": 0.25, "energy": 0.3, "danceability": 0.3, "tempo": 80},
+    "伤心": {"valence": 0.25, "energy": 0.3, "danceability": 0.3, "tempo": 80},
+    "难过": {"valence": 0.2, "energy": 0.25, "danceability": 0.3, "tempo": 75},
+    "丧": {"valence": 0.2, "energy": 0.25, "danceability": 0.3, "tempo": 75},
+    "疗愈": {"valence": 0.4, "energy": 0.3, "danceability": 0.35, "tempo": 85},
+    "放松": {"valence": 0.5, "energy": 0.35, "danceability": 0.4, "tempo": 90},
+    "舒缓": {"valence": 0.5, "energy": 0.35, "danceability": 0.4, "tempo": 90},
+    "平静": {"valence": 0.45, "energy": 0.25, "danceability": 0.35, "tempo": 80},
+    "安静": {"valence": 0.45, "energy": 0.25, "danceability": 0.35, "tempo": 80},
+    "怀旧": {"valence": 0.5, "energy": 0.45, "danceability": 0.45, "tempo": 100},
+    "浪漫": {"valence": 0.65, "energy": 0.45, "danceability": 0.5, "tempo": 95},
+    "甜蜜": {"valence": 0.7, "energy": 0.5, "danceability": 0.55, "tempo": 100},
+    "表白": {"valence": 0.65, "energy": 0.45, "danceability": 0.5, "tempo": 95},
+    "学习": {"valence": 0.45, "energy": 0.3, "danceability": 0.35, "tempo": 85},
+    "专注": {"valence": 0.4, "energy": 0.25, "danceability": 0.3, "tempo": 80},
+    "运动": {"valence": 0.6, "energy": 0.85, "danceability": 0.75, "tempo": 130},
+}
+
+# 流派词 → 本地曲库使用的流派名
+GENRE_VOCABULARY: Dict[str, str] = {
+    "流行": "流行",
+    "摇滚": "摇滚",
+    "民谣": "民谣",
+    "电子": "电子",
+    "电音": "电子",
+    "说唱": "说唱",
+    "嘻哈": "说唱",
+    "抒情": "抒情",
+    "古风": "古风",
+    "爵士": "爵士",
+    "pop": "流行",
+    "rock": "摇滚",
+    "folk": "民谣",
+    "edm": "电子",
+    "rap": "说唱",
+    "hip hop": "说唱",
+    "jazz": "爵士",
+}
+
+# 关键词表之外的常见说法 → 关键词表中的标准词
+MOOD_ALIASES: Dict[str, str] = {
+    "心情很好": "开心",
+    "心情不错": "开心",
+    "愉快": "开心",
+    "难受": "难过",
+    "emo": "丧",
+    "治愈": "疗愈",
+    "轻松": "放松",
+    "解压": "放松",
+}
+
+ACTIVITY_ALIASES: Dict[str, str] = {
+    "助眠": "睡觉",
+    "入睡": "睡觉",
+    "睡前": "睡觉",
+    "锻炼": "运动",
+    "撸铁": "健身",
+    "自习": "学习",
+    "加班": "工作",
+    "办公": "工作",
+    "自驾": "开车",
+    "兜风": "开车",
+}
+
+
+def _is_word_char(ch: str) -> bool:
+    return ch.isascii() and ch.isalnum()
+
+
+class KeywordMatcher:
+    """
+    Aho–Corasick 多模式匹配器
+
+    关键词不区分大小写；纯 ASCII 关键词要求前后不是英文字母或数字（"rap" 不命中 "trap"）。
+    find 的结果与 "长词优先的多模式正则 + finditer" 一致：从左到右取最长、互不重叠的命中
+    """
+
+    def __init__(self, keywords: Iterable[str]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[List[str]] = [[]]
+        for keyword in {k.lower() for k in keywords if k}:
+            self._add(keyword)
+        self._link()
+
+    def __len__(self) -> int:
+        return len(self._goto)
+
+    def _add(self, keyword: str) -> None:
+        node = 0
+        for ch in keyword:
+            nxt = self._goto[node].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+            node = nxt
+        self._output[node].append(keyword)
+
+    def _link(self) -> None:
+        """按 BFS 计算失败指针，并把后缀节点的输出合并进来"""
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, child in self._goto[node].items():
+                fail = self._fail[node]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[child] = self._goto[fail].get(ch, 0)
+                self._output[child] = self._output[child] + self._output[self._fail[child]]
+                queue.append(child)
+
+    def iter_matches(self, text: str) -> Iterator[Tuple[int, int, str]]:
+        """一次扫描产出全部命中 (start, end, 关键词)，包括互相重叠的"""
+        text = text.lower()
+        node = 0
+        for i, ch in enumerate(text):
+            while node and ch not in self._goto[node]:
+                node = self._fail[node]
+            node = self._goto[node].get(ch, 0)
+            for keyword in self._output[node]:
+                start, end = i + 1 - len(keyword), i + 1
+                if keyword.isascii() and (
+                    (start > 0 and _is_word_char(text[start - 1]))
+                    or (end < len(text) and _is_word_char(text[end]))
+                ):
+                    continue
+                yield start, end, keyword
+
+    @staticmethod
+    def leftmost_longest(matches: Iterable[Tuple[int, int, str]]) -> List[str]:
+        """从左到右选取最长、互不重叠的命中"""
+        selected: List[str] = []
+        position = 0
+        for start, end, keyword in sorted(matches, key=lambda m: (m[0], m[0] - m[1])):
+            if start >= position:
+                selected.append(keyword)
+                position = end
+        return selected
+
+    def find(self, text: str) -> List[str]:
+        """文本中命中的关键词（从左到右、最长优先、互不重叠）"""
+        return self.leftmost_longest(self.iter_matches(text))
+
+
+@dataclass(frozen=True)
+class VocabularyHit:
+    """一次词表命中"""
+    kind: str  # mood / activity / genre
+    term: str  # 标准词（别名已归一）
+    genres: Tuple[str, ...]  # 对应的 Spotify 流派（流派词为本地流派名）
+    target: Optional[Mapping[str, float]] = None  # 心情的音频特征目标
+
+
+class Vocabulary:
+    """
+    心情 / 活动 / 流派词表
+
+    所有类别的关键词编译进同一个自动机，一次扫描后再按类别各自选取最长、互不重叠的命中，
+    结果与分别对每个类别匹配相同
+    """
+
+    KINDS = ("mood", "activity", "genre")
+
+    def __init__(
+        self,
+        mood_genres: Mapping[str, Sequence[str]] = MOOD_TO_GENRES,
+        activity_genres: Mapping[str, Sequence[str]] = ACTIVITY_TO_GENRES,
+        mood_targets: Mapping[str, Mapping[str, float]] = MOOD_TARGET_FEATURES,
+        genre_words: Mapping[str, str] = GENRE_VOCABULARY,
+        mood_aliases: Mapping[str, str] = MOOD_ALIASES,
+        activity_aliases: Mapping[str, str] = ACTIVITY_ALIASES,
+    ):
+        self._canonical: Dict[str, Dict[str, str]] = {
+            "mood": {**{w.lower(): w for w in mood_genres}, **{k.lower(): v for k, v in mood_aliases.items()}},
+            "activity": {**{w.lower(): w for w in activity_genres}, **{k.lower(): v for k, v in activity_aliases.items()}},
+            "genre": {k.lower(): v for k, v in genre_words.items()},
+        }
+        self._hits: Dict[Tuple[str, str], VocabularyHit] = {}
+        for term, genres in mood_genres.items():
+            self._hits[("mood", term)] = VocabularyHit("mood", term, tuple(genres), mood_targets.get(term))
+        for term, genres in activity_genres.items():
+            self._hits[("activity", term)] = VocabularyHit("activity", term, tuple(genres))
+        for term in set(genre_words.values()):
+            self._hits[("genre", term)] = VocabularyHit("genre", term, (term,))
+
+        self._kinds_by_keyword: Dict[str, List[str]] = {}
+        for kind, words in self._canonical.items():
+            for keyword in words:
+                self._kinds_by_keyword.setdefault(keyword, []).append(kind)
+        self._matcher = KeywordMatcher(self._kinds_by_keyword)
+
+    def scan(self, text: str) -> Dict[str, List[str]]:
+        """
+        扫描文本
+
+        Returns:
+            {"mood": [...], "activity": [...], "genre": [...]}：各类别命中的标准词，按出现顺序去重
+        """
+        matches: Dict[str, List[Tuple[int, int, str]]] = {kind: [] for kind in self.KINDS}
+        for match in self._matcher.iter_matches(unicodedata.normalize("NFKC", text or "")):
+            for kind in self._kinds_by_keyword[match[2]]:
+                matches[kind].append(match)
+
+        result: Dict[str, List[str]] = {}
+        for kind in self.KINDS:
+            terms: List[str] = []
+            for keyword in KeywordMatcher.leftmost_longest(matches[kind]):
+                term = self._canonical[kind][keyword]
+                if term not in terms:
+                    terms.append(term)
+            result[kind] = terms
+        return result
+
+    def hits(self, text: str) -> List[VocabularyHit]:
+        """扫描文本，返回全部命中及其流派、音频特征目标（按类别、出现顺序）"""
+        return [self._hits[(kind, term)] for kind, terms in self.scan(text).items() for term in terms]
+
+    def lookup(self, kind: str, text: str) -> List[VocabularyHit]:
+        """
+        某一类别的命中
+
+        没有关键词出现在文本中时，再找包含该文本的关键词（如 "伤" → 悲伤、伤心），
+        兼容只给出关键词片段的调用方
+        """
+        terms = self.scan(text)[kind]
+        if not terms and text:
+            needle = text.lower()
+            terms = list(dict.fromkeys(
+                term for keyword, term in self._canonical[kind].items() if needle in keyword
+            ))
+        return [self._hits[(kind, term)] for term in terms if (kind, term) in self._hits]
+
+
+_vocabulary: Optional[Vocabulary] = None
+
+
+def get_vocabulary() -> Vocabulary:
+    """获取共享词表（首次调用时编译）"""
+    global _vocabulary
+    if _vocabulary is None:
+        _vocabulary = Vocabulary()
+    return _vocabulary
@@ -41,6 +41,21 @@ export default function RecommendationsPage() {
             setThinkingMessage(event.message || '正在思考...');
             break;
 
+          case 'step':
+            // 工作流节点开始时展示真实进度
+            if (event.status === 'start' && event.message) {
+              setThinkingMessage(event.message);
+            }
+            break;
+
+          case 'response_delta':
+            // 增量文本：逐段追加，收到首个 token 即开始显示
+            if (event.delta) {
+              setResponseText((prev) => prev + event.delta);
+              setThinkingMessage('');
+            }
+            break;
+
           case 'response':
             if (event.text) {
               setResponseText(event.text);